@@ -2,133 +2,315 @@
 """
 CARFAX Project Backup Script
 Creates a backup of the project with date and time in folder name
+
+Backups are incremental: files whose content is unchanged since the
+previous backup are hardlinked to it instead of copied again, so every
+backup folder is a complete snapshot but only changed files use space.
 """
 
+import argparse
+import datetime
+import fnmatch
+import hashlib
+import json
 import os
 import shutil
-import datetime
+import stat as stat_module
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-def create_backup():
+# Files and folders to exclude from backup (matched against each name)
+EXCLUDE_PATTERNS = [
+    '__pycache__',
+    '.git',
+    '.gitignore',
+    '*.pyc',
+    '*.pyo',
+    '*.log',
+    'node_modules',
+    '.env',
+    '.venv',
+    'venv',
+    'env',
+    '.DS_Store',
+    'Thumbs.db',
+    '*.tmp',
+    '*.temp'
+]
+
+BACKUP_PREFIX = "backup_"
+PARTIAL_SUFFIX = ".partial"
+
+# Written last into every completed snapshot: relative path -> [size, mtime_ns, sha256, mode]
+MANIFEST_NAME = ".backup_manifest.json"
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def should_exclude(name):
+    """Check if a file or folder name should be excluded from backup"""
+    return any(fnmatch.fnmatch(name, pattern) for pattern in EXCLUDE_PATTERNS)
+
+
+def iter_files(source, skip=(), on_dir=None):
+    """Yield (relative path, stat) of every file to back up, pruning excluded folders
+
+    Folders in skip (absolute paths) are pruned too, so a backup folder
+    inside the source is never backed up into itself. on_dir, if given,
+    is called with the relative path of every folder kept, empty or not,
+    before any of its files are yielded.
+    """
+    for root, dirs, files in os.walk(source):
+        dirs[:] = sorted(
+            d for d in dirs
+            if not should_exclude(d) and os.path.abspath(os.path.join(root, d)) not in skip
+        )
+        if on_dir is not None:
+            for d in dirs:
+                on_dir(os.path.relpath(os.path.join(root, d), source))
+        for name in sorted(files):
+            if should_exclude(name):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                print(f"⚠️ Skipping {path}: {e}")
+                continue
+            yield os.path.relpath(path, source), stat
+
+
+def file_hash(path):
+    """sha256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(snapshot):
+    """Manifest of a completed snapshot, or None"""
+    try:
+        with open(os.path.join(snapshot, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def find_previous_snapshot(backup_root):
+    """The newest completed backup folder in backup_root and its manifest, or (None, None)"""
+    try:
+        names = sorted(
+            (name for name in os.listdir(backup_root)
+             if name.startswith(BACKUP_PREFIX) and not name.endswith(PARTIAL_SUFFIX)),
+            reverse=True
+        )
+    except OSError:
+        return None, None
+    for name in names:
+        snapshot = os.path.join(backup_root, name)
+        manifest = load_manifest(snapshot)
+        if manifest is not None:
+            return snapshot, manifest
+    return None, None
+
+
+class BackupEngine:
+    def __init__(self, source, backup_root, workers=8, previous=None, previous_manifest=None, checksum=False):
+        """Copy or hardlink files into a new snapshot
+
+        A file is reused from the previous snapshot when a file there has
+        the same content hash, modification time and permissions; a
+        hardlink shares all three, so a match on content alone would give
+        the file another path's metadata. The hash is only recomputed
+        when size or mtime changed since the previous backup, unless
+        checksum is set. Files are processed by workers threads.
+        """
+        self.source = source
+        self.backup_root = backup_root
+        self.workers = max(1, int(workers))
+        self.previous = previous
+        self.previous_manifest = previous_manifest or {}
+        self.checksum = checksum
+        # Any path in the previous snapshot with the same content and metadata can be linked to
+        self._by_content = {}
+        for relpath, entry in self.previous_manifest.items():
+            if len(entry) < 4:
+                # Manifests of older backups have no mode; their files are copied once more
+                continue
+            _, mtime_ns, digest, mode = entry
+            self._by_content.setdefault((digest, mtime_ns, mode), relpath)
+
+    def _link_or_copy(self, src, linked_from, dst):
+        """Hardlink dst to linked_from when possible, else copy src; returns 'linked' or 'copied'"""
+        if linked_from is not None:
+            try:
+                os.link(linked_from, dst)
+                return 'linked'
+            except OSError:
+                # Different filesystem, or one without hardlinks: fall back to copying
+                pass
+        shutil.copy2(src, dst)
+        return 'copied'
+
+    def backup_file(self, relpath, stat, target):
+        """Back up one file; returns (relpath, manifest entry, action)"""
+        src = os.path.join(self.source, relpath)
+        dst = os.path.join(target, relpath)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+        previous = self.previous_manifest.get(relpath)
+        if previous and not self.checksum and previous[0] == stat.st_size and previous[1] == stat.st_mtime_ns:
+            digest = previous[2]
+        else:
+            digest = file_hash(src)
+
+        mode = stat_module.S_IMODE(stat.st_mode)
+        linked_from = None
+        match = self._by_content.get((digest, stat.st_mtime_ns, mode))
+        if self.previous is not None and match is not None:
+            linked_from = os.path.join(self.previous, match)
+        action = self._link_or_copy(src, linked_from, dst)
+        return relpath, [stat.st_size, stat.st_mtime_ns, digest, mode], action
+
+    def run(self, target):
+        """Back up the source into target; returns the manifest and totals"""
+        manifest = {}
+        stats = {'files': 0, 'bytes': 0, 'copied': 0, 'copied_bytes': 0, 'linked': 0, 'errors': 0}
+        os.makedirs(target, exist_ok=True)
+
+        # Folders are created as the walk finds them, so empty ones are kept too
+        folders = []
+
+        def create_folder(relpath):
+            os.makedirs(os.path.join(target, relpath), exist_ok=True)
+            folders.append(relpath)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self.backup_file, relpath, stat, target): relpath
+                for relpath, stat in iter_files(self.source, skip={os.path.abspath(self.backup_root)},
+                                                on_dir=create_folder)
+            }
+            # Totals are gathered as files complete, no second walk over the backup
+            for future in as_completed(futures):
+                try:
+                    relpath, entry, action = future.result()
+                except Exception as e:
+                    print(f"❌ Error copying {futures[future]}: {e}")
+                    stats['errors'] += 1
+                    continue
+                manifest[relpath] = entry
+                stats['files'] += 1
+                stats['bytes'] += entry[0]
+                stats[action] += 1
+                if action == 'copied':
+                    stats['copied_bytes'] += entry[0]
+
+        # Folder times last: adding files to a folder changes its mtime
+        for relpath in reversed(folders):
+            try:
+                shutil.copystat(os.path.join(self.source, relpath), os.path.join(target, relpath))
+            except OSError:
+                pass
+        return manifest, stats
+
+
+def create_backup(source=None, backup_root=None, workers=8, full=False, checksum=False):
     """Create a backup of the project with date and time"""
-    
+
     # Get current date and time
     now = datetime.datetime.now()
     timestamp = now.strftime("%Y%m%d_%H%M%S")
-    
+
     # Create backup folder name
-    backup_folder_name = f"backup_{timestamp}"
-    
-    # Get current directory (project root)
-    current_dir = Path.cwd()
-    parent_dir = current_dir.parent
-    
+    backup_folder_name = f"{BACKUP_PREFIX}{timestamp}"
+
+    # Get current directory (project root); backups go next to it by default
+    current_dir = Path(source) if source else Path.cwd()
+    backup_root = Path(backup_root) if backup_root else current_dir.parent
+
     # Create backup path
-    backup_path = parent_dir / backup_folder_name
-    
-    # Files and folders to exclude from backup
-    exclude_patterns = [
-        '__pycache__',
-        '.git',
-        '.gitignore',
-        '*.pyc',
-        '*.pyo',
-        '*.log',
-        'node_modules',
-        '.env',
-        '.venv',
-        'venv',
-        'env',
-        '.DS_Store',
-        'Thumbs.db',
-        '*.tmp',
-        '*.temp'
-    ]
-    
-    def should_exclude(path):
-        """Check if path should be excluded from backup"""
-        path_str = str(path)
-        for pattern in exclude_patterns:
-            if pattern in path_str:
-                return True
-        return False
-    
-    def copy_directory(src, dst):
-        """Copy directory with exclusions"""
-        try:
-            if dst.exists():
-                shutil.rmtree(dst)
-            
-            shutil.copytree(src, dst, ignore=shutil.ignore_patterns(*exclude_patterns))
-            return True
-        except Exception as e:
-            print(f"❌ Error copying {src}: {e}")
-            return False
-    
+    backup_path = backup_root / backup_folder_name
+    partial_path = backup_root / (backup_folder_name + PARTIAL_SUFFIX)
+
+    previous, previous_manifest = (None, None) if full else find_previous_snapshot(str(backup_root))
+
     print("🚀 Creating CARFAX Project Backup...")
     print(f"📁 Source: {current_dir}")
     print(f"📁 Backup: {backup_path}")
     print(f"⏰ Timestamp: {timestamp}")
+    print(f"🔗 Previous backup: {previous}" if previous else "📦 Full backup (no previous backup to link against)")
     print("=" * 50)
-    
-    # Create backup
+
+    # Create backup; it only gets its final name once complete
     try:
-        if copy_directory(current_dir, backup_path):
-            print("✅ Backup created successfully!")
-            print(f"📂 Backup location: {backup_path}")
-            
-            # Calculate backup size
-            total_size = 0
-            file_count = 0
-            for root, dirs, files in os.walk(backup_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        total_size += os.path.getsize(file_path)
-                        file_count += 1
-                    except:
-                        pass
-            
-            # Convert to MB
-            size_mb = total_size / (1024 * 1024)
-            print(f"📊 Backup size: {size_mb:.2f} MB")
-            print(f"📄 Files backed up: {file_count}")
-            
-        else:
-            print("❌ Backup failed!")
+        if backup_path.exists() or partial_path.exists():
+            print(f"❌ {backup_path} already exists")
+            return False
+
+        engine = BackupEngine(str(current_dir), str(backup_root), workers=workers, previous=previous,
+                              previous_manifest=previous_manifest, checksum=checksum)
+        manifest, stats = engine.run(str(partial_path))
+        if stats['errors']:
+            print(f"❌ Backup failed: {stats['errors']} files could not be copied")
+            print(f"   Incomplete backup left in {partial_path}")
             return False
-            
+
+        with open(partial_path / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, separators=(',', ':'), sort_keys=True)
+        os.replace(partial_path, backup_path)
+
+        print("✅ Backup created successfully!")
+        print(f"📂 Backup location: {backup_path}")
+
+        # Convert to MB
+        size_mb = stats['bytes'] / (1024 * 1024)
+        copied_mb = stats['copied_bytes'] / (1024 * 1024)
+        print(f"📊 Backup size: {size_mb:.2f} MB ({copied_mb:.2f} MB new)")
+        print(f"📄 Files backed up: {stats['files']} ({stats['copied']} copied, {stats['linked']} unchanged and hardlinked)")
+
     except Exception as e:
         print(f"❌ Error creating backup: {e}")
         return False
-    
+
     print("=" * 50)
     print("🎉 Backup completed successfully!")
     return True
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='Incremental CARFAX project backup')
+    parser.add_argument('--dest', help='Folder that holds the backup_* snapshots (default: parent of the project)')
+    parser.add_argument('--workers', '-w', type=int, default=8, help='Parallel copy threads')
+    parser.add_argument('--full', action='store_true', help='Copy everything instead of hardlinking to the previous backup')
+    parser.add_argument('--checksum', action='store_true',
+                        help='Hash every file instead of trusting unchanged size and modification time')
+    args = parser.parse_args()
+
     print("🔧 CARFAX Project Backup Tool")
     print("=" * 30)
-    
+
     # Check if we're in the project directory
     current_dir = Path.cwd()
     if not (current_dir / "carfax-app").exists():
         print("❌ Error: Please run this script from the project root directory")
         print("   Make sure you're in the folder containing 'carfax-app'")
         return False
-    
+
     # Create backup
-    success = create_backup()
-    
+    success = create_backup(backup_root=args.dest, workers=args.workers, full=args.full, checksum=args.checksum)
+
     if success:
         print("\n💡 Tips:")
         print("   - Keep your backups in a safe location")
         print("   - Consider using cloud storage for important backups")
         print("   - Regular backups help prevent data loss")
-    
+        print("   - Unchanged files are hardlinks shared between backups: don't edit files inside a backup")
+
     return success
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(0 if main() else 1)
@@ -1,6 +1,28 @@
 from flask import Flask
 from flask_cors import CORS
 import os
+import sys
+
+# Shared scraper modules (result cache, ...) live next to carfax-app
+SCRAPER_DIR = os.environ.get(
+    'CARFAX_SCRAPER_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'scraper')
+)
+if SCRAPER_DIR not in sys.path:
+    sys.path.insert(0, SCRAPER_DIR)
+
+# The CARFAX launcher is imported and called in-process
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+from result_cache import ResultCache, DEFAULT_CACHE_PATH
+from result_store import ResultStore, DEFAULT_STORE_PATH
+from carfax_launcher_cross_platform import get_launcher
+from metrics import REGISTRY
+from rate_limiter import create_rate_limiter, DEFAULT_RATE_PER_MINUTE
+from .jobs import JobQueue
+from .assets import init_assets
 
 def create_app():
     """Create and configure the Flask application"""
@@ -35,6 +57,56 @@ def create_app():
     # Configure app
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
     app.config['JSON_SORT_KEYS'] = False
+    app.config['CACHE_PATH'] = os.environ.get('CARFAX_CACHE_PATH', DEFAULT_CACHE_PATH)
+    app.config['CACHE_NEGATIVE_TTL'] = int(os.environ.get('CARFAX_CACHE_NEGATIVE_TTL', 5 * 60))
+    app.config['CACHE_MAX_ENTRIES'] = int(os.environ.get('CARFAX_CACHE_MAX_ENTRIES', 10000))
+    app.config['VALIDATE_BATCH_MAX'] = int(os.environ.get('CARFAX_VALIDATE_BATCH_MAX', 100000))
+    
+    # Failed launches per VIN, shared on disk with the scraper's cache; a
+    # successful launch opens a tab, so it is never answered from here
+    app.extensions['vin_cache'] = ResultCache(
+        app.config['CACHE_PATH'],
+        namespace='launch',
+        negative_ttl=app.config['CACHE_NEGATIVE_TTL'],
+        max_entries=app.config['CACHE_MAX_ENTRIES']
+    )
+    
+    # Scraped reports, written by the scraper's sqlite sink
+    app.config['STORE_PATH'] = os.environ.get('CARFAX_STORE_PATH', DEFAULT_STORE_PATH)
+    app.extensions['result_store'] = ResultStore(app.config['STORE_PATH'])
+    
+    # Chrome and profile discovery happens once, here, not per request
+    launcher = get_launcher()
+    app.extensions['launcher'] = launcher
+    app.logger.info(f"Chrome: {launcher.chrome_path or 'not found'}, profile: {launcher.user_profile or 'not found'}")
+    
+    # Host-wide request budget for carfaxonline.com; app lookups use the interactive lane
+    app.config['RATE_PER_MINUTE'] = float(os.environ.get('CARFAX_RATE_PER_MINUTE', DEFAULT_RATE_PER_MINUTE))
+    launcher.rate_limiter = create_rate_limiter(app.config['RATE_PER_MINUTE'])
+    
+    # Background workers for VIN launch jobs
+    app.config['JOB_WORKERS'] = int(os.environ.get('CARFAX_JOB_WORKERS', 4))
+    app.config['JOB_QUEUE_SIZE'] = int(os.environ.get('CARFAX_JOB_QUEUE_SIZE', 50))
+    # Set when several server processes must share job status (production mode)
+    app.config['JOB_STATE_PATH'] = os.environ.get('CARFAX_JOB_STATE_PATH')
+    app.extensions['job_queue'] = JobQueue(
+        max_workers=app.config['JOB_WORKERS'],
+        max_pending=app.config['JOB_QUEUE_SIZE'],
+        state_path=app.config['JOB_STATE_PATH']
+    )
+    
+    # Gauges read from the live objects whenever /metrics is scraped
+    cache = app.extensions['vin_cache']
+    job_queue = app.extensions['job_queue']
+    REGISTRY.gauge('carfax_job_queue_depth', 'VIN jobs queued or running', callback=job_queue.depth)
+    REGISTRY.gauge('carfax_job_queue_capacity', 'Maximum VIN jobs queued or running',
+                   callback=lambda: job_queue.max_pending)
+    REGISTRY.gauge('carfax_cache_hit_ratio', 'VIN cache hit ratio in this process',
+                   callback=lambda: cache.stats()['hit_ratio'])
+    REGISTRY.gauge('carfax_cache_entries', 'Entries in the VIN cache', callback=lambda: cache.stats()['entries'])
+    
+    # Fingerprinted, precompressed assets (scripts/build_assets.py) and gzip for JSON
+    init_assets(app)
     
     # Register blueprints
     from .routes import main_bp
@@ -0,0 +1,125 @@
+import gzip
+import json
+import mimetypes
+import os
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+
+assets_bp = Blueprint('assets', __name__)
+
+# Fingerprinted files never change under the same name
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Precompressed variants, best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def load_manifest(static_folder):
+    """Map of source asset -> fingerprinted build, empty when assets aren't built"""
+    path = os.path.join(static_folder, 'dist', 'manifest.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def fingerprint(built):
+    """Content hash in a built asset's name (dist/app.<hash>.js)"""
+    return built.rsplit('.', 2)[-2]
+
+
+def asset_url(name):
+    """URL of the built asset for a static path, or the raw file when unbuilt
+
+    Templates use {{ asset_url('js/app.js') }} instead of url_for('static', ...).
+    """
+    built = current_app.extensions.get('asset_manifest', {}).get(name)
+    if built:
+        return url_for('assets.dist', filename=built[len('dist/'):])
+    return url_for('static', filename=name)
+
+
+def add_static_version(endpoint, values):
+    """url_for('static', filename=...) of a built asset gets ?v=<content hash>
+
+    Templates keep using url_for('static', ...) and still get URLs that
+    change whenever the asset does, so they can be cached for good.
+    """
+    if endpoint != 'static' or 'v' in values:
+        return
+    built = current_app.extensions.get('asset_manifest', {}).get(values.get('filename'))
+    if built:
+        values['v'] = fingerprint(built)
+
+
+def send_precompressed(directory, filename):
+    """Send a file, or its .br/.gz variant when the client accepts it"""
+    mimetype = mimetypes.guess_type(filename)[0]
+
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(directory, filename + suffix)):
+            response = send_from_directory(directory, filename + suffix, mimetype=mimetype,
+                                           etag=filename + suffix)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(directory, filename, mimetype=mimetype, etag=filename)
+
+    # send_file names the .gz/.br file here; the client should only see the asset
+    response.headers.pop('Content-Disposition', None)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@assets_bp.route('/assets/<path:filename>')
+def dist(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it"""
+    response = send_precompressed(os.path.join(current_app.static_folder, 'dist'), filename)
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def serve_static(filename):
+    """/static, answering built assets with their minified, precompressed build
+
+    Only a URL carrying the asset's current content hash (?v=) is cached
+    for good; a bare /static URL is revalidated against the ETag. Files
+    without a build are served as Flask always did.
+    """
+    built = current_app.extensions.get('asset_manifest', {}).get(filename)
+    if not built:
+        return current_app.send_static_file(filename)
+    response = send_precompressed(current_app.static_folder, built)
+    response.headers['Cache-Control'] = IMMUTABLE if request.args.get('v') == fingerprint(built) else 'no-cache'
+    return response
+
+
+def compress_json(response):
+    """gzip JSON API responses for clients that accept it"""
+    if (response.mimetype != 'application/json'
+            or response.direct_passthrough
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or not request.accept_encodings['gzip']):
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=current_app.config['COMPRESS_LEVEL']))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_assets(app):
+    """Serve built assets under /static and /assets and compress JSON responses"""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.extensions['asset_manifest'] = load_manifest(app.static_folder)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.view_functions['static'] = serve_static
+    app.url_defaults(add_static_version)
+    app.register_blueprint(assets_bp)
+    app.after_request(compress_json)
@@ -0,0 +1,269 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from single_flight import SingleFlight, HostSingleFlight, normalize_vin
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the job queue has no room for another job"""
+
+
+class JobStateStore:
+    def __init__(self, path, stale_after=300.0):
+        """SQLite copy of job state, readable from every server worker process
+
+        Queued or running jobs not updated for stale_after seconds (their
+        worker process died) no longer count as pending.
+        """
+        self.path = path
+        self.stale_after = stale_after
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, job TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (updated_at)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'status' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN status TEXT")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, job, conn=None):
+        (conn or self._connect()).execute(
+            "INSERT OR REPLACE INTO jobs (job_id, job, status, updated_at) VALUES (?, ?, ?, ?)",
+            (job['job_id'], json.dumps(job), job['status'], time.time())
+        )
+
+    def _pending(self, conn):
+        return conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running') AND updated_at >= ?",
+            (time.time() - self.stale_after,)
+        ).fetchone()[0]
+
+    def pending(self):
+        """Jobs queued or running in any worker process"""
+        return self._pending(self._connect())
+
+    def reserve(self, job, max_pending):
+        """Save a new job unless max_pending jobs are already pending host-wide"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = self._pending(conn)
+            if pending >= max_pending:
+                raise QueueFull(f"{pending} jobs already pending")
+            self.save(job, conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def load(self, job_id):
+        row = self._connect().execute("SELECT job FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def prune(self, cutoff):
+        self._connect().execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,))
+
+
+class JobQueue:
+    def __init__(self, max_workers=4, max_pending=50, retention=3600, state_path=None):
+        """Bounded background worker pool for VIN jobs
+
+        At most max_pending jobs may be queued or running at once; finished
+        jobs are kept for retention seconds so clients can collect results.
+        With state_path, job state is mirrored to SQLite so any server
+        worker process can answer status requests, and both the
+        max_pending bound and per-VIN coalescing hold across all worker
+        processes instead of per process.
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='vin-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._state = JobStateStore(state_path) if state_path else None
+        self._flights = HostSingleFlight(state_path) if state_path else SingleFlight()
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window"""
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['finished'] and job['finished'] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self._state is not None:
+            self._state.prune(cutoff)
+
+    def depth(self):
+        """Number of jobs queued or running (in all worker processes with a state store)"""
+        if self._state is not None:
+            return self._state.pending()
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] in ('queued', 'running'))
+
+    def submit(self, vin, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) for a VIN; returns (job_id, coalesced)
+
+        While a job for the same VIN is queued or running, its id is
+        returned instead of starting another one (coalesced is True).
+        fn is also passed progress, a callable(event, **data) that adds
+        to the job's event log. fn returns (payload, status_code); a 200
+        status marks the job succeeded, anything else failed.
+        """
+        key = normalize_vin(vin)
+        return self._flights.begin(key, lambda: self._create(key, vin, fn, args, kwargs))
+
+    def _create(self, key, vin, fn, args, kwargs):
+        """Register a new job and hand it to the worker pool"""
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'vin': vin,
+            'status': 'queued',
+            'result': None,
+            'error': None,
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'finished': None,
+            'events': []
+        }
+        self._append_event(job, 'queued', {'vin': vin})
+
+        with self._lock:
+            self._prune()
+            if self._state is None:
+                pending = sum(1 for other in self._jobs.values() if other['status'] in ('queued', 'running'))
+                if pending >= self.max_pending:
+                    raise QueueFull(f"{pending} jobs already pending")
+        if self._state is not None:
+            # The bound is checked and the job saved in one transaction shared by all processes
+            self._state.reserve(dict(job), self.max_pending)
+        with self._lock:
+            self._jobs[job_id] = job
+
+        self._executor.submit(self._run, key, job_id, fn, args, kwargs)
+        return job_id
+
+    @staticmethod
+    def _append_event(job, event, data):
+        job['events'] = job['events'] + [{
+            'id': len(job['events']) + 1,
+            'event': event,
+            'data': data,
+            'time': datetime.now().isoformat()
+        }]
+
+    def _update(self, job_id, event=None, data=None, **fields):
+        """Update a job's fields, optionally logging an event, and wake waiters"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            if event is not None:
+                self._append_event(job, event, data or {})
+            snapshot = dict(job)
+            self._changed.notify_all()
+        if self._state is not None:
+            self._state.save(snapshot)
+
+    def _run(self, key, job_id, fn, args, kwargs):
+        """Execute one job on a worker thread"""
+        self._update(job_id, event='running', status='running', started_at=datetime.now().isoformat())
+        progress = lambda event, **data: self._update(job_id, event=event, data=data)
+        outcome = {}
+        try:
+            payload, status_code = fn(*args, progress=progress, **kwargs)
+            if status_code == 200:
+                outcome = {'status': 'succeeded', 'result': payload}
+            else:
+                outcome = {'status': 'failed', 'result': payload, 'error': payload.get('error')}
+        except Exception as e:
+            logger.error(f"Job {job_id} crashed: {e}")
+            outcome = {'status': 'failed', 'error': f"Unexpected error: {str(e)}"}
+        finally:
+            self._update(
+                job_id,
+                event='done' if outcome.get('status') == 'succeeded' else 'failed',
+                data=outcome,
+                finished_at=datetime.now().isoformat(),
+                finished=time.time(),
+                **outcome
+            )
+            self._flights.end(key, job_id)
+
+    def get(self, job_id):
+        """Return a snapshot of a job, or None if it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            job = dict(job) if job is not None else None
+        if job is None and self._state is not None:
+            # Queued by another worker process
+            job = self._state.load(job_id)
+        if job is None:
+            return None
+        return {key: value for key, value in job.items() if key != 'finished'}
+
+    def wait_events(self, job_id, after=0, timeout=15.0):
+        """Events of a job with id > after, waiting up to timeout for new ones
+
+        Returns (events, finished), or None if the job is unknown. Jobs
+        queued by another server process are followed through the state
+        store by polling.
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            if job_id in self._jobs:
+                def ready():
+                    job = self._jobs.get(job_id)
+                    return job is None or job['finished'] is not None or len(job['events']) > after
+                self._changed.wait_for(ready, timeout)
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    return job['events'][after:], job['finished'] is not None
+
+        if self._state is None:
+            return None
+        while True:
+            job = self._state.load(job_id)
+            if job is None:
+                return None
+            events = job.get('events', [])
+            finished = job['finished'] is not None
+            if finished or len(events) > after or time.monotonic() >= deadline:
+                return events[after:], finished
+            time.sleep(0.25)
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and optionally wait for running jobs"""
+        self._executor.shutdown(wait=wait)
@@ -1,9 +1,14 @@
-from flask import Blueprint, render_template, request, jsonify
-import subprocess
-import os
-import sys
+from flask import Blueprint, render_template, request, jsonify, current_app, g, Response
+import csv
+import json
+import time
 import logging
 from datetime import datetime
+from metrics import REGISTRY, CONTENT_TYPE
+import vin_check
+from vin_check import validate_many, iter_vin_column
+from report_model import DATA_FIELDS
+from .jobs import QueueFull
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -11,23 +16,174 @@ logger = logging.getLogger(__name__)
 
 main_bp = Blueprint('main', __name__)
 
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'carfax_http_request_seconds', 'HTTP request latency by route', labels=('method', 'route', 'status')
+)
+LAUNCHER_RESULTS = REGISTRY.counter(
+    'carfax_launcher_results_total', 'CARFAX launcher outcomes (success or error code)', labels=('outcome',)
+)
+LAUNCHER_SECONDS = REGISTRY.histogram('carfax_launcher_seconds', 'Time taken to open CARFAX for a VIN')
+
+@main_bp.before_app_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@main_bp.after_app_request
+def record_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by URL rule, not path, so VINs and job ids don't explode the series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method, route=route, status=response.status_code
+        )
+    return response
+
 @main_bp.route('/')
 def index():
     """Render the main page"""
     return render_template('index.html')
 
+def readiness_checks():
+    """Check the cache, result store, job queue and launcher; returns (ready, checks)"""
+    checks = {}
+    
+    try:
+        checks['cache'] = dict(current_app.extensions['vin_cache'].stats(), ok=True)
+    except Exception as e:
+        checks['cache'] = {"ok": False, "error": str(e)}
+    
+    try:
+        current_app.extensions['result_store'].count()
+        checks['result_store'] = {"ok": True}
+    except Exception as e:
+        checks['result_store'] = {"ok": False, "error": str(e)}
+    
+    job_queue = current_app.extensions['job_queue']
+    depth = job_queue.depth()
+    checks['job_queue'] = {"ok": depth < job_queue.max_pending, "depth": depth, "capacity": job_queue.max_pending}
+    
+    launcher = current_app.extensions['launcher']
+    checks['launcher'] = {"ok": bool(launcher.chrome_path), "chrome_path": launcher.chrome_path}
+    
+    if launcher.rate_limiter is not None:
+        try:
+            checks['rate_limit'] = dict(launcher.rate_limiter.stats(), ok=True)
+        except Exception as e:
+            checks['rate_limit'] = {"ok": False, "error": str(e)}
+    
+    return all(check['ok'] for check in checks.values()), checks
+
+def status_body(ready, checks):
+    return {
+        "status": "healthy" if ready else "degraded",
+        "timestamp": datetime.now().isoformat(),
+        "version": "1.0.0",
+        "cache": checks['cache'],
+        "checks": checks
+    }
+
 @main_bp.route('/health')
 def health():
-    """Health check endpoint"""
-    return jsonify({
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
-    })
+    """Liveness check: always 200 while the server answers, dependency details in the body"""
+    ready, checks = readiness_checks()
+    return jsonify(status_body(ready, checks)), 200
+
+@main_bp.route('/ready')
+def ready():
+    """Readiness check: 503 while a dependency is down, Chrome is missing or the job queue is full"""
+    is_ready, checks = readiness_checks()
+    return jsonify(status_body(is_ready, checks)), 200 if is_ready else 503
+
+@main_bp.route('/metrics')
+def metrics():
+    """Prometheus metrics for this server process"""
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
+# User-facing messages for launcher error codes
+LAUNCH_ERRORS = {
+    'chrome_not_found': ("Chrome browser not found. Please install Google Chrome.", 500),
+    'profile_not_found': ("Chrome profile not found. Please check Chrome installation.", 500),
+    'launch_failed': ("Failed to launch CARFAX: Chrome could not be started.", 500),
+    'rate_limited': ("CARFAX is busy right now. Please try again shortly.", 503),
+    'launch_busy': ("Chrome is being restarted. Please try again shortly.", 503),
+}
+
+# Failures that clear up by themselves within seconds; every other one is remembered for the VIN
+TRANSIENT_ERRORS = ('rate_limited', 'launch_busy')
+
+def reject(cache, vin, payload, status_code, error_code=None):
+    """Remember a failed launch for CARFAX_CACHE_NEGATIVE_TTL unless it is transient"""
+    if error_code not in TRANSIENT_ERRORS:
+        cache.put_negative(vin, payload['error'], status=status_code)
+    return payload, status_code
+
+def cached_rejection(cache, vin):
+    """(payload, status_code) of a recently failed launch of this VIN, or None"""
+    entry = cache.get(vin)
+    if entry is None or not entry['negative']:
+        return None
+    logger.info(f"Cache hit for VIN: {vin}")
+    return {"error": entry['value']['error'], "cached": True}, entry['value'].get('status', 400)
+
+def launch_carfax(vin, cache, launcher, progress=None):
+    """Open CARFAX for a VIN with the in-process launcher
+
+    Runs on a job worker thread; progress receives the launcher's
+    events. Returns (payload, status_code).
+    """
+    try:
+        with LAUNCHER_SECONDS.time():
+            result = launcher.open_vin(vin, progress=progress)
+        LAUNCHER_RESULTS.inc(outcome='success' if result['success'] else result['error'])
+        
+        if result['success']:
+            logger.info(f"Successfully launched CARFAX for VIN: {vin}")
+            # A launch opens a tab every time, so its success is never cached
+            response = {
+                "success": True,
+                "message": f"CARFAX launched successfully for VIN: {vin}",
+                "vin": vin,
+                "timestamp": datetime.now().isoformat(),
+                "url": result['url'],
+                "reused_browser": result.get('reused', False),
+                "cached": False
+            }
+            if result.get('warning'):
+                logger.warning(f"CARFAX launch for VIN {vin}: {result['warning']}")
+                response['warning'] = result['warning']
+            return response, 200
+        
+        logger.error(f"Error launching CARFAX for VIN {vin}: {result}")
+        
+        if result['error'] == 'invalid_vin':
+            return reject(cache, vin, {"error": result['message']}, 400)
+        
+        error_message, status_code = LAUNCH_ERRORS.get(
+            result['error'], (f"Failed to launch CARFAX: {result['message']}", 500)
+        )
+        return reject(cache, vin, {
+            "error": error_message,
+            "details": result
+        }, status_code, result['error'])
+        
+    except PermissionError:
+        LAUNCHER_RESULTS.inc(outcome='permission_denied')
+        logger.error("Permission denied when launching Chrome")
+        return reject(cache, vin, {
+            "error": "Permission denied. Please run the application as administrator."
+        }, 500)
+    except Exception as e:
+        LAUNCHER_RESULTS.inc(outcome='exception')
+        logger.error(f"Exception launching CARFAX: {e}")
+        return {
+            "error": f"Unexpected error launching CARFAX: {str(e)}"
+        }, 500
 
 @main_bp.route('/api/vin', methods=['POST'])
 def submit_vin():
-    """Handle VIN submission and launch CARFAX"""
+    """Handle VIN submission and queue a CARFAX launch job"""
     try:
         data = request.get_json()
         if not data:
@@ -38,122 +194,309 @@ def submit_vin():
         if not vin:
             return jsonify({"error": "VIN is required"}), 400
         
-        # Validate VIN format
-        if len(vin) != 17:
-            return jsonify({"error": "VIN must be exactly 17 characters"}), 400
+        # Reject malformed VINs before any cache, queue or browser work
+        is_valid, error = vin_check.validate(vin)
+        if not is_valid:
+            return jsonify({"error": error}), 400
         
         logger.info(f"Received VIN request: {vin}")
         
-        # Path to the CARFAX launcher script
-        script_path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), 
-            'scripts', 
-            'carfax_launcher.py'
-        )
-        
-        if not os.path.exists(script_path):
-            logger.error(f"CARFAX launcher script not found at: {script_path}")
-            return jsonify({"error": "CARFAX launcher script not found"}), 500
+        # Recently failed launches are answered from the cache unless a refresh is asked for
+        cache = current_app.extensions['vin_cache']
+        if not data.get('refresh'):
+            cached = cached_rejection(cache, vin)
+            if cached is not None:
+                payload, status_code = cached
+                return jsonify(payload), status_code
         
-        # Launch the CARFAX script with VIN
         try:
-            # Try the cross-platform version first
-            cross_platform_script = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)), 
-                'scripts', 
-                'carfax_launcher_cross_platform.py'
+            job_id, coalesced = current_app.extensions['job_queue'].submit(
+                vin, launch_carfax, vin, cache, current_app.extensions['launcher']
             )
-            
-            # Use cross-platform script if available, otherwise use original
-            script_to_use = cross_platform_script if os.path.exists(cross_platform_script) else script_path
-            
-            result = subprocess.run([
-                sys.executable, 
-                script_to_use, 
-                vin
-            ], capture_output=True, text=True, timeout=30, check=False)
-            
-            if result.returncode == 0:
-                logger.info(f"Successfully launched CARFAX for VIN: {vin}")
-                return jsonify({
-                    "success": True,
-                    "message": f"CARFAX launched successfully for VIN: {vin}",
-                    "vin": vin,
-                    "timestamp": datetime.now().isoformat(),
-                    "script_used": os.path.basename(script_to_use)
-                })
-            else:
-                # Provide detailed error information
-                error_details = {
-                    "return_code": result.returncode,
-                    "stdout": result.stdout.strip() if result.stdout else "",
-                    "stderr": result.stderr.strip() if result.stderr else "",
-                    "script_path": script_to_use
-                }
-                
-                logger.error(f"Error launching CARFAX: {error_details}")
-                
-                # Provide user-friendly error message
-                if "Chrome not found" in result.stderr:
-                    error_message = "Chrome browser not found. Please install Google Chrome."
-                elif "Profile directory not found" in result.stderr:
-                    error_message = "Chrome profile not found. Please check Chrome installation."
-                elif "Permission denied" in result.stderr:
-                    error_message = "Permission denied. Please run as administrator."
-                else:
-                    error_message = f"Failed to launch CARFAX: {result.stderr.strip()}"
-                
-                return jsonify({
-                    "error": error_message,
-                    "details": error_details
-                }), 500
-                
-        except subprocess.TimeoutExpired:
-            logger.warning(f"Timeout launching CARFAX for VIN: {vin}")
-            return jsonify({
-                "error": "Timeout launching CARFAX. The script took too long to execute."
-            }), 500
-        except FileNotFoundError:
-            logger.error(f"Script not found: {script_to_use}")
-            return jsonify({
-                "error": "CARFAX launcher script not found. Please check installation."
-            }), 500
-        except PermissionError:
-            logger.error("Permission denied when launching script")
-            return jsonify({
-                "error": "Permission denied. Please run the application as administrator."
-            }), 500
-        except Exception as e:
-            logger.error(f"Exception launching CARFAX: {e}")
-            return jsonify({
-                "error": f"Unexpected error launching CARFAX: {str(e)}"
-            }), 500
+        except QueueFull as e:
+            logger.warning(f"Job queue full, rejecting VIN {vin}: {e}")
+            response = jsonify({"error": "Server is busy. Please try again shortly."})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        
+        if coalesced:
+            logger.info(f"Joined in-flight CARFAX job {job_id} for VIN: {vin}")
+        else:
+            logger.info(f"Queued CARFAX job {job_id} for VIN: {vin}")
+        return jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "vin": vin,
+            "coalesced": coalesced,
+            "status_url": f"/api/jobs/{job_id}",
+            "events_url": f"/api/jobs/{job_id}/events"
+        }), 202
             
     except Exception as e:
         logger.error(f"Error in submit_vin: {e}")
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+@main_bp.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Report the status and result of a queued VIN job"""
+    job = current_app.extensions['job_queue'].get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+def sse(event, data, event_id=None):
+    """One server-sent event"""
+    message = f"id: {event_id}\n" if event_id is not None else ""
+    return message + f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def job_event_stream(job_queue, job_id, after=0, heartbeat=15.0, id_prefix=''):
+    """Relay a job's events as SSE until it finishes
+
+    Event ids are id_prefix plus the job's event number. A client that
+    reconnects after it already got the final event is sent that event
+    again, so it never sees an empty stream it would reconnect to.
+    """
+    sent = False
+    while True:
+        update = job_queue.wait_events(job_id, after=after, timeout=heartbeat)
+        if update is None:
+            yield sse('failed', {"error": "Job not found"})
+            return
+        events, finished = update
+        if finished and not events and not sent and after > 0:
+            replay = job_queue.wait_events(job_id, after=after - 1, timeout=0)
+            events = replay[0] if replay is not None else []
+        for event in events:
+            yield sse(event['event'], dict(event['data'], time=event['time']), f"{id_prefix}{event['id']}")
+            after = event['id']
+            sent = True
+        if finished:
+            return
+        if not events:
+            # Comment line: keeps proxies from closing an idle stream
+            yield ": keep-alive\n\n"
+
+def event_stream_response(stream):
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def last_event_id():
+    try:
+        return int(request.headers.get('Last-Event-ID') or request.args.get('after', 0))
+    except ValueError:
+        return 0
+
+def vin_stream_resume_point():
+    """(job id, last event number) from a reconnecting VIN stream's Last-Event-ID, or (None, 0)"""
+    job_id, _, number = (request.headers.get('Last-Event-ID') or '').partition(':')
+    try:
+        return (job_id, int(number)) if job_id else (None, 0)
+    except ValueError:
+        return None, 0
+
+@main_bp.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent progress events for a queued VIN job"""
+    job_queue = current_app.extensions['job_queue']
+    return event_stream_response(job_event_stream(job_queue, job_id, after=last_event_id()))
+
+@main_bp.route('/api/vin/<vin>/events')
+def vin_events(vin):
+    """Validate, queue and follow a CARFAX launch over one SSE connection
+
+    Streams validated, queued, running, launcher_started, page_opened
+    and finally done or failed. ?refresh=1 bypasses the cache of
+    failed launches. Event ids name the job, so a browser that
+    reconnects (EventSource does so on its own when the stream drops)
+    follows that same job instead of launching CARFAX again.
+    """
+    vin = vin.strip().upper()
+    refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+    resume_job, resume_after = vin_stream_resume_point()
+    cache = current_app.extensions['vin_cache']
+    job_queue = current_app.extensions['job_queue']
+    launcher = current_app.extensions['launcher']
+    
+    def stream():
+        if resume_job is not None:
+            job = job_queue.get(resume_job)
+            if job is not None and job['vin'] == vin:
+                # Finished jobs answer with their final result instead of a second launch
+                logger.info(f"Resuming CARFAX job {resume_job} stream for VIN: {vin}")
+                yield from job_event_stream(job_queue, resume_job, after=resume_after, id_prefix=f"{resume_job}:")
+                return
+        
+        is_valid, error = vin_check.validate(vin)
+        if not is_valid:
+            yield sse('failed', {"error": error})
+            return
+        yield sse('validated', {"vin": vin})
+        
+        if not refresh:
+            cached = cached_rejection(cache, vin)
+            if cached is not None:
+                yield sse('failed', cached[0])
+                return
+        
+        try:
+            job_id, coalesced = job_queue.submit(vin, launch_carfax, vin, cache, launcher)
+        except QueueFull:
+            yield sse('failed', {"error": "Server is busy. Please try again shortly.", "retry_after": 5})
+            return
+        
+        logger.info(f"Streaming CARFAX job {job_id} for VIN: {vin}")
+        yield sse('submitted', {"job_id": job_id, "coalesced": coalesced, "status_url": f"/api/jobs/{job_id}"})
+        yield from job_event_stream(job_queue, job_id, id_prefix=f"{job_id}:")
+    
+    return event_stream_response(stream())
+
+def report_fields():
+    """Data fields named by ?fields=a,b, or None for the whole report"""
+    value = request.args.get('fields')
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in DATA_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown fields {', '.join(unknown)}; expected some of {', '.join(DATA_FIELDS)}")
+    return fields
+
+@main_bp.route('/api/reports/<vin>')
+def vin_reports(vin):
+    """Latest stored report for a VIN plus a summary of earlier scrapes"""
+    try:
+        store = current_app.extensions['result_store']
+        try:
+            limit = min(int(request.args.get('limit', 20)), 500)
+        except ValueError:
+            return jsonify({"error": "limit must be a number"}), 400
+        fields = report_fields()
+        
+        latest = store.latest(vin, fields=fields)
+        history = store.history(vin, limit=limit)
+        if latest is None and not history:
+            return jsonify({"error": f"No reports stored for VIN: {vin.upper()}"}), 404
+        
+        return jsonify({
+            "vin": vin.strip().upper(),
+            "latest": latest,
+            "history": history
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Error reading reports for {vin}: {e}")
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@main_bp.route('/api/reports/<vin>/changes')
+def vin_report_changes(vin):
+    """Sections that changed between two scrapes of a VIN (default: the last two)"""
+    try:
+        changes = current_app.extensions['result_store'].changes(
+            vin,
+            from_id=request.args.get('from'),
+            to_id=request.args.get('to')
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Error diffing reports for {vin}: {e}")
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+    
+    if changes is None:
+        return jsonify({"error": f"No reports stored for VIN: {vin.upper()}"}), 404
+    return jsonify(changes)
+
+@main_bp.route('/api/reports')
+def list_reports():
+    """Reports scraped since a point in time (ISO-8601 or epoch seconds)"""
+    since = request.args.get('since')
+    if not since:
+        return jsonify({"error": "since is required"}), 400
+    
+    try:
+        limit = min(int(request.args.get('limit', 100)), 1000)
+        reports = current_app.extensions['result_store'].since(
+            since,
+            until=request.args.get('until'),
+            status=request.args.get('status'),
+            vin=request.args.get('vin'),
+            limit=limit,
+            after_id=request.args.get('after_id'),
+            include_data=request.args.get('include_data', '').lower() in ('1', 'true', 'yes'),
+            fields=report_fields()
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Error listing reports: {e}")
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+    
+    return jsonify({
+        "reports": reports,
+        "count": len(reports),
+        "next_after_id": reports[-1]['id'] if len(reports) == limit else None
+    })
+
 @main_bp.route('/api/vin/validate', methods=['POST'])
 def validate_vin():
-    """Validate VIN format"""
+    """Validate a VIN and decode its manufacturer and model year"""
     try:
         data = request.get_json()
-        vin = data.get('vin', '').strip().upper()
+        decoded = vin_check.decode(data.get('vin', ''))
         
-        if not vin:
-            return jsonify({"valid": False, "error": "VIN is required"})
+        if not decoded['valid']:
+            return jsonify({"valid": False, "error": decoded['error']})
         
-        if len(vin) != 17:
-            return jsonify({"valid": False, "error": "VIN must be exactly 17 characters"})
+        return jsonify(decoded)
         
-        # Check for invalid characters
-        invalid_chars = ['I', 'O', 'Q']
-        for char in invalid_chars:
-            if char in vin:
-                return jsonify({"valid": False, "error": f"VIN cannot contain: {char}"})
+    except Exception as e:
+        logger.error(f"Error validating VIN: {e}")
+        return jsonify({"valid": False, "error": "Validation error"}), 500 
+
+@main_bp.route('/api/vin/validate/batch', methods=['POST'])
+def validate_vin_batch():
+    """Validate many VINs in one request
+
+    Accepts JSON {"vins": [...]} or a CSV/text body with the VIN in the
+    first column. Returns per-row results; ?invalid_only=1 drops valid rows
+    and ?check_digit=0 skips the check-digit test.
+    """
+    try:
+        verify_check_digit = request.args.get('check_digit', '1').lower() not in ('0', 'false', 'no')
+        invalid_only = request.args.get('invalid_only', '').lower() in ('1', 'true', 'yes')
+        
+        if request.is_json:
+            data = request.get_json(silent=True) or {}
+            vins = data.get('vins')
+            if not isinstance(vins, list):
+                return jsonify({"error": "vins must be a list"}), 400
+            rows = None
+            vins = [str(vin) if vin is not None else '' for vin in vins]
+        else:
+            pairs = list(iter_vin_column(csv.reader(request.get_data(as_text=True).splitlines())))
+            rows = [row for row, _ in pairs]
+            vins = [vin for _, vin in pairs]
+        
+        limit = current_app.config['VALIDATE_BATCH_MAX']
+        if len(vins) > limit:
+            return jsonify({"error": f"At most {limit} VINs per request"}), 413
         
-        return jsonify({"valid": True, "vin": vin})
+        results = validate_many(vins, verify_check_digit, rows)
+        valid_count = sum(1 for result in results if result['valid'])
+        if invalid_only:
+            results = [result for result in results if not result['valid']]
+        
+        return jsonify({
+            "total": len(vins),
+            "valid": valid_count,
+            "invalid": len(vins) - valid_count,
+            "results": results
+        })
         
     except Exception as e:
-        logger.error(f"Error validating VIN: {e}")
-        return jsonify({"valid": False, "error": "Validation error"}), 500 
\ No newline at end of file
+        logger.error(f"Error validating VIN batch: {e}")
+        return jsonify({"error": "Validation error"}), 500
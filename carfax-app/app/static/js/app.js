@@ -212,22 +212,18 @@ class CarfaxApp {
         // Show loading state
         this.setLoadingState(true);
         this.showLoadingOverlay();
+        this.resetProgress();
         
         try {
-            const response = await fetch('/api/vin', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ vin })
-            });
-
-            const data = await response.json();
+            // One long-lived event stream where supported, POST + polling otherwise
+            const outcome = window.EventSource
+                ? await this.streamVin(vin)
+                : await this.submitAndPoll(vin);
 
-            if (response.ok) {
-                this.showSuccess(data);
+            if (outcome.success) {
+                this.showSuccess(outcome.result);
             } else {
-                this.showError(data.error || 'Failed to launch CARFAX');
+                this.showError(outcome.error || 'Failed to launch CARFAX');
             }
         } catch (error) {
             console.error('Error:', error);
@@ -238,6 +234,112 @@ class CarfaxApp {
         }
     }
 
+    streamVin(vin, timeout = 60000) {
+        const labels = {
+            validated: 'VIN validated',
+            submitted: 'Request accepted',
+            queued: 'Waiting for a free worker',
+            running: 'Starting launch',
+            rate_limited: 'Waited for a CARFAX request slot',
+            launcher_started: 'Opening Chrome',
+            page_opened: 'CARFAX page opened'
+        };
+
+        return new Promise(resolve => {
+            const source = new EventSource(`/api/vin/${encodeURIComponent(vin)}/events`);
+            const finish = (outcome) => {
+                clearTimeout(timer);
+                source.close();
+                resolve(outcome);
+            };
+            const timer = setTimeout(
+                () => finish({ success: false, error: 'Timed out waiting for CARFAX to launch' }),
+                timeout
+            );
+
+            Object.keys(labels).forEach(name => {
+                source.addEventListener(name, () => this.showProgress(labels[name]));
+            });
+            // Close on the final event, before the server ends the stream, so the browser doesn't reconnect
+            source.addEventListener('done', (e) => {
+                source.close();
+                finish({ success: true, result: JSON.parse(e.data).result });
+            });
+            source.addEventListener('failed', (e) => {
+                source.close();
+                finish({ success: false, error: JSON.parse(e.data).error });
+            });
+            source.onerror = () => {
+                // The browser reconnects on its own unless the stream is closed for good
+                if (source.readyState === EventSource.CLOSED) {
+                    finish({ success: false, error: 'Connection lost. Please try again.' });
+                }
+            };
+        });
+    }
+
+    async submitAndPoll(vin) {
+        const response = await fetch('/api/vin', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ vin })
+        });
+
+        const data = await response.json();
+
+        if (response.status === 202) {
+            // Launch was queued: poll the job until it finishes
+            const job = await this.pollJob(data.status_url);
+            return job.status === 'succeeded'
+                ? { success: true, result: job.result }
+                : { success: false, error: job.error };
+        }
+        return response.ok
+            ? { success: true, result: data }
+            : { success: false, error: data.error };
+    }
+
+    async pollJob(statusUrl, interval = 1000, timeout = 60000) {
+        const deadline = Date.now() + timeout;
+
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, interval));
+
+            const response = await fetch(statusUrl);
+            const job = await response.json();
+
+            if (!response.ok) {
+                return { status: 'failed', error: job.error || 'Job not found' };
+            }
+            if (job.status === 'succeeded' || job.status === 'failed') {
+                return job;
+            }
+        }
+
+        return { status: 'failed', error: 'Timed out waiting for CARFAX to launch' };
+    }
+
+    resetProgress() {
+        const steps = this.loadingOverlay.querySelector('.progress-steps');
+        if (steps) {
+            steps.innerHTML = '';
+        }
+    }
+
+    showProgress(label) {
+        let steps = this.loadingOverlay.querySelector('.progress-steps');
+        if (!steps) {
+            steps = document.createElement('ul');
+            steps.className = 'progress-steps';
+            (this.loadingOverlay.querySelector('.loading-content') || this.loadingOverlay).appendChild(steps);
+        }
+        const step = document.createElement('li');
+        step.textContent = label;
+        steps.appendChild(step);
+    }
+
     setLoadingState(loading) {
         this.submitBtn.disabled = loading;
         this.vinInput.disabled = loading;
@@ -6,7 +6,11 @@ Professional and Fast VIN Lookup Tool
 
 import os
 import sys
+import argparse
+import multiprocessing
+import shutil
 from app import create_app
+from metrics import REGISTRY
 
 def get_local_ip():
     """Get local IP address for network access"""
@@ -20,19 +24,100 @@ def get_local_ip():
     except Exception:
         return "127.0.0.1"
 
+def production_options(app, host, port):
+    """Gunicorn settings for production mode, overridable from the environment"""
+    default_workers = min(multiprocessing.cpu_count() * 2 + 1, 8)
+    return {
+        'bind': f"{host}:{port}",
+        'workers': int(os.environ.get('WEB_CONCURRENCY', default_workers)),
+        'worker_class': 'gthread',
+        'threads': int(os.environ.get('WORKER_THREADS', 8)),
+        'keepalive': int(os.environ.get('KEEPALIVE', 5)),
+        'timeout': int(os.environ.get('WORKER_TIMEOUT', 60)),
+        # Time a stopping worker gets to finish in-flight requests and VIN jobs
+        'graceful_timeout': int(os.environ.get('GRACEFUL_TIMEOUT', 60)),
+        # Recycle workers periodically; jitter keeps them from restarting together
+        'max_requests': int(os.environ.get('MAX_REQUESTS', 2000)),
+        'max_requests_jitter': int(os.environ.get('MAX_REQUESTS_JITTER', 200)),
+        # Load the app once in the master so workers fork with Chrome discovery done
+        'preload_app': True,
+        'accesslog': '-',
+        'errorlog': '-',
+        # Every worker shares its counters so /metrics reports the whole server
+        'post_fork': lambda server, worker: REGISTRY.enable_multiprocess(metrics_dir()),
+        'worker_exit': lambda server, worker: drain_jobs(app),
+    }
+
+def metrics_dir():
+    """Directory where production workers share their metrics"""
+    return os.environ.get('CARFAX_METRICS_DIR', os.path.join(os.path.expanduser('~'), '.carfax', 'metrics'))
+
+def drain_jobs(app):
+    """Let a stopping worker finish its queued VIN jobs before it exits"""
+    job_queue = app.extensions.get('job_queue')
+    if job_queue is not None:
+        job_queue.shutdown(wait=True)
+    REGISTRY.save_snapshot()
+
+def serve_production(app, host, port):
+    """Serve with pre-forked Gunicorn workers
+
+    SIGHUP restarts workers gracefully; SIGTERM/SIGINT stop accepting
+    connections and wait up to graceful_timeout for in-flight requests.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ Production mode needs gunicorn: pip install gunicorn")
+        sys.exit(1)
+
+    class CarfaxServer(BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    # Counters restart with the server, not with each worker
+    shutil.rmtree(metrics_dir(), ignore_errors=True)
+    
+    options = production_options(app, host, port)
+    print(f"🏭 Production mode: {options['workers']} workers x {options['threads']} threads")
+    CarfaxServer(app, options).run()
+
 def main():
     """Main application entry point"""
+    parser = argparse.ArgumentParser(description='CARFAX VIN Checker')
+    parser.add_argument('--prod', action='store_true',
+                        help='Serve with pre-forked Gunicorn workers (or set SERVE_MODE=production)')
+    args = parser.parse_args()
+    production = args.prod or os.environ.get('SERVE_MODE', '').lower() == 'production'
+
+    if production:
+        # Job status must be visible to every worker process
+        os.environ.setdefault(
+            'CARFAX_JOB_STATE_PATH',
+            os.path.join(os.path.expanduser('~'), '.carfax', 'jobs.sqlite3')
+        )
+
     # Create Flask app
     app = create_app()
-    
+
     # Get configuration
     port = int(os.environ.get('PORT', 8080))
     host = os.environ.get('HOST', '0.0.0.0')
-    debug = os.environ.get('DEBUG', 'True').lower() == 'true'
-    
+    debug = not production and os.environ.get('DEBUG', 'True').lower() == 'true'
+
     # Get local IP for network access
     local_ip = get_local_ip()
-    
+
     print("🚀 Starting CARFAX VIN Checker...")
     print("=" * 50)
     print(f"📍 Local Access:  http://localhost:{port}")
@@ -41,7 +126,11 @@ def main():
     print(f"🌐 Host: {host}:{port}")
     print("💡 Press Ctrl+C to stop the server")
     print("=" * 50)
-    
+
+    if production:
+        serve_production(app, host, port)
+        return
+
     # Run the application
     app.run(
         host=host,
@@ -51,4 +140,4 @@ def main():
     )
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Static Asset Build
+Minify, fingerprint and precompress the app's JS and CSS
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+
+try:
+    import brotli
+except ImportError:  # .br files are skipped without it
+    brotli = None
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(APP_DIR, 'app', 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+
+ASSETS = ['js/app.js', 'css/style.css']
+
+
+def minify_css(source):
+    """Drop comments and whitespace that CSS doesn't need"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    # Spaces before ':' are left alone; "a :hover" and "a:hover" differ
+    source = re.sub(r'\s*([{};,])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    """Conservative JS minification: indentation, blank lines and comments outside code
+
+    Only // lines and /* */ comments that start a line (or continue one)
+    are removed, and only the comment span itself; code after */ stays.
+    Nothing else inside a line is rewritten, so strings, regexes and
+    template literals keep their meaning without a real JS parser.
+    """
+    lines = []
+    in_block_comment = False
+    for line in source.splitlines():
+        stripped = line.strip()
+        while True:
+            if in_block_comment:
+                end = stripped.find('*/')
+                if end < 0:
+                    stripped = ''
+                    break
+                in_block_comment = False
+                stripped = stripped[end + 2:].strip()
+            elif stripped.startswith('/*'):
+                in_block_comment = True
+                stripped = stripped[2:]
+            else:
+                break
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build_asset(name, static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Build one asset; returns its fingerprinted path relative to static_dir"""
+    base, ext = os.path.splitext(os.path.basename(name))
+    with open(os.path.join(static_dir, name), 'r', encoding='utf-8') as f:
+        source = f.read()
+    content = MINIFIERS.get(ext, lambda text: text)(source).encode('utf-8')
+    digest = hashlib.sha256(content).hexdigest()[:12]
+
+    filename = f"{base}.{digest}{ext}"
+    path = os.path.join(dist_dir, filename)
+
+    # Remove earlier builds of this asset
+    stale = re.compile(rf'^{re.escape(base)}\.[0-9a-f]{{12}}{re.escape(ext)}(\.gz|\.br)?$')
+    for existing in os.listdir(dist_dir):
+        if stale.match(existing) and not existing.startswith(filename):
+            os.remove(os.path.join(dist_dir, existing))
+
+    with open(path, 'wb') as f:
+        f.write(content)
+    # mtime=0 keeps the .gz bytes identical between builds of the same content
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+
+    print(f"✅ {name}: {len(source.encode('utf-8'))} -> {len(content)} bytes -> dist/{filename}")
+    return f"dist/{filename}"
+
+
+def build(assets=ASSETS, static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Build every asset and write the manifest; returns the manifest dict"""
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {name: build_asset(name, static_dir, dist_dir) for name in assets}
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    if brotli is None:
+        print("⚠️ brotli not installed, only .gz variants were written (pip install brotli)")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build fingerprinted, precompressed static assets')
+    parser.add_argument('assets', nargs='*', default=ASSETS, help='Paths relative to app/static')
+    args = parser.parse_args()
+    build(args.assets)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -5,6 +5,17 @@ import sys
 import argparse
 from pathlib import Path
 
+# VIN rules are shared with the scraper and the Flask app
+SCRAPER_DIR = os.environ.get(
+    'CARFAX_SCRAPER_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'scraper')
+)
+if SCRAPER_DIR not in sys.path:
+    sys.path.insert(0, SCRAPER_DIR)
+
+import vin_check
+from rate_limiter import create_rate_limiter
+
 def check_chrome_installation(chrome_path):
     """Check if Chrome exists in the specified path"""
     if os.path.exists(chrome_path):
@@ -28,17 +39,8 @@ def kill_chrome_processes():
 
 def validate_vin(vin):
     """Validate VIN number"""
-    if not vin or len(vin) != 17:
-        return False, "VIN must be 17 characters"
-    
-    # Check for valid characters
-    valid_chars = set('ABCDEFGHJKLMNPRSTUVWXYZ0123456789')
-    vin_chars = set(vin.upper())
-    
-    if not vin_chars.issubset(valid_chars):
-        return False, "VIN contains invalid characters"
-    
-    return True, "VIN is valid"
+    is_valid, error = vin_check.validate(vin)
+    return is_valid, error or "VIN is valid"
 
 def launch_chrome_with_profile(chrome_path, user_profile, profile_directory="Default", start_url="chrome://newtab/"):
     """Launch Chrome with specified profile"""
@@ -95,6 +97,14 @@ def main():
     parser.add_argument('vin', nargs='?', help='Vehicle VIN number')
     args = parser.parse_args()
     
+    # Validate VIN before touching Chrome
+    if args.vin:
+        is_valid, message = validate_vin(args.vin)
+        if not is_valid:
+            print(f"{message}")
+            return False
+        args.vin = vin_check.normalize(args.vin)
+    
     # Chrome path
     chrome_path = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
     
@@ -132,12 +142,6 @@ def main():
     
     # Determine start URL
     if args.vin:
-        # Validate VIN
-        is_valid, message = validate_vin(args.vin)
-        if not is_valid:
-            print(f"{message}")
-            return False
-        
         print(f"VIN entered: {args.vin}")
         # Open CARFAX VHR page with VIN
         start_url = f"https://www.carfaxonline.com/vhr/{args.vin}"
@@ -147,6 +151,11 @@ def main():
         start_url = "https://www.carfaxonline.com/"
         print("No VIN specified, opening main CARFAX")
     
+    # Take a slot from the host-wide CARFAX request budget
+    rate_limiter = create_rate_limiter()
+    if rate_limiter is not None:
+        rate_limiter.acquire('interactive')
+    
     # Kill existing Chrome processes
     kill_chrome_processes()
     
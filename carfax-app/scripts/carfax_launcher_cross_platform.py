@@ -8,15 +8,66 @@ import subprocess
 import time
 import os
 import sys
+import shutil
 import argparse
 import platform
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
 from pathlib import Path
 
+# VIN rules are shared with the scraper and the Flask app
+SCRAPER_DIR = os.environ.get(
+    'CARFAX_SCRAPER_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'scraper')
+)
+if SCRAPER_DIR not in sys.path:
+    sys.path.insert(0, SCRAPER_DIR)
+
+import vin_check
+from rate_limiter import RateLimitTimeout, create_rate_limiter
+from host_lock import HostLock, HostLockTimeout
+
+# Chrome's DevTools HTTP endpoint; later VINs open as tabs through it
+DEFAULT_DEBUG_PORT = int(os.environ.get('CARFAX_DEBUG_PORT', 9222))
+
+# Chrome ignores --remote-debugging-port for its default user data dir, so
+# the debuggable browser gets a profile of its own (log in to CARFAX there once)
+DEFAULT_DEBUG_PROFILE_DIR = os.environ.get(
+    'CARFAX_DEBUG_PROFILE_DIR',
+    os.path.join(os.path.expanduser('~'), '.carfax', 'chrome-debug-profile')
+)
+
+# Serializes Chrome restarts across every server worker process on this host
+DEFAULT_LAUNCH_LOCK_PATH = os.environ.get(
+    'CARFAX_LAUNCH_LOCK_PATH',
+    os.path.join(os.path.expanduser('~'), '.carfax', 'chrome_launch.lock')
+)
+
 class ChromeLauncher:
-    def __init__(self):
+    def __init__(self, debug_port=DEFAULT_DEBUG_PORT, rate_limiter=None, rate_limit_timeout=30.0,
+                 debug_profile_dir=DEFAULT_DEBUG_PROFILE_DIR, launch_lock_path=DEFAULT_LAUNCH_LOCK_PATH):
         self.system = platform.system().lower()
+        self.debug_port = debug_port
+        self.debug_profile_dir = debug_profile_dir
+        # Shared with the scrapers on this host so CARFAX sees one request rate
+        self.rate_limiter = rate_limiter
+        self.rate_limit_timeout = rate_limit_timeout
         self.chrome_paths = self._get_chrome_paths()
         self.user_profile_paths = self._get_user_profile_paths()
+        self.chrome_path = None
+        self.user_profile = None
+        self._discovered = False
+        self._launch_lock = HostLock(launch_lock_path)
+    
+    def discover(self, chrome_path=None, user_profile=None):
+        """Resolve Chrome and profile paths once and remember them"""
+        if not self._discovered or chrome_path or user_profile:
+            self.chrome_path = chrome_path or self.find_chrome()
+            self.user_profile = user_profile or self.find_user_profile()
+            self._discovered = True
+        return self.chrome_path, self.user_profile
     
     def _get_chrome_paths(self):
         """Get Chrome executable paths for different systems"""
@@ -70,19 +121,8 @@ class ChromeLauncher:
             if os.path.exists(expanded_path):
                 return expanded_path
         
-        # Try to find Chrome using system commands
-        try:
-            if self.system == "windows":
-                result = subprocess.run(['where', 'chrome'], capture_output=True, text=True)
-            else:
-                result = subprocess.run(['which', 'google-chrome'], capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                return result.stdout.strip().split('\n')[0]
-        except:
-            pass
-        
-        return None
+        # Try to find Chrome on PATH
+        return shutil.which('chrome' if self.system == "windows" else 'google-chrome')
     
     def find_user_profile(self):
         """Find user profile directory"""
@@ -92,37 +132,54 @@ class ChromeLauncher:
                 return expanded_path
         return None
     
-    def kill_chrome_processes(self):
-        """Kill Chrome processes based on system"""
+    def kill_chrome_processes(self, user_data_dir=None):
+        """Kill Chrome processes based on system; returns True unless killing failed
+
+        With user_data_dir, only the Chrome running on that profile is
+        killed and the user's own browser is left alone. Finding no
+        Chrome to kill counts as success.
+        """
+        # Exit code meaning nothing matched, per tool
+        nothing_matched = 1
         try:
-            if self.system == "windows":
-                subprocess.run(["taskkill", "/f", "/im", "chrome.exe"], 
-                             capture_output=True, check=False)
+            if user_data_dir:
+                if self.system == "windows":
+                    pattern = user_data_dir.replace("'", "''")
+                    command = ["powershell", "-NoProfile", "-Command",
+                               "Get-CimInstance Win32_Process -Filter \"Name='chrome.exe'\" | "
+                               f"Where-Object {{ $_.CommandLine -like '*{pattern}*' }} | "
+                               "Invoke-CimMethod -MethodName Terminate"]
+                else:
+                    # '--' so pkill doesn't read the pattern as one of its own options
+                    command = ["pkill", "-f", "--", f"--user-data-dir={user_data_dir}"]
+            elif self.system == "windows":
+                command = ["taskkill", "/f", "/im", "chrome.exe"]
+                nothing_matched = 128
             elif self.system == "darwin":  # macOS
-                subprocess.run(["pkill", "-f", "Google Chrome"], 
-                             capture_output=True, check=False)
+                command = ["pkill", "-f", "Google Chrome"]
             else:  # Linux
-                subprocess.run(["pkill", "-f", "chrome"], 
-                             capture_output=True, check=False)
+                command = ["pkill", "-f", "chrome"]
             
-            print("Killed existing Chrome processes")
-            time.sleep(2)
+            result = subprocess.run(command, capture_output=True, text=True, check=False)
         except Exception as e:
             print(f"Warning: Could not kill Chrome processes: {e}")
+            return False
+        
+        if result.returncode == nothing_matched:
+            print("No Chrome processes to kill")
+            return True
+        if result.returncode != 0:
+            print(f"Warning: Could not kill Chrome processes: {(result.stderr or '').strip() or result.returncode}")
+            return False
+        print("Killed existing Chrome processes")
+        # Give Chrome time to release its profile lock
+        time.sleep(2)
+        return True
     
     def validate_vin(self, vin):
         """Validate VIN number"""
-        if not vin or len(vin) != 17:
-            return False, "VIN must be 17 characters"
-        
-        # Check for valid characters
-        valid_chars = set('ABCDEFGHJKLMNPRSTUVWXYZ0123456789')
-        vin_chars = set(vin.upper())
-        
-        if not vin_chars.issubset(valid_chars):
-            return False, "VIN contains invalid characters"
-        
-        return True, "VIN is valid"
+        is_valid, error = vin_check.validate(vin)
+        return is_valid, error or "VIN is valid"
     
     def launch_chrome(self, chrome_path, user_profile, profile_directory="Default", start_url="chrome://newtab/"):
         """Launch Chrome with specified profile"""
@@ -138,6 +195,10 @@ class ChromeLauncher:
                 '--disable-features=VizDisplayCompositor'
             ]
             
+            # Keep the browser reachable so later VINs can reuse it
+            if self.debug_port:
+                args.append(f'--remote-debugging-port={self.debug_port}')
+            
             # Add system-specific arguments
             if self.system == "darwin":  # macOS
                 args.append('--disable-gpu-sandbox')
@@ -154,6 +215,49 @@ class ChromeLauncher:
             print(f"Error launching Chrome: {e}")
             return False
     
+    def _devtools_url(self, path):
+        return f"http://127.0.0.1:{self.debug_port}{path}"
+    
+    def devtools_alive(self, timeout=0.5):
+        """Check whether a Chrome we launched is still answering on the debug port"""
+        if not self.debug_port:
+            return False
+        try:
+            with urllib.request.urlopen(self._devtools_url('/json/version'), timeout=timeout) as response:
+                return response.status == 200
+        except (urllib.error.URLError, OSError, ValueError):
+            return False
+    
+    def wait_for_devtools(self, timeout=5.0):
+        """Wait for a freshly launched Chrome to open its debug port"""
+        if not self.debug_port:
+            return False
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.devtools_alive():
+                return True
+            time.sleep(0.1)
+        return False
+    
+    def open_tab(self, url, timeout=2.0):
+        """Open url in a new tab of the running Chrome; False if unreachable"""
+        if not self.debug_port:
+            return False
+        endpoint = self._devtools_url('/json/new?' + urllib.parse.quote(url, safe=''))
+        # Current Chrome requires PUT here; older versions only accept GET
+        for method in ('PUT', 'GET'):
+            try:
+                request = urllib.request.Request(endpoint, method=method)
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    if response.status == 200:
+                        return True
+            except urllib.error.HTTPError as e:
+                if e.code != 405:
+                    return False
+            except (urllib.error.URLError, OSError, ValueError):
+                return False
+        return False
+    
     def create_vin_search_script(self, vin):
         """Create JavaScript to search for VIN on CARFAX"""
         script = f"""
@@ -179,6 +283,107 @@ class ChromeLauncher:
         """
         return script
 
+    def open_vin(self, vin=None, fresh=False, progress=None, priority='interactive'):
+        """Open CARFAX for a VIN (or the CARFAX home page without one)
+
+        If a Chrome started by this launcher is still listening on the
+        debug port the page opens as a new tab; otherwise (or with fresh)
+        Chrome is restarted. With a debug port, that Chrome runs on
+        debug_profile_dir; without one, on the user's profile resolved by
+        discover(). Returns a dict with 'success', 'url', 'reused', a
+        'warning' when a restarted Chrome never opened its debug port,
+        and, on failure,
+        an 'error' code
+        ('chrome_not_found', 'profile_not_found', 'invalid_vin',
+        'rate_limited', 'launch_busy', 'launch_failed') plus a
+        human-readable 'message'.
+        With a rate limiter, the page is only opened once the priority
+        lane gets a request slot.
+        progress, if given, is called as progress(event, **data) with
+        'launcher_started' and 'page_opened' as the launch proceeds.
+        """
+        progress = progress or (lambda event, **data: None)
+        
+        # A bad VIN is rejected before any browser work
+        if vin:
+            is_valid, message = self.validate_vin(vin)
+            if not is_valid:
+                return {'success': False, 'error': 'invalid_vin', 'message': f"Invalid VIN: {message}"}
+            # Open CARFAX VHR page with VIN
+            start_url = f"https://www.carfaxonline.com/vhr/{vin_check.normalize(vin)}"
+        else:
+            start_url = "https://www.carfaxonline.com/"
+        
+        chrome_path, user_profile = self.discover()
+        if not chrome_path:
+            return {'success': False, 'error': 'chrome_not_found', 'message': "Chrome not found!"}
+        if self.debug_port:
+            user_profile = self.debug_profile_dir
+            os.makedirs(user_profile, exist_ok=True)
+        elif not user_profile:
+            return {'success': False, 'error': 'profile_not_found', 'message': "User profile not found!"}
+        
+        if self.rate_limiter is not None:
+            try:
+                waited = self.rate_limiter.acquire(priority, timeout=self.rate_limit_timeout)
+            except RateLimitTimeout as e:
+                return {'success': False, 'error': 'rate_limited', 'message': f"CARFAX request limit reached: {e}"}
+            if waited >= 1:
+                progress('rate_limited', waited_seconds=round(waited, 2))
+        
+        progress('launcher_started', vin=vin, fresh=fresh)
+        
+        # Fast path: a new tab in the browser that is already running
+        if not fresh and self.open_tab(start_url):
+            print(f"Opened new tab: {start_url}")
+            progress('page_opened', url=start_url, reused=True)
+            return {'success': True, 'url': start_url, 'reused': True}
+        
+        # Only one restart of Chrome at a time, across all processes on this host
+        try:
+            with self._launch_lock.hold():
+                # Another request may have restarted Chrome while we waited
+                if not fresh and self.open_tab(start_url):
+                    progress('page_opened', url=start_url, reused=True)
+                    return {'success': True, 'url': start_url, 'reused': True}
+                
+                if not self.kill_chrome_processes(user_profile if self.debug_port else None) and self.debug_port:
+                    # A stale debug Chrome still holds the profile; a second one would exit at once
+                    return {'success': False, 'error': 'launch_failed',
+                            'message': "Could not stop the Chrome running on the debug profile", 'url': start_url}
+                success = self.launch_chrome(
+                    chrome_path=chrome_path,
+                    user_profile=user_profile,
+                    profile_directory="Default",
+                    start_url=start_url
+                )
+                debuggable = success and self.debug_port and self.wait_for_devtools()
+        except HostLockTimeout as e:
+            return {'success': False, 'error': 'launch_busy', 'message': f"Chrome is being restarted: {e}", 'url': start_url}
+        
+        if not success:
+            return {'success': False, 'error': 'launch_failed', 'message': "Failed to launch Chrome", 'url': start_url}
+        result = {'success': True, 'url': start_url, 'reused': False}
+        if self.debug_port and not debuggable:
+            # The page still opened, but the next VIN will restart Chrome instead of adding a tab
+            result['warning'] = f"Chrome did not open debug port {self.debug_port}; later VINs will restart it"
+            print(f"Warning: {result['warning']}")
+        progress('page_opened', url=start_url, reused=False, warning=result.get('warning'))
+        return result
+
+_shared_launcher = None
+_shared_launcher_lock = threading.Lock()
+
+def get_launcher():
+    """Process-wide ChromeLauncher with Chrome and profile discovered once"""
+    global _shared_launcher
+    with _shared_launcher_lock:
+        if _shared_launcher is None:
+            launcher = ChromeLauncher()
+            launcher.discover()
+            _shared_launcher = launcher
+        return _shared_launcher
+
 def main():
     """Main function"""
     print("CARFAX Chrome Launcher - Cross-Platform")
@@ -189,68 +394,44 @@ def main():
     parser.add_argument('vin', nargs='?', help='Vehicle VIN number')
     parser.add_argument('--chrome-path', help='Custom Chrome executable path')
     parser.add_argument('--profile-path', help='Custom user profile path')
+    parser.add_argument('--debug-port', type=int, default=DEFAULT_DEBUG_PORT,
+                        help='Remote debugging port used to reuse a running Chrome (0 disables)')
+    parser.add_argument('--debug-profile-dir', default=DEFAULT_DEBUG_PROFILE_DIR,
+                        help='User data dir of the debuggable Chrome (the default profile cannot be debugged)')
+    parser.add_argument('--fresh', action='store_true', help='Always restart Chrome instead of opening a tab')
     args = parser.parse_args()
     
     # Initialize launcher
-    launcher = ChromeLauncher()
-    
-    # Find Chrome
-    chrome_path = args.chrome_path or launcher.find_chrome()
-    if not chrome_path:
-        print("Chrome not found!")
-        print("Please install Chrome or specify the path using --chrome-path")
-        return False
-    
-    print(f"Chrome found at: {chrome_path}")
-    
-    # Find user profile
-    user_profile = args.profile_path or launcher.find_user_profile()
-    if not user_profile:
-        print("User profile not found!")
-        print("Please specify the profile path using --profile-path")
-        return False
-    
-    print(f"User profile found at: {user_profile}")
-    
-    # Determine start URL
-    if args.vin:
-        # Validate VIN
-        is_valid, message = launcher.validate_vin(args.vin)
-        if not is_valid:
-            print(f"Invalid VIN: {message}")
-            return False
-        
-        print(f"VIN entered: {args.vin}")
-        # Open CARFAX VHR page with VIN
-        start_url = f"https://www.carfaxonline.com/vhr/{args.vin}"
-        print("Opening CARFAX VHR page with VIN")
-    else:
-        # Regular URL without VIN
-        start_url = "https://www.carfaxonline.com/"
-        print("No VIN specified, opening main CARFAX")
+    launcher = ChromeLauncher(debug_port=args.debug_port, rate_limiter=create_rate_limiter(),
+                              debug_profile_dir=args.debug_profile_dir)
+    chrome_path, user_profile = launcher.discover(args.chrome_path, args.profile_path)
     
-    # Kill existing Chrome processes
-    launcher.kill_chrome_processes()
+    if chrome_path:
+        print(f"Chrome found at: {chrome_path}")
+    if args.debug_port:
+        print(f"Debug profile: {args.debug_profile_dir}")
+    elif user_profile:
+        print(f"User profile found at: {user_profile}")
     
-    # Launch Chrome
-    success = launcher.launch_chrome(
-        chrome_path=chrome_path,
-        user_profile=user_profile,
-        profile_directory="Default",
-        start_url=start_url
-    )
+    result = launcher.open_vin(args.vin, fresh=args.fresh)
     
-    if success:
-        print("\nChrome launched successfully!")
+    if result['success']:
+        print("\nOpened in running Chrome!" if result['reused'] else "\nChrome launched successfully!")
         if args.vin:
             print(f"Opened CARFAX VHR page with VIN: {args.vin}")
-            print(f"URL: https://www.carfaxonline.com/vhr/{args.vin}")
+            print(f"URL: {result['url']}")
         else:
             print("Opened main CARFAX")
     else:
-        print("\nFailed to launch Chrome")
+        print(result['message'])
+        if result['error'] == 'chrome_not_found':
+            print("Please install Chrome or specify the path using --chrome-path")
+        elif result['error'] == 'profile_not_found':
+            print("Please specify the profile path using --profile-path")
+        elif result['error'] == 'launch_failed':
+            print("\nFailed to launch Chrome")
     
-    return success
+    return result['success']
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Batch CARFAX Scraper
+Scrape many VINs in parallel browser sessions
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from carfax_scraper import CarfaxScraper
+from profile_copy import ProfileCopies
+from single_flight import SingleFlight, normalize_vin
+
+
+def read_vins(source):
+    """Read VINs from a file path, or stdin when source is '-'
+
+    Blank lines and lines starting with '#' are skipped. For CSV feeds
+    only the first column is used.
+    """
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    vins = []
+    for line in lines:
+        vin = line.split(',')[0].strip().strip('"').upper()
+        if vin and not vin.startswith('#'):
+            vins.append(vin)
+    return vins
+
+
+def _scrape_vin(pool, vin, output_dir, scraper_options):
+    scraper = CarfaxScraper(driver_pool=pool, **scraper_options)
+    return scraper.scrape_carfax(vin, output_dir=output_dir)
+
+
+def scrape_one(pool, vin, output_dir, scraper_options, flights=None):
+    """Scrape a single VIN with a session leased from the pool
+
+    With a SingleFlight, a VIN already being scraped by another worker
+    is not scraped again; this call waits for and shares that outcome.
+    """
+    start = time.monotonic()
+    error = None
+    shared = False
+    try:
+        if flights is not None:
+            success, shared = flights.do(
+                normalize_vin(vin), _scrape_vin, pool, vin, output_dir, scraper_options
+            )
+        else:
+            success = _scrape_vin(pool, vin, output_dir, scraper_options)
+    except Exception as e:
+        success = False
+        error = str(e)
+
+    return {
+        'vin': vin,
+        'success': success,
+        'shared': shared,
+        'seconds': time.monotonic() - start,
+        'error': error
+    }
+
+
+def scrape_batch(vins, workers=2, output_dir="output", **scraper_options):
+    """Scrape VINs with a fixed number of parallel browser sessions
+
+    scraper_options are passed to every CarfaxScraper (chrome_path,
+    user_profile, readiness, cache, sink, profiler, rate_limiter, priority,
+    browser_profile, limits, page_source_dir).
+
+    Chrome won't open one profile in two browsers, so with more than
+    one worker each session runs on a temporary copy of the profile's
+    login state (see profile_copy.py), removed when the batch ends.
+    Close Chrome on that profile first: a running Chrome keeps its
+    cookie database locked.
+    """
+    workers = max(1, int(workers))
+    factory = CarfaxScraper(**scraper_options)
+    if workers > 1:
+        factory.profile_copies = ProfileCopies(factory.user_profile)
+    pool = factory.create_pool(size=workers)
+    flights = SingleFlight()
+
+    results = []
+    start = time.monotonic()
+    try:
+        with pool:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(scrape_one, pool, vin, output_dir, scraper_options, flights)
+                    for vin in vins
+                ]
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    status = "✅" if result['success'] else "❌"
+                    print(f"{status} [{len(results)}/{len(vins)}] {result['vin']} ({result['seconds']:.1f}s)")
+    finally:
+        if factory.profile_copies is not None:
+            factory.profile_copies.cleanup()
+
+    elapsed = time.monotonic() - start
+    return results, elapsed
+
+
+def print_batch_summary(results, elapsed):
+    """Print per-VIN outcome and overall throughput"""
+    succeeded = [r for r in results if r['success']]
+    failed = [r for r in results if not r['success']]
+    per_minute = len(results) / elapsed * 60 if elapsed > 0 else 0.0
+
+    print("\n" + "=" * 50)
+    print("📊 Batch summary")
+    print("=" * 50)
+    for result in sorted(results, key=lambda r: r['vin']):
+        status = "OK  " if result['success'] else "FAIL"
+        line = f"{status} {result['vin']}  {result['seconds']:.1f}s"
+        if result.get('shared'):
+            line += "  (shared with a concurrent duplicate)"
+        if result['error']:
+            line += f"  {result['error']}"
+        print(line)
+    print("-" * 50)
+    print(f"✅ Succeeded: {len(succeeded)}")
+    print(f"❌ Failed: {len(failed)}")
+    print(f"⏱️ Elapsed: {elapsed:.1f}s")
+    print(f"🚀 Throughput: {per_minute:.1f} VINs/minute")
+
+    return not failed
+
+
+def run_batch(source, workers=2, output_dir="output", **scraper_options):
+    """Read VINs from source, scrape them and print the summary"""
+    vins = read_vins(source)
+    if not vins:
+        print("❌ No VINs found in batch input")
+        return False
+
+    print(f"🚀 Batch scraping {len(vins)} VINs with {workers} workers")
+    print("=" * 50)
+
+    results, elapsed = scrape_batch(
+        vins,
+        workers=workers,
+        output_dir=output_dir,
+        **scraper_options
+    )
+    return print_batch_summary(results, elapsed)
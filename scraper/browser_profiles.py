@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Browser Profiles
+Chrome launch settings for scraping, and a benchmark to compare them
+"""
+
+import argparse
+import statistics
+import sys
+
+try:
+    import psutil
+except ImportError:  # browser RSS isn't measured without it
+    psutil = None
+
+PROFILES = ('full', 'lean')
+
+# Network.setBlockedURLs matches URL patterns, not resource types, so each
+# type is blocked by the file extensions it is served under
+RESOURCE_TYPE_EXTENSIONS = {
+    'image': ('png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp'),
+    'font': ('woff', 'woff2', 'ttf', 'otf', 'eot'),
+    'media': ('mp4', 'webm', 'ogg', 'mp3', 'wav', 'm4a', 'm3u8'),
+    'stylesheet': ('css',),
+}
+
+# Stylesheets stay on by default: innerText depends on them, hidden
+# elements would otherwise show up in the extracted text
+DEFAULT_BLOCK_TYPES = ('image', 'font', 'media')
+
+# Analytics, tag managers and ad networks the report never needs
+DEFAULT_BLOCK_DOMAINS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'googlesyndication.com',
+    'facebook.net',
+    'connect.facebook.net',
+    'bat.bing.com',
+    'hotjar.com',
+    'nr-data.net',
+    'newrelic.com',
+    'optimizely.com',
+    'demdex.net',
+    'omtrdc.net',
+    'adobedtm.com',
+    'quantserve.com',
+    'scorecardresearch.com',
+)
+
+# Browser features a scrape doesn't use; each one costs memory or startup time
+LEAN_ARGUMENTS = (
+    '--headless=new',
+    '--window-size=1366,900',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-extensions',
+    '--disable-component-update',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-notifications',
+    '--disable-gpu',
+    '--disable-dev-shm-usage',
+    '--mute-audio',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication,InterestFeedContentSuggestions',
+)
+
+# Load timing and transfer size of the current document, in one round trip
+PAGE_METRICS_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var transfer = nav ? nav.transferSize : 0;
+for (var i = 0; i < resources.length; i++) { transfer += resources[i].transferSize || 0; }
+return {
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : null,
+    load_ms: nav ? nav.loadEventEnd : null,
+    resources: resources.length,
+    transfer_bytes: transfer
+};
+"""
+
+
+class BrowserProfile:
+    def __init__(self, name='full', block_types=None, block_domains=None):
+        """Launch options and request blocking for scraping sessions
+
+        full is the headed Chrome the scraper has always used. lean runs
+        headless with unneeded features switched off, and by default
+        blocks images, fonts, media and tracker domains at the network
+        layer. block_types and block_domains override the defaults of
+        either profile.
+        """
+        if name not in PROFILES:
+            raise ValueError(f"Unknown browser profile {name!r}; expected one of {', '.join(PROFILES)}")
+        lean = name == 'lean'
+        if block_types is None:
+            block_types = DEFAULT_BLOCK_TYPES if lean else ()
+        if block_domains is None:
+            block_domains = DEFAULT_BLOCK_DOMAINS if lean else ()
+
+        unknown = set(block_types) - set(RESOURCE_TYPE_EXTENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown resource types: {', '.join(sorted(unknown))}")
+
+        self.name = name
+        self.headless = lean
+        self.block_types = tuple(block_types)
+        self.block_domains = tuple(block_domains)
+
+    def blocked_url_patterns(self):
+        """URL patterns for Network.setBlockedURLs"""
+        patterns = []
+        for resource_type in self.block_types:
+            for extension in RESOURCE_TYPE_EXTENSIONS[resource_type]:
+                patterns.append(f'*.{extension}')
+                patterns.append(f'*.{extension}?*')
+        for domain in self.block_domains:
+            patterns.append(f'*://{domain}/*')
+            patterns.append(f'*://*.{domain}/*')
+        return patterns
+
+    def configure(self, options):
+        """Add this profile's launch arguments to a ChromeOptions"""
+        if not self.headless:
+            return options
+        for argument in LEAN_ARGUMENTS:
+            options.add_argument(argument)
+        if 'image' in self.block_types:
+            # Also stops images that aren't served under an image extension
+            options.add_argument('--blink-settings=imagesEnabled=false')
+        return options
+
+    def apply(self, driver):
+        """Install request blocking and metrics on a started session
+
+        Blocking is per tab, so it covers the tab the scraper navigates;
+        DriverPool keeps that first tab across leases.
+        """
+        driver.execute_cdp_cmd("Performance.enable", {})
+        patterns = self.blocked_url_patterns()
+        if patterns:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        if self.headless:
+            # Headless Chrome announces itself in the user agent
+            user_agent = driver.execute_script("return navigator.userAgent")
+            driver.execute_cdp_cmd("Network.setUserAgentOverride", {
+                "userAgent": user_agent.replace('HeadlessChrome', 'Chrome')
+            })
+        return driver
+
+
+def browser_rss_bytes(driver):
+    """Resident memory of the driver's Chrome processes, or None without psutil"""
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if psutil is None or process is None:
+        return None
+    try:
+        root = psutil.Process(process.pid)
+        total = 0
+        for child in root.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+    except psutil.Error:
+        return None
+
+
+def measure_page(driver):
+    """Load time, transfer size and memory use of the page in a session"""
+    metrics = driver.execute_script(PAGE_METRICS_SCRIPT) or {}
+    try:
+        performance = driver.execute_cdp_cmd("Performance.getMetrics", {})
+        values = {item['name']: item['value'] for item in performance.get('metrics', [])}
+        metrics['js_heap_bytes'] = int(values.get('JSHeapUsedSize', 0))
+        metrics['dom_nodes'] = int(values.get('Nodes', 0))
+    except Exception:
+        metrics['js_heap_bytes'] = None
+        metrics['dom_nodes'] = None
+    metrics['browser_rss_bytes'] = browser_rss_bytes(driver)
+    return metrics
+
+
+def parse_list(value):
+    """Comma-separated CLI value; None keeps the profile default, '' means none"""
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def compare(vins, profiles=PROFILES, runs=3, chrome_path=None, user_profile=None,
+            block_types=None, block_domains=None, readiness=None):
+    """Load each VIN's report under each profile; returns the samples per profile
+
+    Every run starts a fresh browser, so startup cost and memory are part
+    of the measurement, just as for a scrape without a pool.
+    """
+    from carfax_scraper import CarfaxScraper
+
+    samples = {name: [] for name in profiles}
+    for run in range(runs):
+        for name in profiles:
+            profile = BrowserProfile(name, block_types, block_domains)
+            scraper = CarfaxScraper(chrome_path=chrome_path, user_profile=user_profile,
+                                    readiness=readiness, browser_profile=profile)
+            for vin in vins:
+                scraper.timings = {}
+                if not scraper.setup_driver():
+                    continue
+                try:
+                    if not scraper.navigate_to_carfax(vin):
+                        continue
+                    scraper.wait_until_ready()
+                    sample = measure_page(scraper.driver)
+                    sample['ready_seconds'] = scraper.data['readiness']['waited_seconds']
+                    samples[name].append(sample)
+                finally:
+                    scraper.driver.quit()
+                    scraper.driver = None
+    return samples
+
+
+def print_comparison(samples):
+    """Median of each metric per profile"""
+    columns = (
+        ('load_ms', 'load ms', 1),
+        ('ready_seconds', 'ready s', 1),
+        ('resources', 'requests', 1),
+        ('transfer_bytes', 'KiB', 1024),
+        ('js_heap_bytes', 'heap MiB', 1024 * 1024),
+        ('browser_rss_bytes', 'RSS MiB', 1024 * 1024),
+    )
+    print(f"{'profile':<10}{'runs':>6}" + ''.join(f"{title:>12}" for _, title, _ in columns))
+    print('-' * (16 + 12 * len(columns)))
+    for name, rows in samples.items():
+        cells = []
+        for key, _, scale in columns:
+            values = [row[key] for row in rows if row.get(key) is not None]
+            cells.append(f"{statistics.median(values) / scale:>12.1f}" if values else f"{'-':>12}")
+        print(f"{name:<10}{len(rows):>6}" + ''.join(cells))
+    if psutil is None:
+        print("⚠️ psutil not installed, browser RSS not measured (pip install psutil)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare page load time and memory of the browser profiles')
+    parser.add_argument('vins', nargs='+', help='VINs whose reports are loaded')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per profile and VIN')
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='Comma-separated profiles to compare')
+    parser.add_argument('--chrome-path', help='Chrome executable path')
+    parser.add_argument('--user-profile', help='Chrome user profile path')
+    parser.add_argument('--block', help='Resource types to block (default for lean: image,font,media)')
+    parser.add_argument('--block-domains', help='Domains to block (default for lean: known trackers)')
+    args = parser.parse_args()
+
+    samples = compare(
+        args.vins,
+        profiles=parse_list(args.profiles),
+        runs=args.runs,
+        chrome_path=args.chrome_path,
+        user_profile=args.user_profile,
+        block_types=parse_list(args.block),
+        block_domains=parse_list(args.block_domains)
+    )
+    print_comparison(samples)
+    return all(samples.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -1,36 +1,172 @@
 import requests
-from bs4 import BeautifulSoup
-import json
 import time
 import os
 import sys
 import argparse
-from datetime import datetime
+from contextlib import ExitStack, contextmanager, nullcontext
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from driver_pool import DriverPool
+from page_readiness import PageReadiness, CONDITIONS
+from page_parser import parse_page, save_page_source
+from result_cache import ResultCache, DEFAULT_CACHE_PATH
+from output_sinks import FileSink, create_sink, unique_suffix
+from result_store import DEFAULT_STORE_PATH
+from extraction_rules import VEHICLE_FIELD_SELECTORS, HISTORY_SECTION_SELECTORS, SECTION_SELECTORS
+from metrics import REGISTRY
+from phase_profiler import PhaseProfiler
+import vin_check
+from rate_limiter import PRIORITIES, DEFAULT_RATE_PER_MINUTE, create_rate_limiter
+from browser_profiles import PROFILES, BrowserProfile, measure_page, parse_list
+from scrape_record import RecordLimits, ScrapeRecord
+from report_diff import hash_sections
+
+SCRAPE_PHASE_SECONDS = REGISTRY.histogram(
+    'carfax_scrape_phase_seconds', 'Time spent in each phase of a VIN scrape', labels=('phase',)
+)
+SCRAPES_TOTAL = REGISTRY.counter(
+    'carfax_scrapes_total', 'VIN scrapes by outcome (ok, failed, cached, cached_failure, invalid)', labels=('outcome',)
+)
+PAGE_LOAD_SECONDS = REGISTRY.histogram(
+    'carfax_page_load_seconds', 'Report load time until the load event, by browser profile', labels=('profile',)
+)
+
+# Collects everything the extract_* methods need in one round trip. Strings
+# and lists are cut to the record limits here, reporting their full size,
+# so oversized pages never cross the WebDriver connection whole.
+PAGE_SNAPSHOT_SCRIPT = """
+var fieldSelectors = arguments[0];
+var sectionSelectors = arguments[1];
+var limits = arguments[2];
+var result = {fields: {}, sections: {}, totals: {}};
+
+function cut(text, limit) {
+    text = text || '';
+    return limit && text.length > limit ? text.slice(0, limit) : text;
+}
+
+for (var name in fieldSelectors) {
+    var first = document.querySelector(fieldSelectors[name]);
+    if (first) { result.fields[name] = first.innerText; }
+}
+
+for (var section in sectionSelectors) {
+    var elements = document.querySelectorAll(sectionSelectors[section]);
+    var count = limits.maxItems ? Math.min(elements.length, limits.maxItems) : elements.length;
+    var items = [];
+    for (var i = 0; i < count; i++) {
+        // Trimmed here so text_length matches the stripped text the record keeps
+        var text = (elements[i].innerText || '').trim();
+        var item = {text: cut(text, limits.maxItemText), text_length: text.length};
+        if (limits.html) {
+            var html = elements[i].innerHTML;
+            item.html = cut(html, limits.maxItemHtml);
+            item.html_length = html.length;
+        }
+        items.push(item);
+    }
+    result.sections[section] = items;
+    result.totals[section] = elements.length;
+}
+
+function urls(selector, attribute) {
+    var all = Array.prototype.map.call(document.querySelectorAll(selector), function (el) { return el[attribute]; })
+        .filter(function (url) { return url; });
+    result.totals[attribute === 'href' ? 'links' : 'images'] = all.length;
+    return limits.maxUrls ? all.slice(0, limits.maxUrls) : all;
+}
+
+var bodyText = document.body ? document.body.innerText : '';
+result.title = document.title;
+result.url = window.location.href;
+result.body_text = cut(bodyText, limits.maxPageText);
+result.totals.body_text = bodyText.length;
+result.links = urls('a[href]', 'href');
+result.images = urls('img[src]', 'src');
+return result;
+"""
 
 class CarfaxScraper:
-    def __init__(self, chrome_path=None, user_profile=None):
-        """Initialize the scraper"""
+    def __init__(self, chrome_path=None, user_profile=None, driver_pool=None, readiness=None, cache=None, sink=None,
+                 profiler=None, on_event=None, rate_limiter=None, priority='batch', browser_profile=None,
+                 limits=None, page_source_dir=None, profile_copies=None):
+        """Initialize the scraper
+
+        When a DriverPool is given, scrapes lease a warm session from it
+        instead of starting and quitting Chrome for every VIN. readiness is
+        the PageReadiness used to decide when a loaded report can be read.
+        An optional ResultCache short-circuits repeat lookups of a VIN,
+        and an optional OutputSink replaces the per-VIN files. A
+        PhaseProfiler, when given, profiles every timed phase. on_event is
+        called as on_event(event, **data) as a scrape progresses
+        (validated, page_loaded, page_ready, section_extracted, saved, done).
+        A RateLimiter, when given, is asked for a slot in the priority
+        lane before every request to carfaxonline.com. browser_profile
+        is the BrowserProfile sessions are started with (default: full).
+        limits are the RecordLimits every scrape record is held to; each
+        scrape starts a fresh record in self.data. With page_source_dir,
+        the HTML of every loaded report is saved there for page_parser.py
+        to re-extract offline. With ProfileCopies, every new session runs
+        on its own copy of user_profile instead of the profile itself, so
+        several sessions can be open at once.
+        """
         self.chrome_path = chrome_path or r"C:\Program Files\Google\Chrome\Application\chrome.exe"
         self.user_profile = user_profile or r"C:\Users\En Mina\AppData\Local\Google\Chrome\User Data"
+        self.driver_pool = driver_pool
+        self.readiness = readiness or PageReadiness(selectors=SECTION_SELECTORS)
+        self.cache = cache
+        self.sink = sink
+        self.profiler = profiler
+        self.on_event = on_event
+        self.rate_limiter = rate_limiter
+        self.priority = priority
+        self.browser_profile = browser_profile or BrowserProfile()
+        self.limits = limits or RecordLimits()
+        self.page_source_dir = page_source_dir
+        self.profile_copies = profile_copies
         self.driver = None
-        self.data = {}
+        self.data = ScrapeRecord(self.limits)
+        self.timings = {}
+        self._snapshot = None
         
-    def setup_driver(self):
-        """Setup Chrome driver with profile"""
+    def _emit(self, event, **data):
+        """Report progress to on_event; a failing listener never breaks a scrape"""
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event, **data)
+        except Exception as e:
+            print(f"⚠️ Progress listener failed: {e}")
+    
+    @contextmanager
+    def _phase(self, name):
+        """Time one scrape phase into self.timings and the phase histogram"""
+        start = time.perf_counter()
+        try:
+            with self.profiler.phase(name) if self.profiler is not None else nullcontext():
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 6)
+            SCRAPE_PHASE_SECONDS.observe(elapsed, phase=name)
+    
+    def create_driver(self):
+        """Start a new Chrome session with profile, or None on failure"""
         try:
             chrome_options = Options()
             
             # Try with user profile first
             try:
-                chrome_options.add_argument(f'--user-data-dir={self.user_profile}')
+                # Chrome opens a profile in one browser only; parallel sessions each get a copy
+                user_data_dir = self.user_profile if self.profile_copies is None else self.profile_copies.new()
+                chrome_options.add_argument(f'--user-data-dir={user_data_dir}')
                 chrome_options.add_argument('--profile-directory=Default')
-                self.driver = webdriver.Chrome(options=chrome_options)
+                self.browser_profile.configure(chrome_options)
+                driver = webdriver.Chrome(options=chrome_options)
             except Exception as profile_error:
                 print(f"⚠️ Profile error: {profile_error}")
                 print("🔄 Trying without user profile...")
@@ -42,23 +178,59 @@ class CarfaxScraper:
                 chrome_options.add_argument('--disable-blink-features=AutomationControlled')
                 chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
                 chrome_options.add_experimental_option('useAutomationExtension', False)
+                self.browser_profile.configure(chrome_options)
                 
-                self.driver = webdriver.Chrome(options=chrome_options)
+                driver = webdriver.Chrome(options=chrome_options)
             
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            # Applies to every document loaded in this session, not just the current one
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+            })
+            self.browser_profile.apply(driver)
             
             print("✅ Chrome driver setup successfully")
-            return True
+            return driver
         except Exception as e:
             print(f"❌ Error setting up Chrome driver: {e}")
-            return False
+            return None
+    
+    def setup_driver(self):
+        """Setup Chrome driver with profile"""
+        self.driver = self.create_driver()
+        return self.driver is not None
+    
+    def create_pool(self, size=2):
+        """Create a DriverPool whose sessions are built by this scraper
+
+        Sessions run on the user's logged-in profile, so recycling one
+        keeps its CARFAX login.
+        """
+        return DriverPool(self.create_driver, size=size, keep_login=bool(self.user_profile))
+    
+    def wait_for_request_slot(self):
+        """Wait for the rate limiter to allow a request; returns the seconds waited
+        
+        Recorded as its own rate_limit_wait timing, outside navigate_to_carfax.
+        """
+        if self.rate_limiter is None:
+            return 0.0
+        waited = self.rate_limiter.acquire(self.priority)
+        self.timings['rate_limit_wait'] = round(waited, 6)
+        if waited >= 1:
+            print(f"⏳ Waited {waited:.1f}s for a request slot")
+        return waited
     
     def navigate_to_carfax(self, vin):
-        """Navigate to CARFAX page with VIN"""
+        """Navigate to CARFAX page with VIN
+        
+        Call wait_for_request_slot() first when a rate limiter is set.
+        """
         try:
             url = f"https://www.carfaxonline.com/vhr/{vin}"
+            
             print(f"🌐 Navigating to: {url}")
             
+            self._snapshot = None
             self.driver.get(url)
             
             # Wait for page to load
@@ -72,37 +244,66 @@ class CarfaxScraper:
             print(f"❌ Error navigating to CARFAX: {e}")
             return False
     
+    def wait_until_ready(self):
+        """Wait for the report to settle and record how long it took"""
+        result = self.readiness.wait(self.driver)
+        self.data['readiness'] = result
+        if result['timed_out']:
+            print(f"⚠️ Page not ready after {result['waited_seconds']:.2f}s, extracting anyway")
+        else:
+            print(f"✅ Page ready ({result['condition']}) after {result['waited_seconds']:.2f}s")
+        return result
+    
+    def measure_browser(self):
+        """Record load time and memory of the loaded report under this profile"""
+        try:
+            metrics = measure_page(self.driver)
+        except Exception as e:
+            print(f"⚠️ Could not measure page: {e}")
+            return None
+        metrics['profile'] = self.browser_profile.name
+        self.data['browser'] = metrics
+        if metrics.get('load_ms'):
+            PAGE_LOAD_SECONDS.observe(metrics['load_ms'] / 1000.0, profile=self.browser_profile.name)
+        return metrics
+    
+    def capture_page_source(self, vin):
+        """Save the loaded report's HTML to page_source_dir; returns the path"""
+        try:
+            os.makedirs(self.page_source_dir, exist_ok=True)
+            path = os.path.join(self.page_source_dir, f"carfax_{vin}_{unique_suffix()}.source.html")
+            save_page_source(path, self.driver.page_source, self.driver.current_url)
+        except Exception as e:
+            print(f"⚠️ Could not save page source: {e}")
+            return None
+        self.data['page_source_file'] = path
+        print(f"✅ Page source saved to {path}")
+        return path
+    
+    def page_snapshot(self):
+        """Collect every section, link and image in a single script call
+        
+        The result is cached until the next navigation, so the extract_*
+        methods cost one WebDriver round trip per page in total.
+        """
+        if self._snapshot is None:
+            self._snapshot = self.driver.execute_script(
+                PAGE_SNAPSHOT_SCRIPT, VEHICLE_FIELD_SELECTORS, HISTORY_SECTION_SELECTORS, self.limits.for_script()
+            ) or {}
+        return self._snapshot
+    
     def extract_vehicle_info(self):
         """Extract vehicle information"""
         try:
             print("🔍 Extracting vehicle information...")
             
-            # Basic vehicle info
-            vehicle_info = {}
-            
-            # Try to find vehicle title/name
-            try:
-                title_elements = self.driver.find_elements(By.CSS_SELECTOR, "h1, h2, .vehicle-title, .car-title")
-                if title_elements:
-                    vehicle_info['title'] = title_elements[0].text.strip()
-            except:
-                vehicle_info['title'] = "N/A"
-            
-            # Try to find year, make, model
-            try:
-                year_make_model = self.driver.find_elements(By.CSS_SELECTOR, ".year-make-model, .vehicle-info, .car-info")
-                if year_make_model:
-                    vehicle_info['year_make_model'] = year_make_model[0].text.strip()
-            except:
-                vehicle_info['year_make_model'] = "N/A"
-            
-            # Try to find VIN
-            try:
-                vin_elements = self.driver.find_elements(By.CSS_SELECTOR, "[data-vin], .vin, .vehicle-vin")
-                if vin_elements:
-                    vehicle_info['vin'] = vin_elements[0].text.strip()
-            except:
-                vehicle_info['vin'] = "N/A"
+            # Title, year/make/model and VIN: text of the first match of each
+            fields = self.page_snapshot().get('fields', {})
+            vehicle_info = {
+                name: text.strip()
+                for name, text in fields.items()
+                if text is not None
+            }
             
             self.data['vehicle_info'] = vehicle_info
             print("✅ Vehicle information extracted")
@@ -110,254 +311,343 @@ class CarfaxScraper:
         except Exception as e:
             print(f"❌ Error extracting vehicle info: {e}")
     
-    def extract_ownership_history(self):
-        """Extract ownership history"""
+    def _extract_history(self, section, label):
+        """Copy one history section out of the page snapshot"""
         try:
-            print("🔍 Extracting ownership history...")
-            
-            ownership_data = []
-            
-            # Look for ownership history sections
-            ownership_sections = self.driver.find_elements(By.CSS_SELECTOR, ".ownership, .owner, .history-item")
-            
-            for section in ownership_sections:
-                try:
-                    owner_info = {
-                        'text': section.text.strip(),
-                        'html': section.get_attribute('innerHTML')
-                    }
-                    ownership_data.append(owner_info)
-                except:
-                    continue
+            print(f"🔍 Extracting {label}...")
             
-            self.data['ownership_history'] = ownership_data
-            print(f"✅ Ownership history extracted ({len(ownership_data)} items)")
+            snapshot = self.page_snapshot()
+            self.data.set_items(
+                section, snapshot.get('sections', {}).get(section, []), snapshot.get('totals', {}).get(section)
+            )
+            print(f"✅ {label.capitalize()} extracted ({len(self.data[section])} items)")
             
         except Exception as e:
-            print(f"❌ Error extracting ownership history: {e}")
+            print(f"❌ Error extracting {label}: {e}")
+    
+    def extract_ownership_history(self):
+        """Extract ownership history"""
+        self._extract_history('ownership_history', 'ownership history')
     
     def extract_accident_history(self):
         """Extract accident history"""
-        try:
-            print("🔍 Extracting accident history...")
-            
-            accident_data = []
-            
-            # Look for accident history sections
-            accident_sections = self.driver.find_elements(By.CSS_SELECTOR, ".accident, .damage, .crash, .incident")
-            
-            for section in accident_sections:
-                try:
-                    accident_info = {
-                        'text': section.text.strip(),
-                        'html': section.get_attribute('innerHTML')
-                    }
-                    accident_data.append(accident_info)
-                except:
-                    continue
-            
-            self.data['accident_history'] = accident_data
-            print(f"✅ Accident history extracted ({len(accident_data)} items)")
-            
-        except Exception as e:
-            print(f"❌ Error extracting accident history: {e}")
+        self._extract_history('accident_history', 'accident history')
     
     def extract_service_history(self):
         """Extract service history"""
-        try:
-            print("🔍 Extracting service history...")
-            
-            service_data = []
-            
-            # Look for service history sections
-            service_sections = self.driver.find_elements(By.CSS_SELECTOR, ".service, .maintenance, .repair")
-            
-            for section in service_sections:
-                try:
-                    service_info = {
-                        'text': section.text.strip(),
-                        'html': section.get_attribute('innerHTML')
-                    }
-                    service_data.append(service_info)
-                except:
-                    continue
-            
-            self.data['service_history'] = service_data
-            print(f"✅ Service history extracted ({len(service_data)} items)")
-            
-        except Exception as e:
-            print(f"❌ Error extracting service history: {e}")
+        self._extract_history('service_history', 'service history')
     
     def extract_page_content(self):
         """Extract all page content"""
         try:
             print("🔍 Extracting page content...")
             
-            # Get page title
-            self.data['page_title'] = self.driver.title
-            
-            # Get page URL
-            self.data['page_url'] = self.driver.current_url
-            
-            # Get all text content
-            body = self.driver.find_element(By.TAG_NAME, "body")
-            self.data['page_content'] = body.text
-            
-            # Get all links
-            links = self.driver.find_elements(By.TAG_NAME, "a")
-            self.data['links'] = [link.get_attribute('href') for link in links if link.get_attribute('href')]
-            
-            # Get all images
-            images = self.driver.find_elements(By.TAG_NAME, "img")
-            self.data['images'] = [img.get_attribute('src') for img in images if img.get_attribute('src')]
+            snapshot = self.page_snapshot()
+            totals = snapshot.get('totals', {})
+            self.data['page_title'] = snapshot.get('title')
+            self.data['page_url'] = snapshot.get('url')
+            self.data.set_text('page_content', snapshot.get('body_text', ''), totals.get('body_text'))
+            self.data.set_urls('links', snapshot.get('links', []), totals.get('links'))
+            self.data.set_urls('images', snapshot.get('images', []), totals.get('images'))
             
             print("✅ Page content extracted")
             
         except Exception as e:
             print(f"❌ Error extracting page content: {e}")
     
+    def extract_from_page_source(self, page_source, url=None):
+        """Fill self.data from captured HTML without a live browser"""
+        self.data.update_parsed(parse_page(page_source, url=url, capture_html=self.limits.capture_html))
+        print("✅ Data extracted from page source")
+        return self.data
+    
     def save_data(self, vin, output_dir="output"):
-        """Save extracted data to files"""
+        """Save extracted data through the configured sink
+        
+        Without a sink, the per-VIN JSON/HTML/TXT files are written to
+        output_dir. Returns the list of output locations.
+        """
         try:
-            # Create output directory
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{output_dir}/carfax_{vin}_{timestamp}"
-            
-            # Save as JSON
-            json_file = f"{filename}.json"
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-            print(f"✅ Data saved to JSON: {json_file}")
-            
-            # Save as HTML
-            html_file = f"{filename}.html"
-            with open(html_file, 'w', encoding='utf-8') as f:
-                f.write(f"<html><head><title>CARFAX Data for {vin}</title></head><body>")
-                f.write(f"<h1>CARFAX Data for VIN: {vin}</h1>")
-                f.write(f"<p>Scraped at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>")
-                f.write(f"<p>URL: {self.data.get('page_url', 'N/A')}</p>")
-                f.write("<hr>")
-                
-                # Vehicle Info
-                if 'vehicle_info' in self.data:
-                    f.write("<h2>Vehicle Information</h2>")
-                    for key, value in self.data['vehicle_info'].items():
-                        f.write(f"<p><strong>{key}:</strong> {value}</p>")
-                
-                # Ownership History
-                if 'ownership_history' in self.data:
-                    f.write("<h2>Ownership History</h2>")
-                    for item in self.data['ownership_history']:
-                        f.write(f"<div>{item['text']}</div>")
-                
-                # Accident History
-                if 'accident_history' in self.data:
-                    f.write("<h2>Accident History</h2>")
-                    for item in self.data['accident_history']:
-                        f.write(f"<div>{item['text']}</div>")
-                
-                # Service History
-                if 'service_history' in self.data:
-                    f.write("<h2>Service History</h2>")
-                    for item in self.data['service_history']:
-                        f.write(f"<div>{item['text']}</div>")
-                
-                f.write("</body></html>")
-            print(f"✅ Data saved to HTML: {html_file}")
-            
-            # Save as TXT
-            txt_file = f"{filename}.txt"
-            with open(txt_file, 'w', encoding='utf-8') as f:
-                f.write(f"CARFAX Data for VIN: {vin}\n")
-                f.write(f"Scraped at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"URL: {self.data.get('page_url', 'N/A')}\n")
-                f.write("=" * 50 + "\n\n")
-                
-                # Vehicle Info
-                if 'vehicle_info' in self.data:
-                    f.write("VEHICLE INFORMATION:\n")
-                    for key, value in self.data['vehicle_info'].items():
-                        f.write(f"{key}: {value}\n")
-                    f.write("\n")
-                
-                # Page Content
-                if 'page_content' in self.data:
-                    f.write("PAGE CONTENT:\n")
-                    f.write(self.data['page_content'])
-                    f.write("\n")
-            
-            print(f"✅ Data saved to TXT: {txt_file}")
-            
-            return json_file, html_file, txt_file
-            
+            sink = self.sink or FileSink(output_dir)
+            return sink.write(vin, self.data)
         except Exception as e:
             print(f"❌ Error saving data: {e}")
-            return None, None, None
+            return []
     
-    def scrape_carfax(self, vin):
+    def scrape_carfax(self, vin, output_dir="output"):
         """Main scraping function"""
+        self.timings = {}
+        # Nothing from the previous VIN outlives its scrape
+        self.data = ScrapeRecord(self.limits)
+        self._snapshot = None
+        
+        # Malformed VINs never reach the cache or a browser
+        is_valid, error = vin_check.validate(vin)
+        if not is_valid:
+            print(f"❌ Invalid VIN {vin}: {error}")
+            SCRAPES_TOTAL.inc(outcome='invalid')
+            if self.sink is not None:
+                self.sink.write_failure(vin, error)
+            self._emit('done', vin=vin, success=False, error=error)
+            return False
+        self._emit('validated', vin=vin)
+        
+        if self.cache is not None:
+            entry = self.cache.get(vin)
+            if entry is not None:
+                if entry['negative']:
+                    print(f"⚠️ VIN {vin} failed recently ({entry['value'].get('error')}), skipping")
+                    SCRAPES_TOTAL.inc(outcome='cached_failure')
+                    self._emit('done', vin=vin, success=False, cached=True, error=entry['value'].get('error'))
+                    return False
+                self.data = entry['value']
+                print(f"✅ Using cached CARFAX data for VIN: {vin}")
+                SCRAPES_TOTAL.inc(outcome='cached')
+                self._emit('done', vin=vin, success=True, cached=True)
+                return True
+        
+        success = self._run_with_driver(vin, output_dir)
+        # The snapshot holds the raw page strings; the record has what's kept
+        self._snapshot = None
+        SCRAPES_TOTAL.inc(outcome='ok' if success else 'failed')
+        self._emit('done', vin=vin, success=success, timings=dict(self.timings))
+        return success
+    
+    def _run_with_driver(self, vin, output_dir):
+        """Run _scrape with a leased or freshly started driver"""
+        if self.driver_pool is not None:
+            with ExitStack() as stack:
+                with self._phase('setup_driver'):
+                    driver = stack.enter_context(self.driver_pool.lease())
+                if driver is None:
+                    print("❌ No browser session available")
+                    return False
+                self.driver = driver
+                try:
+                    return self._scrape(vin, output_dir)
+                finally:
+                    self.driver = None
+        
+        try:
+            # Setup driver
+            with self._phase('setup_driver'):
+                ready = self.setup_driver()
+            if not ready:
+                return False
+            
+            return self._scrape(vin, output_dir)
+        finally:
+            if self.driver:
+                self.driver.quit()
+                self.driver = None
+                print("🔒 Browser closed")
+    
+    def _scrape(self, vin, output_dir="output"):
+        """Scrape one VIN with the current driver"""
         try:
             print(f"🚀 Starting CARFAX scraping for VIN: {vin}")
             print("=" * 50)
             
-            # Setup driver
-            if not self.setup_driver():
+            # Navigate to CARFAX; waiting for a request slot is not part of the navigation time
+            self.wait_for_request_slot()
+            with self._phase('navigate_to_carfax'):
+                navigated = self.navigate_to_carfax(vin)
+            if navigated:
+                self._emit('page_loaded', vin=vin, url=self.driver.current_url)
+            else:
+                if self.cache is not None:
+                    self.cache.put_negative(vin, "navigation failed")
+                if self.sink is not None:
+                    self.sink.write_failure(vin, "navigation failed")
                 return False
             
-            # Navigate to CARFAX
-            if not self.navigate_to_carfax(vin):
-                return False
+            # Wait until the report has rendered
+            with self._phase('wait_until_ready'):
+                readiness = self.wait_until_ready()
+            self._emit('page_ready', vin=vin, **readiness)
+            self.measure_browser()
             
-            # Wait for page to load completely
-            time.sleep(5)
+            if self.page_source_dir:
+                with self._phase('capture_page_source'):
+                    self.capture_page_source(vin)
             
             # Extract data
-            self.extract_vehicle_info()
-            self.extract_ownership_history()
-            self.extract_accident_history()
-            self.extract_service_history()
-            self.extract_page_content()
+            for extract in (self.extract_vehicle_info, self.extract_ownership_history,
+                            self.extract_accident_history, self.extract_service_history,
+                            self.extract_page_content):
+                with self._phase(extract.__name__):
+                    extract()
+                self._emit('section_extracted', vin=vin, section=extract.__name__[len('extract_'):])
+            
+            # Sinks compare these with the VIN's previous capture to skip unchanged sections
+            self.data['section_hashes'] = hash_sections(self.data)
+            
+            # Timings up to here travel with the record; save_data times itself too late to be included
+            self.data['timings'] = dict(self.timings)
             
             # Save data
-            json_file, html_file, txt_file = self.save_data(vin)
+            with self._phase('save_data'):
+                outputs = self.save_data(vin, output_dir)
+            self._emit('saved', vin=vin, outputs=outputs)
             
             print("\n🎉 Scraping completed successfully!")
-            print(f"📁 Files saved:")
-            if json_file: print(f"   - JSON: {json_file}")
-            if html_file: print(f"   - HTML: {html_file}")
-            if txt_file: print(f"   - TXT: {txt_file}")
+            print(f"📁 Saved:")
+            for location in outputs:
+                print(f"   - {location}")
+            print("⏱️ " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.timings.items()))
+            
+            if self.cache is not None:
+                self.cache.put(vin, self.data)
             
             return True
             
         except Exception as e:
             print(f"❌ Error during scraping: {e}")
+            if self.cache is not None:
+                self.cache.put_negative(vin, str(e))
+            if self.sink is not None:
+                self.sink.write_failure(vin, str(e))
             return False
-        finally:
-            if self.driver:
-                self.driver.quit()
-                print("🔒 Browser closed")
 
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description='CARFAX Data Scraper')
-    parser.add_argument('vin', help='Vehicle VIN number')
+    parser.add_argument('vin', nargs='?', help='Vehicle VIN number')
     parser.add_argument('--output', '-o', default='output', help='Output directory')
     parser.add_argument('--chrome-path', help='Chrome executable path')
     parser.add_argument('--user-profile', help='Chrome user profile path')
+    parser.add_argument('--batch', metavar='FILE', help="File with one VIN per line ('-' for stdin)")
+    parser.add_argument('--workers', '-w', type=int, default=2, help='Parallel browser sessions in batch mode')
+    parser.add_argument('--ready-timeout', type=float, default=10.0, help='Maximum seconds to wait for the report to render')
+    parser.add_argument('--ready-conditions', default=','.join(CONDITIONS),
+                        help='Comma-separated readiness conditions: selectors, network_idle, dom_quiet')
+    parser.add_argument('--no-cache', action='store_true', help='Always scrape, ignoring cached results')
+    parser.add_argument('--cache-path', default=DEFAULT_CACHE_PATH, help='VIN result cache database')
+    parser.add_argument('--cache-ttl', type=int, default=24 * 3600, help='Seconds a cached result stays valid')
+    parser.add_argument('--sink', choices=['files', 'ndjson', 'msgpack', 'sqlite'], default='files',
+                        help='files: JSON/HTML/TXT per VIN; ndjson: one appended record per VIN; '
+                             'msgpack: appended binary archive; sqlite: indexed result store')
+    parser.add_argument('--ndjson-path', help='NDJSON output file (default: <output>/carfax_results.ndjson[.gz])')
+    parser.add_argument('--archive-path', help='msgpack archive file (default: <output>/carfax_results.mpk)')
+    parser.add_argument('--compress', action='store_true', help='gzip the NDJSON output')
+    parser.add_argument('--flush-every', type=int, default=100, help='Records buffered before each write (ndjson, sqlite)')
+    parser.add_argument('--store-path', default=DEFAULT_STORE_PATH, help='Result store database for --sink sqlite')
+    parser.add_argument('--metrics-file', help='Write phase timings and outcome counters here on exit (Prometheus text format)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile CPU (cProfile) and peak memory (tracemalloc) per phase; batch mode uses one worker')
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE_PER_MINUTE,
+                        help='Requests per minute to carfaxonline.com, shared by all scrapers on this host (0 disables)')
+    parser.add_argument('--priority', choices=list(PRIORITIES), default='batch',
+                        help='Rate limit lane; interactive requests are served before batch ones')
+    parser.add_argument('--profile-dir', default='profile', help='Directory for the per-phase .prof files')
+    parser.add_argument('--browser-profile', choices=PROFILES, default='full',
+                        help='full: headed Chrome loading everything; lean: headless with resources blocked')
+    parser.add_argument('--block', help='Comma-separated resource types to block: image, font, media, stylesheet '
+                                        "(lean default: image,font,media; '' blocks none)")
+    parser.add_argument('--capture-html', action='store_true',
+                        help='Keep the raw innerHTML of every history item (off by default to bound record size)')
+    parser.add_argument('--max-page-text', type=int, default=20000,
+                        help='Characters of page text kept per record (0 keeps all)')
+    parser.add_argument('--max-items', type=int, default=200,
+                        help='Items kept per history section, and links/images per record (0 keeps all)')
+    parser.add_argument('--save-page-source', metavar='DIR',
+                        help='Save the HTML of every loaded report here for page_parser.py (off by default)')
+    parser.add_argument('--block-domains', help="Comma-separated domains to block (lean default: known trackers; '' blocks none)")
     
     args = parser.parse_args()
     
+    sink = create_sink(
+        args.sink,
+        output_dir=args.output,
+        ndjson_path=args.ndjson_path,
+        compress=args.compress,
+        batch_size=args.flush_every,
+        store_path=args.store_path,
+        archive_path=args.archive_path
+    )
+    
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(args.cache_path, namespace='scrape', ttl=args.cache_ttl)
+    
+    profiler = PhaseProfiler(args.profile_dir).start() if args.profile else None
+    rate_limiter = create_rate_limiter(args.rate_limit)
+    browser_profile = BrowserProfile(args.browser_profile, parse_list(args.block), parse_list(args.block_domains))
+    limits = RecordLimits(
+        capture_html=args.capture_html,
+        max_page_text=args.max_page_text,
+        max_items=args.max_items,
+        max_urls=args.max_items
+    )
+    
+    def write_reports():
+        if args.metrics_file:
+            REGISTRY.write(args.metrics_file)
+        if profiler is not None:
+            profiler.stop()
+            print("\n📊 Phase profile")
+            print(profiler.report())
+            for path in profiler.dump():
+                print(f"   - {path}")
+    
+    readiness = PageReadiness(
+        selectors=SECTION_SELECTORS,
+        conditions=[c.strip() for c in args.ready_conditions.split(',') if c.strip()],
+        timeout=args.ready_timeout
+    )
+    
+    if args.batch:
+        from batch_scraper import run_batch
+        workers = args.workers
+        if profiler is not None and workers != 1:
+            print("⚠️ --profile runs the batch with a single worker")
+            workers = 1
+        with sink:
+            success = run_batch(
+                args.batch,
+                workers=workers,
+                output_dir=args.output,
+                chrome_path=args.chrome_path,
+                user_profile=args.user_profile,
+                readiness=readiness,
+                cache=cache,
+                sink=sink,
+                profiler=profiler,
+                rate_limiter=rate_limiter,
+                priority=args.priority,
+                browser_profile=browser_profile,
+                limits=limits,
+                page_source_dir=args.save_page_source
+            )
+        if cache is not None:
+            stats = cache.stats()
+            print(f"🗃️ Cache: {stats['hits']} hits, {stats['misses']} misses")
+        write_reports()
+        sys.exit(0 if success else 1)
+    
+    if not args.vin:
+        parser.error('a VIN or --batch FILE is required')
+    
     # Create scraper instance
     scraper = CarfaxScraper(
         chrome_path=args.chrome_path,
-        user_profile=args.user_profile
+        user_profile=args.user_profile,
+        readiness=readiness,
+        cache=cache,
+        sink=sink,
+        profiler=profiler,
+        rate_limiter=rate_limiter,
+        priority=args.priority,
+        browser_profile=browser_profile,
+        limits=limits,
+        page_source_dir=args.save_page_source
     )
     
     # Start scraping
-    success = scraper.scrape_carfax(args.vin)
+    with sink:
+        success = scraper.scrape_carfax(args.vin, output_dir=args.output)
+    
+    write_reports()
     
     if success:
         print("\n✅ Scraping completed successfully!")
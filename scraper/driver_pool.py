@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+WebDriver Session Pool
+Keeps warm Chrome sessions so each scrape doesn't pay a cold start
+"""
+
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class DriverPool:
+    def __init__(self, factory, size=2, max_uses=200, lease_timeout=120, keep_login=False):
+        """Initialize the pool
+
+        factory is a callable returning a new WebDriver (or None on failure).
+        Sessions are recycled after max_uses leases to bound browser memory.
+        Set keep_login when sessions run on a persistent Chrome profile:
+        cookies and localStorage are saved into that profile, so clearing
+        them between leases would log it out of CARFAX for good.
+        """
+        self.factory = factory
+        self.keep_login = keep_login
+        self.size = max(1, int(size))
+        self.max_uses = max_uses
+        self.lease_timeout = lease_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {'created': 0, 'replaced': 0, 'leases': 0}
+
+    def start(self):
+        """Pre-warm every session in the pool"""
+        for _ in range(self.size):
+            driver = self._create()
+            if driver is None:
+                break
+            self._idle.put(driver)
+        print(f"✅ Driver pool ready ({self._idle.qsize()}/{self.size} warm sessions)")
+        return self
+
+    def _create(self):
+        """Create a new session through the factory"""
+        driver = self.factory()
+        if driver is not None:
+            with self._lock:
+                self._uses[id(driver)] = 0
+                self.stats['created'] += 1
+        return driver
+
+    def _discard(self, driver):
+        """Quit a session and forget about it"""
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def is_healthy(self, driver):
+        """Check that the browser behind a session still responds"""
+        try:
+            driver.execute_script("return 1")
+            return len(driver.window_handles) > 0
+        except Exception:
+            return False
+
+    def reset_session(self, driver):
+        """Clear cookies, storage and extra tabs left by the previous lease
+
+        With keep_login only the tab's sessionStorage is cleared; the
+        profile's cookies and localStorage hold the CARFAX login.
+        """
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        if self.keep_login:
+            driver.execute_script("try { window.sessionStorage.clear(); } catch (e) {}")
+        else:
+            driver.delete_all_cookies()
+            driver.execute_script(
+                "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+            )
+        driver.get("about:blank")
+
+    def _checkout(self):
+        """Take a healthy idle session, creating or replacing one if needed"""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                return self._create()
+
+            if self.is_healthy(driver):
+                return driver
+
+            print("⚠️ Pooled browser session crashed, replacing it")
+            self._discard(driver)
+            with self._lock:
+                self.stats['replaced'] += 1
+
+    def _checkin(self, driver, broken=False):
+        """Return a session to the pool, or drop it if it can't be reused"""
+        if driver is None:
+            return
+
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+
+        if self._closed or broken or (self.max_uses and uses >= self.max_uses):
+            self._discard(driver)
+            return
+
+        try:
+            self.reset_session(driver)
+        except Exception:
+            self._discard(driver)
+            with self._lock:
+                self.stats['replaced'] += 1
+            return
+
+        self._idle.put(driver)
+
+    @contextmanager
+    def lease(self):
+        """Lease a session for the duration of one scrape"""
+        if self._closed:
+            raise RuntimeError("Driver pool is closed")
+        if not self._slots.acquire(timeout=self.lease_timeout):
+            raise TimeoutError("Timed out waiting for a free browser session")
+
+        driver = None
+        broken = False
+        try:
+            driver = self._checkout()
+            with self._lock:
+                self.stats['leases'] += 1
+            yield driver
+        except Exception:
+            broken = driver is not None and not self.is_healthy(driver)
+            raise
+        finally:
+            self._checkin(driver, broken=broken)
+            self._slots.release()
+
+    def close(self):
+        """Quit every idle session"""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+        print("🔒 Driver pool closed")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
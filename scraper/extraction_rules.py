@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+CARFAX Extraction Rules
+Selectors shared by the live browser extraction and the offline parser
+"""
+
+# Vehicle fields take the text of the first element matching their selector
+VEHICLE_FIELD_SELECTORS = {
+    'title': "h1, h2, .vehicle-title, .car-title",
+    'year_make_model': ".year-make-model, .vehicle-info, .car-info",
+    'vin': "[data-vin], .vin, .vehicle-vin"
+}
+
+# History sections keep the text (and, when captured, inner HTML) of every matching element
+HISTORY_SECTION_SELECTORS = {
+    'ownership_history': ".ownership, .owner, .history-item",
+    'accident_history': ".accident, .damage, .crash, .incident",
+    'service_history': ".service, .maintenance, .repair"
+}
+
+# Selectors whose presence means the report sections have rendered
+SECTION_SELECTORS = list(HISTORY_SECTION_SELECTORS.values())
+
+# Declarative form used by the offline parser. Each rule writes to
+# data[target] (or data[target][name] for 'first_text' rules):
+# - first_text: text of the first matching element
+# - items: {'text', 'html'} for every matching element (html only when captured)
+# - attribute: the given attribute of every matching element
+EXTRACTION_RULES = (
+    [
+        {'name': name, 'target': 'vehicle_info', 'selector': selector, 'mode': 'first_text'}
+        for name, selector in VEHICLE_FIELD_SELECTORS.items()
+    ]
+    + [
+        {'name': name, 'target': name, 'selector': selector, 'mode': 'items'}
+        for name, selector in HISTORY_SECTION_SELECTORS.items()
+    ]
+    + [
+        {'name': 'links', 'target': 'links', 'selector': 'a[href]', 'mode': 'attribute', 'attribute': 'href'},
+        {'name': 'images', 'target': 'images', 'selector': 'img[src]', 'mode': 'attribute', 'attribute': 'src'},
+    ]
+)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Host-Wide Lock
+Mutual exclusion across every process on this host through SQLite
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class HostLockTimeout(Exception):
+    """Raised when the lock was not acquired within the timeout"""
+
+
+class HostLock:
+    def __init__(self, path, timeout=60.0):
+        """A lock shared by all processes and threads that open the same path
+
+        Holding the lock is holding SQLite's write lock on path, so a
+        process that dies while holding it releases it with its file
+        handles. Waiters block for up to timeout seconds.
+        """
+        self.path = path
+        self.timeout = timeout
+        # SQLite serializes processes; this keeps threads of one process from spinning on it
+        self._local_lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def hold(self):
+        """Hold the lock for the with-block"""
+        if not self._local_lock.acquire(timeout=self.timeout):
+            raise HostLockTimeout(f"{self.path} still locked after {self.timeout:.0f}s")
+        try:
+            # A fresh connection per hold: nothing opened here survives a fork
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            try:
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                except sqlite3.OperationalError as e:
+                    raise HostLockTimeout(f"{self.path} still locked after {self.timeout:.0f}s") from e
+                try:
+                    yield
+                finally:
+                    conn.execute("ROLLBACK")
+            finally:
+                conn.close()
+        finally:
+            self._local_lock.release()
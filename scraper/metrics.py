@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Process Metrics
+Counters, gauges and histograms rendered in the Prometheus text format
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers fast cache hits up to slow report loads
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class Metric:
+    kind = 'untyped'
+    # Whether values from other processes are added up (see Registry.enable_multiprocess)
+    shared = False
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self, values=None):
+        """(suffix, label values, extra labels, value) tuples"""
+        with self._lock:
+            values = self._values if values is None else values
+            return [('', key, (), value) for key, value in sorted(values.items())]
+
+    def dump(self):
+        """[label values, value] pairs, JSON-serializable"""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def _combine(self, a, b):
+        return a + b
+
+    def merged(self, others):
+        """This process's values plus dump() entries from other processes"""
+        with self._lock:
+            values = dict(self._values)
+        for key, value in others:
+            key = tuple(key)
+            values[key] = self._combine(values[key], value) if key in values else value
+        return values
+
+    def render(self, others=None):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        values = self.merged(others) if others and self.shared else None
+        for suffix, key, extra, value in self.samples(values):
+            labels = _format_labels(self.label_names, key, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+    shared = True
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), callback=None):
+        """A value that goes up and down
+
+        With callback (unlabelled gauges only), the value is read from
+        callback() each time the metrics are rendered.
+        """
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self, values=None):
+        if self.callback is not None:
+            try:
+                return [('', (), (), self.callback())]
+            except Exception:
+                return []
+        return super().samples(values)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+    shared = True
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][index] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        """{'count', 'sum'} for one label set"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return {'count': state['count'], 'sum': state['sum']} if state else {'count': 0, 'sum': 0.0}
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), dict(state, counts=list(state['counts']))] for key, state in self._values.items()]
+
+    def _combine(self, a, b):
+        return {
+            'counts': [x + y for x, y in zip(a['counts'], b['counts'])],
+            'sum': a['sum'] + b['sum'],
+            'count': a['count'] + b['count']
+        }
+
+    def samples(self, values=None):
+        samples = []
+        with self._lock:
+            values = self._values if values is None else values
+            for key, state in sorted(values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    samples.append(('_bucket', key, (('le', _format_value(bound)),), cumulative))
+                samples.append(('_sum', key, (), state['sum']))
+                samples.append(('_count', key, (), state['count']))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        """A named set of metrics rendered together"""
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.multiprocess_dir = None
+        self._snapshot_path = None
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=(), callback=None):
+        gauge = self._register(Gauge, name, documentation, labels)
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    def enable_multiprocess(self, directory, interval=5.0):
+        """Add up counters and histograms of every process sharing directory
+
+        Each process saves its values to its own file in directory every
+        interval seconds and on exit; render() then reports the totals of
+        all of them, including processes that have since exited, so any
+        pre-forked server worker can answer a scrape for the whole
+        server. Gauges stay per process. Call it in each process after
+        the fork, and empty directory when the server starts.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.multiprocess_dir = directory
+        self._snapshot_path = os.path.join(directory, f"metrics_{os.getpid()}.json")
+
+        def save_periodically():
+            while True:
+                time.sleep(interval)
+                self.save_snapshot()
+
+        threading.Thread(target=save_periodically, name='metrics-snapshot', daemon=True).start()
+        atexit.register(self.save_snapshot)
+        self.save_snapshot()
+
+    def save_snapshot(self):
+        """Save this process's counters and histograms for the other processes"""
+        if self._snapshot_path is None:
+            return
+        with self._lock:
+            metrics = [metric for metric in self._metrics.values() if metric.shared]
+        snapshot = {metric.name: metric.dump() for metric in metrics}
+        tmp_path = f"{self._snapshot_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+            os.replace(tmp_path, self._snapshot_path)
+        except OSError:
+            pass
+
+    def _other_snapshots(self):
+        """Metric name -> dump() entries saved by the other processes"""
+        others = {}
+        try:
+            names = os.listdir(self.multiprocess_dir)
+        except OSError:
+            return others
+        for name in names:
+            path = os.path.join(self.multiprocess_dir, name)
+            if not (name.startswith('metrics_') and name.endswith('.json')) or path == self._snapshot_path:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for metric_name, entries in snapshot.items():
+                others.setdefault(metric_name, []).extend(entries)
+        return others
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        others = self._other_snapshots() if self.multiprocess_dir else {}
+        return '\n'.join(metric.render(others.get(metric.name)) for metric in metrics) + '\n'
+
+    def write(self, path):
+        """Write the metrics to a file atomically (node_exporter textfile collector)"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+# Process-wide registry used by the scraper and the Flask app
+REGISTRY = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Output Sinks
+Where scraped CARFAX records are written
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from result_store import ResultStore, DEFAULT_STORE_PATH
+from report_model import Report, require_msgpack, msgpack
+
+
+def unique_suffix():
+    """Timestamp plus random id, unique across concurrent runs"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
+
+
+class OutputSink:
+    """Base class: write() one record per VIN, close() when done"""
+
+    def write(self, vin, data):
+        """Store one record; returns a list of output locations"""
+        raise NotImplementedError
+
+    def write_failure(self, vin, error):
+        """Record a failed scrape; most sinks ignore failures"""
+        return []
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FileSink(OutputSink):
+    def __init__(self, output_dir="output"):
+        """Per-VIN JSON, HTML and TXT files (the original output format)
+
+        A small index next to the files remembers the section hashes of
+        each VIN's last written set; a re-scrape whose sections are all
+        unchanged writes nothing and returns the existing files.
+        """
+        self.output_dir = output_dir
+
+    def _index_path(self, vin):
+        return os.path.join(self.output_dir, f".carfax_{vin}.sections.json")
+
+    def _unchanged(self, vin, hashes):
+        """The files of the previous set when its sections match hashes, else None"""
+        if not hashes:
+            return None
+        try:
+            with open(self._index_path(vin), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get('section_hashes') != hashes or not all(os.path.exists(path) for path in index['files']):
+            return None
+        return index['files']
+
+    def write(self, vin, data):
+        """Write the three files for one VIN, unless nothing changed"""
+        # Create output directory
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir, exist_ok=True)
+        
+        hashes = data.get('section_hashes')
+        previous = self._unchanged(vin, hashes)
+        if previous is not None:
+            print(f"✅ Report unchanged since {os.path.basename(previous[0])}, nothing written")
+            return previous
+        
+        filename = os.path.join(self.output_dir, f"carfax_{vin}_{unique_suffix()}")
+        
+        # Save as JSON
+        json_file = f"{filename}.json"
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        print(f"✅ Data saved to JSON: {json_file}")
+        
+        # Save as HTML
+        html_file = f"{filename}.html"
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(f"<html><head><title>CARFAX Data for {vin}</title></head><body>")
+            f.write(f"<h1>CARFAX Data for VIN: {vin}</h1>")
+            f.write(f"<p>Scraped at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>")
+            f.write(f"<p>URL: {data.get('page_url', 'N/A')}</p>")
+            f.write("<hr>")
+            
+            # Vehicle Info
+            if 'vehicle_info' in data:
+                f.write("<h2>Vehicle Information</h2>")
+                for key, value in data['vehicle_info'].items():
+                    f.write(f"<p><strong>{key}:</strong> {value}</p>")
+            
+            # Ownership History
+            if 'ownership_history' in data:
+                f.write("<h2>Ownership History</h2>")
+                for item in data['ownership_history']:
+                    f.write(f"<div>{item['text']}</div>")
+            
+            # Accident History
+            if 'accident_history' in data:
+                f.write("<h2>Accident History</h2>")
+                for item in data['accident_history']:
+                    f.write(f"<div>{item['text']}</div>")
+            
+            # Service History
+            if 'service_history' in data:
+                f.write("<h2>Service History</h2>")
+                for item in data['service_history']:
+                    f.write(f"<div>{item['text']}</div>")
+            
+            f.write("</body></html>")
+        print(f"✅ Data saved to HTML: {html_file}")
+        
+        # Save as TXT
+        txt_file = f"{filename}.txt"
+        with open(txt_file, 'w', encoding='utf-8') as f:
+            f.write(f"CARFAX Data for VIN: {vin}\n")
+            f.write(f"Scraped at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"URL: {data.get('page_url', 'N/A')}\n")
+            f.write("=" * 50 + "\n\n")
+            
+            # Vehicle Info
+            if 'vehicle_info' in data:
+                f.write("VEHICLE INFORMATION:\n")
+                for key, value in data['vehicle_info'].items():
+                    f.write(f"{key}: {value}\n")
+                f.write("\n")
+            
+            # Page Content
+            if 'page_content' in data:
+                f.write("PAGE CONTENT:\n")
+                f.write(data['page_content'])
+                f.write("\n")
+        
+        print(f"✅ Data saved to TXT: {txt_file}")
+        
+        files = [json_file, html_file, txt_file]
+        if hashes:
+            with open(self._index_path(vin), 'w', encoding='utf-8') as f:
+                json.dump({'section_hashes': hashes, 'files': files}, f)
+        return files
+
+
+class NdjsonSink(OutputSink):
+    def __init__(self, path, compress=None, batch_size=100, flush_interval=5.0):
+        """Append-only newline-delimited JSON, one record per VIN
+
+        Records are buffered and written every batch_size records or
+        flush_interval seconds. compress defaults to True for '.gz' paths.
+        Safe to share between scraper threads.
+        """
+        self.path = path
+        self.compress = path.endswith('.gz') if compress is None else compress
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.records_written = 0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        if self.compress:
+            self._file = gzip.open(path, 'at', encoding='utf-8')
+        else:
+            self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, vin, data):
+        """Buffer one record and flush if the batch is full"""
+        record_id = uuid.uuid4().hex
+        line = json.dumps({
+            'record_id': record_id,
+            'vin': vin,
+            'scraped_at': datetime.now().isoformat(),
+            'data': data
+        }, ensure_ascii=False, separators=(',', ':'))
+
+        with self._lock:
+            self._buffer.append(line)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if len(self._buffer) >= self.batch_size or due:
+                self._flush_locked()
+        return [f"{self.path}#{record_id}"]
+
+    def _flush_locked(self):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self.records_written += len(self._buffer)
+            self._buffer = []
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+
+
+class MsgpackSink(OutputSink):
+    def __init__(self, path, batch_size=100, flush_interval=5.0):
+        """Append-only archive of packed Reports, read with report_model.read_archive
+
+        Much cheaper to write and reload than NDJSON, and readers can
+        decode only the fields they need. Buffered like NdjsonSink.
+        """
+        require_msgpack()
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.records_written = 0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'ab')
+
+    def write(self, vin, data):
+        """Buffer one packed record and flush if the batch is full"""
+        report = Report.from_data(vin, data, time.time())
+        entry = msgpack.packb(report.pack(), use_bin_type=True)
+
+        with self._lock:
+            self._buffer.append(entry)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if len(self._buffer) >= self.batch_size or due:
+                self._flush_locked()
+        return [f"{self.path}#{self.records_written + len(self._buffer) - 1}"]
+
+    def _flush_locked(self):
+        if self._buffer:
+            self._file.write(b"".join(self._buffer))
+            self.records_written += len(self._buffer)
+            self._buffer = []
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+
+
+class SqliteSink(OutputSink):
+    def __init__(self, store):
+        """Indexed ResultStore; failures are stored too, with status 'failed'"""
+        self.store = store
+
+    def write(self, vin, data):
+        record_id = self.store.add(vin, data, status='ok')
+        return [f"{self.store.path}#{record_id}"]
+
+    def write_failure(self, vin, error):
+        record_id = self.store.add(vin, None, status='failed', error=error)
+        return [f"{self.store.path}#{record_id}"]
+
+    def flush(self):
+        self.store.flush()
+
+    def close(self):
+        self.store.close()
+
+
+def create_sink(kind="files", output_dir="output", ndjson_path=None, compress=False, batch_size=100,
+                store_path=None, archive_path=None):
+    """Build a sink from CLI-style options"""
+    if kind == "files":
+        return FileSink(output_dir)
+    if kind == "ndjson":
+        path = ndjson_path or os.path.join(
+            output_dir, "carfax_results.ndjson.gz" if compress else "carfax_results.ndjson"
+        )
+        return NdjsonSink(path, compress=compress or None, batch_size=batch_size)
+    if kind == "msgpack":
+        path = archive_path or os.path.join(output_dir, "carfax_results.mpk")
+        return MsgpackSink(path, batch_size=batch_size)
+    if kind == "sqlite":
+        return SqliteSink(ResultStore(store_path or DEFAULT_STORE_PATH, batch_size=batch_size))
+    raise ValueError(f"Unknown output sink: {kind}")
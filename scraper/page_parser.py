@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Offline CARFAX Page Parser
+Re-extract report data from captured page_source without a browser
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+from extraction_rules import EXTRACTION_RULES
+
+# Elements whose text never shows up in rendered page text
+SKIP_TEXT_TAGS = {'script', 'style', 'noscript', 'template', 'head'}
+
+# Elements that start a new line in rendered page text
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tr', 'ul'
+}
+
+# Written at the top of every page the scraper captures, so the offline
+# parser knows which URL the page was loaded from
+SAVED_FROM_COMMENT = '<!-- saved from url=({length:04d}){url} -->\n'
+SAVED_FROM = re.compile(rb'<!-- saved from url=\(\d+\)(\S+) -->')
+
+SIMPLE_SELECTOR = re.compile(r'^(?P<tag>[a-zA-Z][\w-]*)?(?P<rest>(?:\.[\w-]+|\[[\w-]+\])*)$')
+SELECTOR_PART = re.compile(r'\.([\w-]+)|\[([\w-]+)\]')
+
+
+def compile_selector(selector):
+    """Compile 'tag', '.class', '[attr]' and combinations like 'a[href]'
+
+    Returns a list of (tag, classes, attributes) alternatives. Only the
+    simple selectors used by the extraction rules are supported.
+    """
+    alternatives = []
+    for part in selector.split(','):
+        part = part.strip()
+        match = SIMPLE_SELECTOR.match(part)
+        if not part or not match:
+            raise ValueError(f"Unsupported selector: {part!r}")
+
+        classes, attributes = set(), set()
+        for class_name, attribute in SELECTOR_PART.findall(match.group('rest')):
+            if class_name:
+                classes.add(class_name)
+            else:
+                attributes.add(attribute.lower())
+
+        tag = match.group('tag').lower() if match.group('tag') else None
+        alternatives.append((tag, frozenset(classes), frozenset(attributes)))
+    return alternatives
+
+
+class RuleSet:
+    def __init__(self, rules=EXTRACTION_RULES):
+        """Index rule alternatives by tag, class and attribute for fast lookup"""
+        self.rules = list(rules)
+        self.by_tag = {}
+        self.by_class = {}
+        self.by_attribute = {}
+
+        for index, rule in enumerate(self.rules):
+            for tag, classes, attributes in compile_selector(rule['selector']):
+                entry = (index, tag, classes, attributes)
+                if tag:
+                    self.by_tag.setdefault(tag, []).append(entry)
+                elif classes:
+                    self.by_class.setdefault(next(iter(classes)), []).append(entry)
+                elif attributes:
+                    self.by_attribute.setdefault(next(iter(attributes)), []).append(entry)
+                else:
+                    raise ValueError(f"Empty selector in rule {rule['name']!r}")
+
+    def matching_rules(self, tag, classes, attributes):
+        """Return indexes of rules matching an element, each at most once"""
+        candidates = list(self.by_tag.get(tag, ()))
+        for class_name in classes:
+            candidates.extend(self.by_class.get(class_name, ()))
+        for attribute in attributes:
+            candidates.extend(self.by_attribute.get(attribute, ()))
+
+        matched = []
+        for index, rule_tag, rule_classes, rule_attributes in candidates:
+            if index in matched:
+                continue
+            if rule_tag and rule_tag != tag:
+                continue
+            if rule_classes <= classes and rule_attributes <= attributes:
+                matched.append(index)
+        return sorted(matched)
+
+
+DEFAULT_RULES = RuleSet()
+
+
+def _collect_text(node, parts):
+    """Append the rendered text of node's subtree to parts"""
+    if node.text:
+        parts.append(node.text)
+    for child in node:
+        if isinstance(child.tag, str):
+            tag = child.tag.lower()
+            if tag == 'br':
+                parts.append('\n')
+            elif tag not in SKIP_TEXT_TAGS:
+                block = tag in BLOCK_TAGS
+                if block:
+                    parts.append('\n')
+                _collect_text(child, parts)
+                if block:
+                    parts.append('\n')
+        if child.tail:
+            parts.append(child.tail)
+
+
+def element_text(element):
+    """Approximate the browser's innerText: collapsed whitespace, one block per line"""
+    parts = []
+    _collect_text(element, parts)
+    lines = (' '.join(line.split()) for line in ''.join(parts).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def inner_html(element):
+    """Serialize the children of an element like innerHTML"""
+    html = element.text or ''
+    for child in element:
+        html += etree.tostring(child, encoding='unicode', method='html')
+    return html
+
+
+def parse_page(page_source, url=None, rules=DEFAULT_RULES, capture_html=True):
+    """Apply extraction rules to captured HTML in one tree traversal
+
+    Returns a dict shaped like CarfaxScraper.data. Without capture_html,
+    items carry only their text.
+    """
+    root = lxml.html.document_fromstring(page_source)
+
+    data = {'vehicle_info': {}}
+    for rule in rules.rules:
+        if rule['mode'] != 'first_text':
+            data[rule['target']] = []
+
+    page_title = None
+    base_url = url
+    body = None
+
+    for element in root.iter():
+        if not isinstance(element.tag, str):
+            continue
+
+        tag = element.tag.lower()
+        if tag == 'title' and page_title is None:
+            page_title = ' '.join((element.text_content() or '').split())
+        elif tag == 'body' and body is None:
+            body = element
+        elif tag == 'base' and element.get('href'):
+            base_url = urljoin(url or '', element.get('href'))
+        elif tag == 'link' and url is None and element.get('rel') == 'canonical':
+            base_url = base_url or element.get('href')
+
+        classes = set(element.get('class', '').split())
+        attributes = {name.lower() for name in element.attrib}
+        for index in rules.matching_rules(tag, classes, attributes):
+            rule = rules.rules[index]
+            mode = rule['mode']
+            if mode == 'first_text':
+                if rule['name'] not in data[rule['target']]:
+                    data[rule['target']][rule['name']] = element_text(element).strip()
+            elif mode == 'items':
+                item = {'text': element_text(element).strip()}
+                if capture_html:
+                    item['html'] = inner_html(element)
+                data[rule['target']].append(item)
+            elif mode == 'attribute':
+                value = (element.get(rule['attribute']) or '').strip()
+                if value:
+                    data[rule['target']].append(urljoin(base_url or '', value))
+
+    data['page_title'] = page_title or ''
+    # <base href> only resolves links; the page's URL is the one it was loaded from
+    data['page_url'] = url
+    data['page_content'] = element_text(body) if body is not None else ''
+    return data
+
+
+def save_page_source(path, page_source, url=None):
+    """Write captured HTML for parse_file, noting the URL it was loaded from"""
+    with open(path, 'w', encoding='utf-8') as f:
+        if url:
+            f.write(SAVED_FROM_COMMENT.format(length=len(url), url=url))
+        f.write(page_source)
+    return path
+
+
+def saved_from_url(page_source):
+    """URL recorded by save_page_source, or None"""
+    match = SAVED_FROM.search(page_source[:4096])
+    return match.group(1).decode('utf-8') if match else None
+
+
+def parse_file(path):
+    """Parse a saved page_source file"""
+    with open(path, 'rb') as f:
+        page_source = f.read()
+    data = parse_page(page_source, url=saved_from_url(page_source))
+    data['source_file'] = path
+    return data
+
+
+def main():
+    """Re-extract saved pages on all cores"""
+    parser = argparse.ArgumentParser(description='Offline CARFAX page parser')
+    parser.add_argument('files', nargs='+', help='Saved page_source HTML files (e.g. from carfax_scraper.py --save-page-source)')
+    parser.add_argument('--workers', '-w', type=int, default=os.cpu_count(), help='Parallel parser processes')
+    parser.add_argument('--output', '-o', help='Write one JSON record per page to this file (default: stdout)')
+    parser.add_argument('--benchmark', action='store_true', help='Only report parse throughput')
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    count = 0
+    out = None
+    if not args.benchmark:
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            chunksize = max(1, len(args.files) // (max(1, args.workers) * 4))
+            for data in executor.map(parse_file, args.files, chunksize=chunksize):
+                count += 1
+                if out:
+                    out.write(json.dumps(data, ensure_ascii=False) + "\n")
+    finally:
+        if out and out is not sys.stdout:
+            out.close()
+
+    elapsed = time.monotonic() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"✅ Parsed {count} pages in {elapsed:.2f}s ({rate:.1f} pages/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Page Readiness
+Wait for a loaded page to settle instead of sleeping a fixed time
+"""
+
+import time
+
+# Installed once per document; records when the DOM last changed
+INSTALL_OBSERVER_SCRIPT = """
+if (!window.__carfaxReadiness) {
+    window.__carfaxReadiness = {lastMutation: performance.now()};
+    new MutationObserver(function () {
+        window.__carfaxReadiness.lastMutation = performance.now();
+    }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+"""
+
+# One round trip per poll: everything the conditions need
+PROBE_SCRIPT = """
+var selector = arguments[0];
+var state = window.__carfaxReadiness || {lastMutation: 0};
+var now = performance.now();
+var resources = performance.getEntriesByType('resource');
+var lastResponse = 0;
+for (var i = 0; i < resources.length; i++) {
+    if (resources[i].responseEnd > lastResponse) { lastResponse = resources[i].responseEnd; }
+}
+return {
+    readyState: document.readyState,
+    selectorFound: selector ? document.querySelector(selector) !== null : false,
+    sinceMutation: now - state.lastMutation,
+    sinceResponse: now - lastResponse,
+    resourceCount: resources.length
+};
+"""
+
+CONDITIONS = ('selectors', 'network_idle', 'dom_quiet')
+
+
+class PageReadiness:
+    def __init__(self, selectors=None, conditions=CONDITIONS, timeout=10.0,
+                 network_idle_ms=500, quiet_ms=500, poll_interval=0.1):
+        """Configure when a page counts as ready
+
+        The page must reach document.readyState 'complete', then the wait
+        stops as soon as any of the enabled conditions holds:
+        - selectors: one of the given CSS selectors is present
+        - network_idle: no resource finished loading for network_idle_ms
+        - dom_quiet: no DOM mutation for quiet_ms
+        timeout is a hard deadline in seconds.
+        """
+        unknown = set(conditions) - set(CONDITIONS)
+        if unknown:
+            raise ValueError(f"Unknown readiness conditions: {', '.join(sorted(unknown))}")
+
+        self.selector = ', '.join(selectors or [])
+        self.conditions = tuple(conditions)
+        self.timeout = timeout
+        self.network_idle_ms = network_idle_ms
+        self.quiet_ms = quiet_ms
+        self.poll_interval = poll_interval
+
+    def _met(self, probe, previous):
+        """Return the first satisfied condition name, or None"""
+        if probe.get('readyState') != 'complete':
+            return None
+
+        if 'selectors' in self.conditions and probe.get('selectorFound'):
+            return 'selectors'
+
+        if 'network_idle' in self.conditions:
+            stable = previous is not None and previous.get('resourceCount') == probe.get('resourceCount')
+            if stable and probe.get('sinceResponse', 0) >= self.network_idle_ms:
+                return 'network_idle'
+
+        if 'dom_quiet' in self.conditions and probe.get('sinceMutation', 0) >= self.quiet_ms:
+            return 'dom_quiet'
+
+        return None
+
+    def wait(self, driver):
+        """Block until the page is ready or the deadline passes
+
+        Returns a dict with the condition that fired, whether the deadline
+        was hit, and how long was actually waited.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        previous = None
+        condition = None
+
+        try:
+            driver.execute_script(INSTALL_OBSERVER_SCRIPT)
+        except Exception:
+            pass
+
+        while True:
+            try:
+                probe = driver.execute_script(PROBE_SCRIPT, self.selector) or {}
+            except Exception:
+                probe = {}
+
+            condition = self._met(probe, previous)
+            if condition or time.monotonic() >= deadline:
+                break
+
+            previous = probe
+            time.sleep(self.poll_interval)
+
+        return {
+            'condition': condition,
+            'timed_out': condition is None,
+            'waited_seconds': round(time.monotonic() - start, 3)
+        }
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Scrape Phase Profiler
+cProfile and tracemalloc per scrape phase, for the CLI's --profile mode
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class PhaseProfiler:
+    def __init__(self, output_dir='profile', top=15):
+        """Collect CPU and memory profiles per phase name
+
+        Each phase gets its own cProfile.Profile, accumulated across VINs,
+        plus wall time, CPU time and the peak traced memory allocated while
+        it ran. Phases must not nest, and only one thread may profile at a
+        time, so batch runs are profiled with a single worker.
+        """
+        self.output_dir = output_dir
+        self.top = top
+        self._profiles = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name):
+        """Profile the with-block under the given phase name"""
+        with self._lock:
+            profile = self._profiles.setdefault(name, cProfile.Profile())
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak = tracemalloc.get_traced_memory()[1] - base if tracing else 0
+            with self._lock:
+                stats = self._stats.setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_bytes': 0})
+                stats['calls'] += 1
+                stats['wall'] += wall
+                stats['cpu'] += cpu
+                stats['peak_bytes'] = max(stats['peak_bytes'], peak)
+
+    def summary(self):
+        """Per-phase totals: calls, wall and CPU seconds, peak bytes allocated"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def report(self):
+        """Summary table followed by the hottest functions of each phase"""
+        summary = self.summary()
+        lines = [
+            f"{'phase':<28}{'calls':>7}{'wall s':>10}{'cpu s':>10}{'peak KiB':>11}",
+            '-' * 66
+        ]
+        for name, stats in sorted(summary.items(), key=lambda item: -item[1]['wall']):
+            lines.append(
+                f"{name:<28}{stats['calls']:>7}{stats['wall']:>10.3f}{stats['cpu']:>10.3f}"
+                f"{stats['peak_bytes'] / 1024:>11.1f}"
+            )
+
+        for name in sorted(summary, key=lambda n: -summary[n]['cpu']):
+            buffer = io.StringIO()
+            pstats.Stats(self._profiles[name], stream=buffer).sort_stats('cumulative').print_stats(self.top)
+            lines.append(f"\n=== {name} ===")
+            lines.append(buffer.getvalue().strip())
+        return '\n'.join(lines)
+
+    def dump(self):
+        """Write one .prof file per phase (for snakeviz/pstats); returns the paths"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = []
+        with self._lock:
+            profiles = dict(self._profiles)
+        for name, profile in profiles.items():
+            path = os.path.join(self.output_dir, f"{name}.prof")
+            profile.dump_stats(path)
+            paths.append(path)
+        return paths
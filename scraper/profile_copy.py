@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Chrome Profile Copies
+Throwaway copies of a logged-in Chrome profile for parallel sessions
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+
+# What a copy needs to stay logged in to CARFAX; caches and history are left behind
+USER_DATA_FILES = ('Local State',)  # holds the key Chrome encrypts cookies with
+PROFILE_FILES = (
+    'Cookies',
+    'Network',
+    'Local Storage',
+    'Session Storage',
+    'Preferences',
+    'Secure Preferences',
+)
+
+
+def copy_profile(user_data_dir, destination, profile_directory='Default'):
+    """Copy the login state of one Chrome profile into a new user data dir
+
+    Only cookies, local storage and preferences are copied, so a copy
+    takes megabytes rather than the gigabytes of a full profile. Files
+    missing from the source (older or newer Chrome layouts) are skipped.
+    """
+    target_profile = os.path.join(destination, profile_directory)
+    os.makedirs(target_profile, exist_ok=True)
+    for name in USER_DATA_FILES:
+        source = os.path.join(user_data_dir, name)
+        if os.path.isfile(source):
+            shutil.copy2(source, os.path.join(destination, name))
+    for name in PROFILE_FILES:
+        source = os.path.join(user_data_dir, profile_directory, name)
+        target = os.path.join(target_profile, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, target, ignore=shutil.ignore_patterns('LOCK', '*.lock'))
+        elif os.path.isfile(source):
+            shutil.copy2(source, target)
+    return destination
+
+
+class ProfileCopies:
+    def __init__(self, user_data_dir, profile_directory='Default', root=None):
+        """Hand out a fresh copy of a profile to every new browser session
+
+        Chrome refuses to open one user data dir in two running browsers,
+        so parallel sessions can't share the user's profile. Each call to
+        new() copies its login state into its own folder under root (a
+        temporary folder by default); cleanup() removes them all. Logins
+        made in a copy are not written back to the user's profile.
+        """
+        self.user_data_dir = user_data_dir
+        self.profile_directory = profile_directory
+        self.root = root or tempfile.mkdtemp(prefix='carfax-profiles-')
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new(self):
+        """Path of a new copy, ready for --user-data-dir"""
+        with self._lock:
+            number = next(self._counter)
+        destination = os.path.join(self.root, f"session-{number}")
+        return copy_profile(self.user_data_dir, destination, self.profile_directory)
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -7,14 +7,25 @@ Simple script to scrape CARFAX data for a VIN
 import sys
 import os
 from carfax_scraper import CarfaxScraper
+from batch_scraper import run_batch
 
 def main():
     """Quick scraper main function"""
     if len(sys.argv) < 2:
         print("Usage: python quick_scraper.py <VIN>")
+        print("       python quick_scraper.py --batch <FILE|-> [WORKERS]")
         print("Example: python quick_scraper.py 1HGBH41JXMN109186")
         sys.exit(1)
     
+    if sys.argv[1] == '--batch':
+        if len(sys.argv) < 3:
+            print("Usage: python quick_scraper.py --batch <FILE|-> [WORKERS]")
+            sys.exit(1)
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+        success = run_batch(sys.argv[2], workers=workers)
+        print("📁 Check the 'output' folder for results")
+        sys.exit(0 if success else 1)
+    
     vin = sys.argv[1].strip().upper()
     
     print(f"🚀 Quick CARFAX Scraper")
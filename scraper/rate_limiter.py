@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Outbound Rate Limiter
+Host-wide token bucket with priority lanes for requests to carfaxonline.com
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from metrics import REGISTRY
+
+DEFAULT_RATE_LIMIT_PATH = os.environ.get(
+    'CARFAX_RATE_LIMIT_PATH',
+    os.path.join(os.path.expanduser('~'), '.carfax', 'rate_limit.sqlite3')
+)
+DEFAULT_RATE_PER_MINUTE = float(os.environ.get('CARFAX_RATE_PER_MINUTE', 30))
+DEFAULT_BURST = int(os.environ.get('CARFAX_RATE_BURST', 5))
+
+# Lower value = served first; interactive lookups jump ahead of batch work
+PRIORITIES = {'interactive': 0, 'batch': 1}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiters (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    heartbeat REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_waiters_order ON waiters (key, priority, enqueued_at);
+"""
+
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram(
+    'carfax_rate_limit_wait_seconds', 'Time spent waiting for an outbound request slot', labels=('priority',)
+)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no request slot became free within the timeout"""
+
+
+class RateLimiter:
+    def __init__(self, path=DEFAULT_RATE_LIMIT_PATH, key='carfaxonline.com', per_minute=DEFAULT_RATE_PER_MINUTE,
+                 burst=DEFAULT_BURST, poll_interval=0.05, stale_after=30.0):
+        """Token bucket shared by every process on this host through SQLite
+
+        Tokens refill at per_minute and accumulate up to burst. Waiters
+        are served strictly in priority order, then first come first
+        served, so a queued interactive request goes before any batch
+        request. Waiters that stop polling for stale_after seconds
+        (a crashed process) are dropped from the queue.
+        """
+        self.path = path
+        self.key = key
+        self.rate = per_minute / 60.0
+        self.burst = max(1, int(burst))
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        # Short-lived connection: nothing opened here survives a fork
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        """One connection per thread; SQLite connections can't be shared"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _refill(self, conn, now):
+        """Current token count after refilling since the last update"""
+        row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (self.key,)).fetchone()
+        if row is None:
+            return float(self.burst)
+        tokens, updated_at = row
+        return min(float(self.burst), tokens + max(0.0, now - updated_at) * self.rate)
+
+    def _try_acquire(self, waiter_id, priority, enqueued_at):
+        """One scheduling round; returns seconds to sleep, or None once a token is taken"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO waiters (id, key, priority, enqueued_at, heartbeat) VALUES (?, ?, ?, ?, ?)",
+                (waiter_id, self.key, priority, enqueued_at, now)
+            )
+            conn.execute(
+                "DELETE FROM waiters WHERE key = ? AND heartbeat < ?", (self.key, now - self.stale_after)
+            )
+            head = conn.execute(
+                "SELECT id FROM waiters WHERE key = ? ORDER BY priority, enqueued_at LIMIT 1", (self.key,)
+            ).fetchone()
+            tokens = self._refill(conn, now)
+
+            if head[0] == waiter_id and tokens >= 1:
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (self.key, tokens - 1, now)
+                )
+                conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+                conn.execute("COMMIT")
+                return None
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if tokens >= 1 or self.rate <= 0:
+            # A token is there for whoever is ahead of us; check back soon
+            return self.poll_interval
+        # Nothing can be granted before the next token is due; heartbeat well before going stale
+        delay = max(self.poll_interval, (1 - tokens) / self.rate)
+        if head[0] != waiter_id:
+            delay = min(delay, 1.0)
+        return min(delay, self.stale_after / 2)
+
+    def _leave(self, waiter_id):
+        self._connect().execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+
+    def acquire(self, priority='batch', timeout=None):
+        """Block until a request may be sent; returns the seconds waited
+
+        Raises RateLimitTimeout if timeout seconds pass first.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {', '.join(PRIORITIES)}")
+        waiter_id = uuid.uuid4().hex
+        start = time.time()
+        deadline = start + timeout if timeout is not None else None
+        try:
+            while True:
+                delay = self._try_acquire(waiter_id, PRIORITIES[priority], start)
+                if delay is None:
+                    waited = time.time() - start
+                    RATE_LIMIT_WAIT_SECONDS.observe(waited, priority=priority)
+                    return waited
+                if deadline is not None and time.time() + delay > deadline:
+                    raise RateLimitTimeout(f"No request slot within {timeout:.0f}s")
+                time.sleep(delay)
+        except BaseException:
+            self._leave(waiter_id)
+            raise
+
+    def stats(self):
+        """Tokens available now and waiters per lane"""
+        conn = self._connect()
+        tokens = self._refill(conn, time.time())
+        waiting = dict(conn.execute(
+            "SELECT priority, COUNT(*) FROM waiters WHERE key = ? GROUP BY priority", (self.key,)
+        ).fetchall())
+        return {
+            'tokens': round(tokens, 3),
+            'per_minute': self.rate * 60,
+            'burst': self.burst,
+            'waiting': {name: waiting.get(level, 0) for name, level in PRIORITIES.items()}
+        }
+
+
+def create_rate_limiter(per_minute=DEFAULT_RATE_PER_MINUTE, path=DEFAULT_RATE_LIMIT_PATH, burst=DEFAULT_BURST):
+    """RateLimiter for carfaxonline.com, or None when per_minute is 0 (disabled)"""
+    if not per_minute or per_minute <= 0:
+        return None
+    return RateLimiter(path, per_minute=per_minute, burst=burst)
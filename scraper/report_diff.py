@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Report Sections
+Content hashes of report sections and what changed between two captures
+"""
+
+import hashlib
+import json
+
+# Parts of a report hashed and stored separately; everything else
+# (timings, readiness, browser metrics) changes on every scrape anyway
+SECTIONS = (
+    'vehicle_info',
+    'ownership_history',
+    'accident_history',
+    'service_history',
+    'page_content',
+    'links',
+    'images',
+)
+
+
+def section_hash(value):
+    """Stable content hash of one section's value"""
+    canonical = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def hash_sections(data):
+    """Section name -> content hash for every section present in data"""
+    return {name: section_hash(data[name]) for name in SECTIONS if name in data}
+
+
+def changed_sections(previous, current):
+    """Sections whose hash differs, including ones added or dropped; all of them without a previous capture"""
+    if previous is None:
+        return sorted(current)
+    return sorted(name for name in set(previous) | set(current) if previous.get(name) != current.get(name))
+
+
+def _item_key(item):
+    return item.get('text') if isinstance(item, dict) else item
+
+
+def diff_section(before, after):
+    """Describe how one section changed
+
+    Lists (history items, links, images) report the entries added and
+    removed, dicts (vehicle_info) the keys whose value changed, and text
+    (page_content) just its length before and after.
+    """
+    if isinstance(before, list) or isinstance(after, list):
+        before, after = before or [], after or []
+        before_keys = {_item_key(item) for item in before}
+        after_keys = {_item_key(item) for item in after}
+        return {
+            'added': [item for item in after if _item_key(item) not in before_keys],
+            'removed': [item for item in before if _item_key(item) not in after_keys]
+        }
+    if isinstance(before, dict) or isinstance(after, dict):
+        before, after = before or {}, after or {}
+        return {
+            'changed': {
+                key: {'before': before.get(key), 'after': after.get(key)}
+                for key in sorted(set(before) | set(after))
+                if before.get(key) != after.get(key)
+            }
+        }
+    return {
+        'before_length': len(before) if before is not None else None,
+        'after_length': len(after) if after is not None else None
+    }
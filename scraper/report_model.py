@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Report Model
+Slotted record classes for scraped reports, with JSON and msgpack encodings
+"""
+
+import argparse
+import json
+import sys
+import time
+
+try:
+    import msgpack
+except ImportError:  # only the JSON encoding is available without it
+    msgpack = None
+
+# Bumped whenever REPORT_FIELDS changes order or meaning
+PACK_VERSION = 1
+
+
+def require_msgpack():
+    if msgpack is None:
+        raise RuntimeError("msgpack is required for the binary report format (pip install msgpack)")
+
+
+class VehicleInfo:
+    __slots__ = ('title', 'year_make_model', 'vin')
+
+    def __init__(self, title=None, year_make_model=None, vin=None):
+        """Vehicle fields of a report; each is a str or None when not found"""
+        self.title = title
+        self.year_make_model = year_make_model
+        self.vin = vin
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(data.get('title'), data.get('year_make_model'), data.get('vin'))
+
+    def to_dict(self):
+        # Fields that weren't found are left out, as in the scraped dict
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+    def to_list(self):
+        return [self.title, self.year_make_model, self.vin]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+    def __eq__(self, other):
+        return isinstance(other, VehicleInfo) and self.to_list() == other.to_list()
+
+    def __repr__(self):
+        return f"VehicleInfo(title={self.title!r}, year_make_model={self.year_make_model!r}, vin={self.vin!r})"
+
+
+class HistoryEntry:
+    __slots__ = ('text', 'html')
+
+    def __init__(self, text='', html=None):
+        """One ownership, accident or service item; html only when captured"""
+        self.text = text
+        self.html = html
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('text') or '', data.get('html'))
+
+    def to_dict(self):
+        if self.html is None:
+            return {'text': self.text}
+        return {'text': self.text, 'html': self.html}
+
+    def to_list(self):
+        # Text-only entries pack as a bare string
+        return self.text if self.html is None else [self.text, self.html]
+
+    @classmethod
+    def from_list(cls, value):
+        return cls(value) if isinstance(value, str) else cls(*value)
+
+    def __eq__(self, other):
+        return isinstance(other, HistoryEntry) and (self.text, self.html) == (other.text, other.html)
+
+    def __repr__(self):
+        return f"HistoryEntry(text={self.text!r}, html={self.html!r})"
+
+
+def _entries_to_list(entries):
+    return [entry.to_list() for entry in entries]
+
+
+def _entries_from_list(values):
+    return [HistoryEntry.from_list(value) for value in values]
+
+
+def _identity(value):
+    return value
+
+
+# Wire order of the packed form: (name, pack, unpack, default factory)
+REPORT_FIELDS = (
+    ('vin', _identity, _identity, lambda: ''),
+    ('scraped_at', _identity, _identity, lambda: None),
+    ('vehicle_info', VehicleInfo.to_list, VehicleInfo.from_list, VehicleInfo),
+    ('ownership_history', _entries_to_list, _entries_from_list, list),
+    ('accident_history', _entries_to_list, _entries_from_list, list),
+    ('service_history', _entries_to_list, _entries_from_list, list),
+    ('page_title', _identity, _identity, lambda: None),
+    ('page_url', _identity, _identity, lambda: None),
+    ('page_content', _identity, _identity, lambda: None),
+    ('links', _identity, _identity, list),
+    ('images', _identity, _identity, list),
+    ('timings', _identity, _identity, dict),
+    ('readiness', _identity, _identity, lambda: None),
+    ('browser', _identity, _identity, lambda: None),
+    ('truncated', _identity, _identity, lambda: None),
+    ('extra', _identity, _identity, dict),
+)
+REPORT_FIELD_NAMES = tuple(field[0] for field in REPORT_FIELDS)
+FIELD_INDEX = {name: index for index, name in enumerate(REPORT_FIELD_NAMES)}
+
+HISTORY_SECTIONS = ('ownership_history', 'accident_history', 'service_history')
+# Fields stored in the scraped dict as they are
+PLAIN_FIELDS = ('page_title', 'page_url', 'page_content', 'links', 'images', 'timings', 'readiness', 'browser',
+                'truncated')
+# Keys of the scraped dict a reader can ask for by name
+DATA_FIELDS = ('vehicle_info',) + HISTORY_SECTIONS + PLAIN_FIELDS
+
+
+class Report:
+    __slots__ = REPORT_FIELD_NAMES
+
+    def __init__(self, **values):
+        """A scraped report as typed fields
+
+        vin (str), scraped_at (epoch float or None), vehicle_info
+        (VehicleInfo), the three history sections (lists of HistoryEntry),
+        page_title / page_url / page_content (str), links and images
+        (lists of str), timings (phase -> seconds), readiness, browser
+        and truncated (dicts). Keys of the scraped dict the model doesn't
+        know are kept in extra so nothing is lost. Fields the scrape
+        didn't produce, or a partial decode didn't load, are None.
+        """
+        unknown = set(values) - set(REPORT_FIELD_NAMES)
+        if unknown:
+            raise TypeError(f"Unknown report fields: {', '.join(sorted(unknown))}")
+        for name, _, _, default in REPORT_FIELDS:
+            setattr(self, name, values[name] if name in values else default())
+
+    @classmethod
+    def from_data(cls, vin, data, scraped_at=None):
+        """Build from the dict a scrape produces (CarfaxScraper.data)"""
+        data = dict(data or {})
+        values = {'vin': vin, 'scraped_at': scraped_at}
+        # Absent fields (a failed extraction, a partial load) stay None, distinguishable from empty
+        values['vehicle_info'] = VehicleInfo.from_dict(data.pop('vehicle_info')) if 'vehicle_info' in data else None
+        for section in HISTORY_SECTIONS:
+            if section in data:
+                values[section] = [HistoryEntry.from_dict(item) for item in data.pop(section) or []]
+            else:
+                values[section] = None
+        for name in PLAIN_FIELDS:
+            values[name] = data.pop(name, None)
+        values['extra'] = data
+        return cls(**values)
+
+    def to_data(self):
+        """The scraped dict this report was built from"""
+        data = {}
+        if self.vehicle_info is not None:
+            data['vehicle_info'] = self.vehicle_info.to_dict()
+        for section in HISTORY_SECTIONS:
+            entries = getattr(self, section)
+            if entries is not None:
+                data[section] = [entry.to_dict() for entry in entries]
+        for name in PLAIN_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        data.update(self.extra or {})
+        return data
+
+    def to_json(self):
+        return json.dumps(self.to_data(), ensure_ascii=False, separators=(',', ':'))
+
+    def pack(self):
+        """msgpack bytes: a version tag and one separately packed blob per field
+
+        Each field is its own blob so unpack() can decode only the fields
+        a reader asks for and skip the rest (page text, history HTML).
+        """
+        require_msgpack()
+        blobs = [PACK_VERSION]
+        for name, pack, _, _ in REPORT_FIELDS:
+            value = getattr(self, name)
+            blobs.append(msgpack.packb(pack(value) if value is not None else None, use_bin_type=True))
+        return msgpack.packb(blobs, use_bin_type=True)
+
+    @classmethod
+    def unpack(cls, payload, fields=None):
+        """Decode pack() output; with fields, only those are decoded"""
+        require_msgpack()
+        blobs = msgpack.unpackb(payload, raw=False)
+        if blobs[0] != PACK_VERSION:
+            raise ValueError(f"Unsupported packed report version {blobs[0]}")
+        indexes = range(len(REPORT_FIELDS)) if fields is None else [FIELD_INDEX[name] for name in fields]
+        report = cls.__new__(cls)
+        for name in REPORT_FIELD_NAMES:
+            setattr(report, name, None)
+        for index in indexes:
+            name, _, unpack, _ = REPORT_FIELDS[index]
+            value = msgpack.unpackb(blobs[index + 1], raw=False, strict_map_key=False)
+            setattr(report, name, unpack(value) if value is not None else None)
+        return report
+
+    def __eq__(self, other):
+        return isinstance(other, Report) and all(
+            getattr(self, name) == getattr(other, name) for name in REPORT_FIELD_NAMES
+        )
+
+    def __repr__(self):
+        return f"Report(vin={self.vin!r}, scraped_at={self.scraped_at!r})"
+
+
+def unpack_fields(payload, fields):
+    """Only the requested fields of a packed report, as plain values
+
+    Cheaper than Report.unpack when a reader wants e.g. the accident
+    count of every report and nothing else.
+    """
+    require_msgpack()
+    blobs = msgpack.unpackb(payload, raw=False)
+    if blobs[0] != PACK_VERSION:
+        raise ValueError(f"Unsupported packed report version {blobs[0]}")
+    values = {}
+    for name in fields:
+        index = FIELD_INDEX[name]
+        value = msgpack.unpackb(blobs[index + 1], raw=False, strict_map_key=False)
+        values[name] = REPORT_FIELDS[index][2](value) if value is not None else None
+    return values
+
+
+def write_archive(path, reports):
+    """Write reports to a msgpack archive, one packed report per entry"""
+    require_msgpack()
+    count = 0
+    with open(path, 'wb') as f:
+        for report in reports:
+            f.write(msgpack.packb(report.pack(), use_bin_type=True))
+            count += 1
+    return count
+
+
+def read_archive(path, fields=None):
+    """Yield the reports of a msgpack archive, decoding only fields when given"""
+    require_msgpack()
+    with open(path, 'rb') as f:
+        for payload in msgpack.Unpacker(f, raw=False, max_buffer_size=0):
+            yield Report.unpack(payload, fields)
+
+
+def read_ndjson(path):
+    """Yield Reports from an NdjsonSink file (.gz supported)"""
+    import gzip
+    from datetime import datetime
+
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            scraped_at = record.get('scraped_at')
+            if isinstance(scraped_at, str):
+                scraped_at = datetime.fromisoformat(scraped_at).timestamp()
+            yield Report.from_data(record.get('vin'), record.get('data'), scraped_at)
+
+
+def benchmark(reports, fields):
+    """Seconds to reload the reports as JSON, as full msgpack and as partial msgpack"""
+    encoded_json = [report.to_json() for report in reports]
+    packed = [report.pack() for report in reports]
+
+    timings = {}
+    start = time.perf_counter()
+    for line in encoded_json:
+        json.loads(line)
+    timings['json'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payload in packed:
+        Report.unpack(payload)
+    timings['msgpack'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payload in packed:
+        unpack_fields(payload, fields)
+    timings[f"msgpack ({','.join(fields)})"] = time.perf_counter() - start
+
+    sizes = {
+        'json': sum(len(line.encode('utf-8')) for line in encoded_json),
+        'msgpack': sum(len(payload) for payload in packed)
+    }
+    return timings, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert NDJSON results to a msgpack archive and compare reload speed')
+    parser.add_argument('source', help='NDJSON results file (from --sink ndjson)')
+    parser.add_argument('--output', '-o', help='Write the msgpack archive here')
+    parser.add_argument('--benchmark', action='store_true', help='Time reloading as JSON vs msgpack')
+    parser.add_argument('--fields', default='vin,scraped_at,accident_history',
+                        help='Fields decoded by the partial-load benchmark')
+    args = parser.parse_args()
+
+    reports = list(read_ndjson(args.source))
+    print(f"✅ Read {len(reports)} reports from {args.source}")
+
+    if args.output:
+        count = write_archive(args.output, reports)
+        print(f"✅ Wrote {count} reports to {args.output}")
+
+    if args.benchmark:
+        timings, sizes = benchmark(reports, [f.strip() for f in args.fields.split(',') if f.strip()])
+        print(f"📦 Size: JSON {sizes['json'] / 1024:.1f} KiB, msgpack {sizes['msgpack'] / 1024:.1f} KiB")
+        baseline = timings['json']
+        for name, seconds in timings.items():
+            speedup = baseline / seconds if seconds > 0 else float('inf')
+            print(f"⏱️ {name:<40} {seconds:8.3f}s  {speedup:5.1f}x")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+VIN Result Cache
+SQLite-backed cache shared by the scraper and the Flask app
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    'CARFAX_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.carfax', 'vin_cache.sqlite3')
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vin_cache (
+    namespace TEXT NOT NULL,
+    vin TEXT NOT NULL,
+    value TEXT,
+    negative INTEGER NOT NULL DEFAULT 0,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (namespace, vin)
+);
+CREATE INDEX IF NOT EXISTS idx_vin_cache_lru ON vin_cache (namespace, last_access);
+"""
+
+
+class ResultCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, namespace='scrape', ttl=24 * 3600,
+                 negative_ttl=3600, max_entries=10000):
+        """Open (or create) the cache
+
+        namespace keeps different kinds of results for the same VIN apart
+        ('scrape' for scraper reports, 'launch' for app lookups). Entries
+        expire after ttl seconds, failures after negative_ttl, and the
+        least recently used entries are evicted beyond max_entries.
+        """
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        # Short-lived connection: nothing opened here survives a fork
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        """One connection per thread; SQLite connections can't be shared"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def normalize(vin):
+        """Cache key for a VIN"""
+        return (vin or '').strip().upper()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, vin):
+        """Return the live entry for a VIN, or None
+
+        The entry is a dict with 'value', 'negative' and 'stored_at'.
+        """
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, negative, stored_at, expires_at FROM vin_cache WHERE namespace = ? AND vin = ?",
+            (self.namespace, self.normalize(vin))
+        ).fetchone()
+
+        if row is None or row[3] <= now:
+            self._count(False)
+            return None
+
+        conn.execute(
+            "UPDATE vin_cache SET last_access = ? WHERE namespace = ? AND vin = ?",
+            (now, self.namespace, self.normalize(vin))
+        )
+        self._count(True)
+        return {
+            'value': json.loads(row[0]) if row[0] is not None else None,
+            'negative': bool(row[1]),
+            'stored_at': row[2]
+        }
+
+    def _store(self, vin, value, negative, ttl):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO vin_cache "
+                "(namespace, vin, value, negative, stored_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, self.normalize(vin), json.dumps(value, ensure_ascii=False),
+                 int(negative), now, now + ttl, now)
+            )
+            if self.max_entries:
+                conn.execute(
+                    "DELETE FROM vin_cache WHERE namespace = ? AND vin IN ("
+                    "SELECT vin FROM vin_cache WHERE namespace = ? "
+                    "ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_entries)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def put(self, vin, value):
+        """Cache a successful result"""
+        self._store(vin, value, False, self.ttl)
+
+    def put_negative(self, vin, error, **details):
+        """Cache a failure or not-found result for the shorter negative TTL
+
+        details (e.g. an HTTP status) are stored alongside the error.
+        """
+        self._store(vin, dict(details, error=error), True, self.negative_ttl)
+
+    def invalidate(self, vin):
+        """Drop a VIN from the cache"""
+        self._connect().execute(
+            "DELETE FROM vin_cache WHERE namespace = ? AND vin = ?",
+            (self.namespace, self.normalize(vin))
+        )
+
+    def purge_expired(self):
+        """Delete expired entries; returns how many were removed"""
+        cursor = self._connect().execute(
+            "DELETE FROM vin_cache WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, time.time())
+        )
+        return cursor.rowcount
+
+    def stats(self):
+        """Hit/miss counters for this process and current entry count"""
+        size = self._connect().execute(
+            "SELECT COUNT(*) FROM vin_cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'namespace': self.namespace,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'entries': size
+        }
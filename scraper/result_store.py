@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Scrape Result Store
+Indexed SQLite store of scraped CARFAX reports with a query API
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from report_model import Report, msgpack
+from report_diff import SECTIONS, hash_sections, changed_sections, diff_section
+
+DEFAULT_STORE_PATH = os.environ.get(
+    'CARFAX_STORE_PATH',
+    os.path.join(os.path.expanduser('~'), '.carfax', 'results.sqlite3')
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_id TEXT NOT NULL UNIQUE,
+    vin TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    data TEXT,
+    section_hashes TEXT,
+    changed TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reports_vin_time ON reports (vin, scraped_at);
+CREATE INDEX IF NOT EXISTS idx_reports_time ON reports (scraped_at);
+CREATE INDEX IF NOT EXISTS idx_reports_status_time ON reports (status, scraped_at);
+-- Content-addressed: identical section values (in any report) are stored once
+CREATE TABLE IF NOT EXISTS sections (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+"""
+
+# Columns added after the first release; stores created before get them on open
+MIGRATIONS = (
+    ('section_hashes', 'TEXT'),
+    ('changed', 'TEXT'),
+)
+
+SUMMARY_COLUMNS = "id, record_id, vin, scraped_at, status, error, changed"
+DATA_COLUMNS = "data, section_hashes"
+
+
+def parse_timestamp(value):
+    """Accept epoch seconds or an ISO-8601 string; return epoch seconds"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class ResultStore:
+    def __init__(self, path=DEFAULT_STORE_PATH, batch_size=200, packed=None):
+        """Open (or create) the store
+
+        Writes are buffered and committed batch_size at a time in one
+        transaction; call flush() or close() to commit the remainder.
+        With packed (the default when msgpack is installed) report data
+        is stored as a packed Report blob instead of JSON text; both
+        kinds of row are read back transparently.
+
+        Report sections (see report_diff.SECTIONS) are stored once per
+        distinct content in the sections table. Each report row keeps
+        their hashes plus the small remainder of the data, and a
+        re-scrape only writes the sections that changed since the VIN's
+        previous capture; an unchanged re-scrape writes none.
+        """
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.packed = msgpack is not None if packed is None else packed
+        self._local = threading.local()
+        self._pending = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        # Short-lived connection: nothing opened here survives a fork
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.executescript(SCHEMA)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+            for column, kind in MIGRATIONS:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE reports ADD COLUMN {column} {kind}")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        """One connection per thread; SQLite connections can't be shared"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _encode(self, value):
+        if self.packed:
+            return msgpack.packb(value, use_bin_type=True)
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def _decode(blob):
+        if isinstance(blob, bytes):
+            return msgpack.unpackb(blob, raw=False, strict_map_key=False)
+        return json.loads(blob)
+
+    # Writing
+
+    def add(self, vin, data=None, status='ok', error=None, scraped_at=None):
+        """Queue one report; returns its record_id
+
+        data's sections are split off here and only written at flush
+        time, once it's known which of them changed.
+        """
+        record_id = uuid.uuid4().hex
+        vin = (vin or '').strip().upper()
+        scraped_at = scraped_at if scraped_at is not None else time.time()
+        payload = hashes = sections = None
+        if data is not None:
+            rest = dict(data)
+            sections = {name: rest.pop(name) for name in SECTIONS if name in rest}
+            hashes = rest.pop('section_hashes', None) or hash_sections(sections)
+            if self.packed:
+                payload = Report.from_data(vin, rest, scraped_at).pack()
+            else:
+                payload = json.dumps(rest, ensure_ascii=False, separators=(',', ':'))
+        row = (record_id, vin, scraped_at, status, error, payload, hashes, sections)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+        return record_id
+
+    @staticmethod
+    def _previous_hashes(conn, vin):
+        """Section hashes of the VIN's latest stored capture, or None"""
+        row = conn.execute(
+            "SELECT section_hashes FROM reports WHERE vin = ? AND section_hashes IS NOT NULL "
+            "ORDER BY scraped_at DESC, id DESC LIMIT 1",
+            (vin,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Earlier captures of the same VIN within this batch count as previous too
+            previous = {}
+            rows = []
+            for record_id, vin, scraped_at, status, error, payload, hashes, sections in self._pending:
+                changed = None
+                if hashes is not None:
+                    before = previous[vin] if vin in previous else self._previous_hashes(conn, vin)
+                    changed = changed_sections(before, hashes)
+                    # Unchanged sections are neither encoded nor written
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO sections (hash, data) VALUES (?, ?)",
+                        [(hashes[name], self._encode(sections[name])) for name in changed if name in sections]
+                    )
+                    previous[vin] = hashes
+                rows.append((
+                    record_id, vin, scraped_at, status, error, payload,
+                    json.dumps(hashes, sort_keys=True) if hashes is not None else None,
+                    json.dumps(changed) if changed is not None else None
+                ))
+            conn.executemany(
+                "INSERT INTO reports (record_id, vin, scraped_at, status, error, data, section_hashes, changed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._pending = []
+
+    def flush(self):
+        """Commit queued reports"""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # Querying
+
+    @staticmethod
+    def _data(payload, fields=None):
+        """Decode a stored data column, keeping only fields when given"""
+        if not payload:
+            return None
+        if isinstance(payload, bytes):
+            return Report.unpack(payload, fields).to_data()
+        data = json.loads(payload)
+        if fields is not None:
+            data = {name: data[name] for name in fields if name in data}
+        return data
+
+    def _load_sections(self, wanted, cache=None):
+        """Section name -> value for a map of section name -> hash"""
+        found = cache if cache is not None else {}
+        missing = sorted({digest for digest in wanted.values() if digest not in found})
+        if missing:
+            placeholders = ', '.join('?' * len(missing))
+            for digest, blob in self._connect().execute(
+                    f"SELECT hash, data FROM sections WHERE hash IN ({placeholders})", missing):
+                found[digest] = self._decode(blob)
+        return {name: found[digest] for name, digest in wanted.items() if digest in found}
+
+    def _report_data(self, row, fields=None, cache=None):
+        """The full data dict of a row: stored remainder plus its sections"""
+        data = self._data(row['data'], fields)
+        if row['section_hashes'] is None:
+            # Rows from before section storage hold the whole report
+            return data
+        data = data or {}
+        hashes = json.loads(row['section_hashes'])
+        wanted = {name: digest for name, digest in hashes.items() if fields is None or name in fields}
+        data.update(self._load_sections(wanted, cache))
+        if fields is None:
+            data['section_hashes'] = hashes
+        return data
+
+    def _row(self, row, include_data=True, fields=None):
+        report = {
+            'id': row['id'],
+            'record_id': row['record_id'],
+            'vin': row['vin'],
+            'scraped_at': datetime.fromtimestamp(row['scraped_at']).isoformat(),
+            'status': row['status'],
+            'error': row['error'],
+            'changed': json.loads(row['changed']) if row['changed'] is not None else None
+        }
+        if include_data:
+            report['data'] = self._report_data(row, fields)
+        return report
+
+    def latest(self, vin, status='ok', fields=None):
+        """Most recent report for a VIN (successful ones by default), or None
+
+        fields limits the decoded data to those keys (e.g. ['vehicle_info']).
+        """
+        query = f"SELECT {SUMMARY_COLUMNS}, {DATA_COLUMNS} FROM reports WHERE vin = ?"
+        params = [(vin or '').strip().upper()]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY scraped_at DESC, id DESC LIMIT 1"
+        row = self._connect().execute(query, params).fetchone()
+        return self._row(row, fields=fields) if row else None
+
+    def history(self, vin, limit=50, include_data=False, fields=None):
+        """Reports for a VIN, newest first"""
+        columns = SUMMARY_COLUMNS + (f", {DATA_COLUMNS}" if include_data else "")
+        rows = self._connect().execute(
+            f"SELECT {columns} FROM reports WHERE vin = ? ORDER BY scraped_at DESC, id DESC LIMIT ?",
+            ((vin or '').strip().upper(), int(limit))
+        ).fetchall()
+        return [self._row(row, include_data, fields) for row in rows]
+
+    def since(self, since, until=None, status=None, vin=None, limit=100, after_id=None, include_data=False,
+              fields=None):
+        """Reports scraped in [since, until), in insertion order
+
+        Pass the last returned 'id' as after_id to fetch the next page.
+        """
+        columns = SUMMARY_COLUMNS + (f", {DATA_COLUMNS}" if include_data else "")
+        query = f"SELECT {columns} FROM reports WHERE scraped_at >= ?"
+        params = [parse_timestamp(since)]
+        if until is not None:
+            query += " AND scraped_at < ?"
+            params.append(parse_timestamp(until))
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        if vin:
+            query += " AND vin = ?"
+            params.append(vin.strip().upper())
+        if after_id is not None:
+            query += " AND id > ?"
+            params.append(int(after_id))
+        query += " ORDER BY id LIMIT ?"
+        params.append(int(limit))
+        rows = self._connect().execute(query, params).fetchall()
+        return [self._row(row, include_data, fields) for row in rows]
+
+    def count(self, status=None):
+        """Number of stored reports"""
+        if status:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM reports WHERE status = ?", (status,)
+            ).fetchone()[0]
+        return self._connect().execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def iter_reports(self, fields=None, status='ok', chunk_size=1000):
+        """Every stored report as a Report, in insertion order, for analytics
+
+        With fields only those are decoded; the others are None.
+        """
+        after_id = 0
+        while True:
+            query = f"SELECT id, vin, scraped_at, {DATA_COLUMNS} FROM reports WHERE id > ? AND data IS NOT NULL"
+            params = [after_id]
+            if status:
+                query += " AND status = ?"
+                params.append(status)
+            query += " ORDER BY id LIMIT ?"
+            params.append(int(chunk_size))
+            rows = self._connect().execute(query, params).fetchall()
+            if not rows:
+                return
+            # Unchanged re-scrapes share sections; decode each once per chunk
+            cache = {}
+            for row in rows:
+                if isinstance(row['data'], bytes) and row['section_hashes'] is None:
+                    yield Report.unpack(row['data'], fields)
+                    continue
+                data = self._report_data(row, fields, cache) or {}
+                data.pop('section_hashes', None)
+                yield Report.from_data(row['vin'], data, row['scraped_at'])
+            after_id = rows[-1]['id']
+
+    def _capture(self, vin, record_id=None, before=None):
+        """A stored capture of a VIN: by id, the latest, or the latest before another"""
+        query = f"SELECT {SUMMARY_COLUMNS}, section_hashes FROM reports WHERE vin = ? AND section_hashes IS NOT NULL"
+        params = [vin]
+        if record_id is not None:
+            query += " AND id = ?"
+            params.append(int(record_id))
+        elif before is not None:
+            query += " AND (scraped_at < ? OR (scraped_at = ? AND id < ?))"
+            params.extend([before['scraped_at'], before['scraped_at'], before['id']])
+        query += " ORDER BY scraped_at DESC, id DESC LIMIT 1"
+        return self._connect().execute(query, params).fetchone()
+
+    def changes(self, vin, from_id=None, to_id=None):
+        """What changed between two captures of a VIN, or None if there are none
+
+        Defaults to the latest capture and the one before it. Only the
+        changed sections are loaded; see report_diff.diff_section for
+        the shape of each entry.
+        """
+        vin = (vin or '').strip().upper()
+        to_row = self._capture(vin, to_id)
+        if to_row is None:
+            return None
+        from_row = self._capture(vin, from_id) if from_id is not None else self._capture(vin, before=to_row)
+
+        to_hashes = json.loads(to_row['section_hashes'])
+        from_hashes = json.loads(from_row['section_hashes']) if from_row is not None else None
+        changed = changed_sections(from_hashes, to_hashes)
+
+        after = self._load_sections({name: to_hashes[name] for name in changed if name in to_hashes})
+        before = {}
+        if from_hashes is not None:
+            before = self._load_sections({name: from_hashes[name] for name in changed if name in from_hashes})
+
+        return {
+            'vin': vin,
+            'from': self._row(from_row, include_data=False) if from_row is not None else None,
+            'to': self._row(to_row, include_data=False),
+            'unchanged': sorted(set(to_hashes) - set(changed)),
+            'changed': {
+                name: dict(
+                    before_hash=(from_hashes or {}).get(name),
+                    after_hash=to_hashes.get(name),
+                    **diff_section(before.get(name), after.get(name))
+                )
+                for name in changed
+            }
+        }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Scrape Records
+One bounded record per scrape, with size caps and truncation markers
+"""
+
+# Appended to any capped string; dropped is the number of characters cut
+TRUNCATION_MARKER = '…[truncated {dropped} characters]'
+
+
+class RecordLimits:
+    def __init__(self, capture_html=False, max_page_text=20000, max_item_text=4000, max_item_html=20000,
+                 max_items=200, max_urls=200):
+        """Caps on what a scrape record may hold
+
+        Raw innerHTML of history items is only kept with capture_html.
+        Strings longer than their cap are cut and end in a truncation
+        marker; lists longer than max_items / max_urls are cut as well.
+        Either way the record's 'truncated' entry says what was dropped.
+        A cap of 0 or None disables it.
+        """
+        self.capture_html = capture_html
+        self.max_page_text = max_page_text
+        self.max_item_text = max_item_text
+        self.max_item_html = max_item_html
+        self.max_items = max_items
+        self.max_urls = max_urls
+
+    def for_script(self):
+        """Caps in the shape the page snapshot script expects
+
+        Applying them in the browser keeps oversized strings from ever
+        crossing the WebDriver connection.
+        """
+        return {
+            'html': bool(self.capture_html),
+            'maxPageText': self.max_page_text or 0,
+            'maxItemText': self.max_item_text or 0,
+            'maxItemHtml': self.max_item_html or 0,
+            'maxItems': self.max_items or 0,
+            'maxUrls': self.max_urls or 0
+        }
+
+
+def truncate(text, limit, length=None):
+    """Cap text at limit characters; returns (text, characters dropped)
+
+    length is the original length when text was already cut elsewhere
+    (by the snapshot script).
+    """
+    text = text or ''
+    length = len(text) if length is None else length
+    if not limit or length <= limit:
+        return text, 0
+    dropped = length - limit
+    return text[:limit] + TRUNCATION_MARKER.format(dropped=dropped), dropped
+
+
+class ScrapeRecord(dict):
+    def __init__(self, limits=None, **fields):
+        """The data of one scrape, a plain dict to sinks and the cache
+
+        The set_* methods apply the limits and note every cut in
+        self['truncated'] as field -> characters or entries dropped.
+        """
+        super().__init__(**fields)
+        self.limits = limits or RecordLimits()
+
+    def _note(self, field, dropped):
+        if dropped:
+            truncated = self.setdefault('truncated', {})
+            truncated[field] = truncated.get(field, 0) + dropped
+
+    def set_text(self, field, text, length=None, limit=None):
+        """Store a string capped at limit (default: max_page_text)"""
+        limit = self.limits.max_page_text if limit is None else limit
+        self[field], dropped = truncate(text, limit, length)
+        self._note(field, dropped)
+
+    def set_items(self, section, items, total=None):
+        """Store history items, keeping html only when capture_html is on
+
+        Items may carry text_length / html_length when the snapshot
+        script already cut them; text_length is the length of the
+        stripped text, as the snapshot script trims it.
+        """
+        limits = self.limits
+        total = len(items) if total is None else total
+        if limits.max_items:
+            items = items[:limits.max_items]
+        self._note(section, total - len(items))
+
+        kept = []
+        for item in items:
+            text, dropped = truncate((item.get('text') or '').strip(), limits.max_item_text, item.get('text_length'))
+            self._note(f"{section}.text", dropped)
+            entry = {'text': text}
+            if limits.capture_html and item.get('html') is not None:
+                entry['html'], dropped = truncate(item['html'], limits.max_item_html, item.get('html_length'))
+                self._note(f"{section}.html", dropped)
+            kept.append(entry)
+        self[section] = kept
+
+    def set_urls(self, field, urls, total=None):
+        """Store a list of URLs capped at max_urls"""
+        total = len(urls) if total is None else total
+        if self.limits.max_urls:
+            urls = urls[:self.limits.max_urls]
+        self[field] = list(urls)
+        self._note(field, total - len(urls))
+
+    def update_parsed(self, parsed):
+        """Merge a parse_page result, applying the same caps as a live scrape"""
+        for field, value in parsed.items():
+            if field in ('links', 'images'):
+                self.set_urls(field, value)
+            elif field == 'page_content':
+                self.set_text(field, value)
+            elif isinstance(value, list):
+                self.set_items(field, value)
+            else:
+                self[field] = value
+        return self
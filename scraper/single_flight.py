@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Request Coalescing
+Concurrent requests for the same VIN share one piece of work
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+
+def normalize_vin(vin):
+    """Coalescing key for a VIN"""
+    return (vin or '').strip().upper()
+
+
+class SingleFlight:
+    def __init__(self):
+        """Track work in flight, one entry per key"""
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key, start):
+        """Join the flight for key, or start it with start()
+
+        start() runs only for the first caller and returns a handle (a
+        Future, a job id, ...) that later callers receive until end(key)
+        is called. Returns (handle, shared).
+        """
+        with self._lock:
+            if key in self._flights:
+                return self._flights[key], True
+            handle = start()
+            self._flights[key] = handle
+            return handle, False
+
+    def end(self, key, handle=None):
+        """Mark the flight for key finished; the next caller starts new work
+
+        With handle, only a flight still holding that handle is ended.
+        """
+        with self._lock:
+            if handle is None or self._flights.get(key) == handle:
+                self._flights.pop(key, None)
+
+    def in_flight(self):
+        """Number of keys currently being worked on"""
+        with self._lock:
+            return len(self._flights)
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn once per key at a time and share its outcome
+
+        The first caller runs fn(*args, **kwargs); concurrent callers with
+        the same key block on the same Future. Exceptions are re-raised in
+        every waiter. Returns (result, shared).
+        """
+        future, shared = self.begin(key, Future)
+        if shared:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self.end(key)
+
+
+def _process_alive(pid):
+    """Whether a process with this pid still exists on this host"""
+    if os.name == 'nt':
+        # os.kill(pid, 0) would terminate the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class HostSingleFlight:
+    def __init__(self, path, max_age=600.0, poll_interval=0.05):
+        """SingleFlight.begin / end shared by every process on this host
+
+        Flights live in SQLite at path, so server worker processes see
+        each other's work. Handles must be JSON-serializable (job ids).
+        A flight whose process has died, or that is older than max_age
+        seconds, is treated as finished.
+        """
+        self.path = path
+        self.max_age = max_age
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        # Short-lived connection: nothing opened here survives a fork
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS flights ("
+                "key TEXT PRIMARY KEY, handle TEXT, pid INTEGER NOT NULL, started_at REAL NOT NULL)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        """One connection per thread; SQLite connections can't be shared"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _live(self, row, now):
+        handle, pid, started_at = row
+        return now - started_at < self.max_age and _process_alive(pid)
+
+    def begin(self, key, start):
+        """Join the flight for key in any process, or start it with start()
+
+        Returns (handle, shared) like SingleFlight.begin. start() runs
+        outside the database lock; callers arriving meanwhile wait for
+        its handle.
+        """
+        conn = self._connect()
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT handle, pid, started_at FROM flights WHERE key = ?", (key,)).fetchone()
+                if row is None or not self._live(row, now):
+                    # Reserve the key; the handle follows once start() returns
+                    conn.execute(
+                        "INSERT OR REPLACE INTO flights (key, handle, pid, started_at) VALUES (?, NULL, ?, ?)",
+                        (key, os.getpid(), now)
+                    )
+                    conn.execute("COMMIT")
+                    break
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if row[0] is not None:
+                return json.loads(row[0]), True
+            time.sleep(self.poll_interval)
+
+        try:
+            handle = start()
+        except BaseException:
+            conn.execute("DELETE FROM flights WHERE key = ? AND handle IS NULL AND pid = ?", (key, os.getpid()))
+            raise
+        conn.execute("UPDATE flights SET handle = ? WHERE key = ? AND pid = ?", (json.dumps(handle), key, os.getpid()))
+        return handle, False
+
+    def end(self, key, handle=None):
+        """Mark the flight for key finished in every process
+
+        With handle, only a flight still holding that handle is ended,
+        so a flight taken over after going stale is left alone.
+        """
+        if handle is None:
+            self._connect().execute("DELETE FROM flights WHERE key = ?", (key,))
+        else:
+            self._connect().execute("DELETE FROM flights WHERE key = ? AND handle = ?", (key, json.dumps(handle)))
+
+    def in_flight(self):
+        """Number of keys currently being worked on by any process"""
+        now = time.time()
+        rows = self._connect().execute("SELECT handle, pid, started_at FROM flights").fetchall()
+        return sum(1 for row in rows if self._live(row, now))
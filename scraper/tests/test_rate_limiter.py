@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from rate_limiter import RateLimiter, RateLimitTimeout, create_rate_limiter
+
+
+def make_limiter(tmp_path, **kwargs):
+    kwargs.setdefault('poll_interval', 0.01)
+    return RateLimiter(str(tmp_path / 'rate_limit.sqlite3'), **kwargs)
+
+
+def test_burst_is_granted_without_waiting(tmp_path):
+    limiter = make_limiter(tmp_path, per_minute=60, burst=3)
+    waits = [limiter.acquire() for _ in range(3)]
+    assert max(waits) < 0.1
+    assert limiter.stats()['tokens'] < 1
+
+
+def test_interactive_waiter_goes_before_batch_waiters_queued_earlier(tmp_path):
+    limiter = make_limiter(tmp_path, per_minute=240, burst=1)
+    limiter.acquire()
+    order = []
+    lock = threading.Lock()
+
+    def take(name, priority):
+        limiter.acquire(priority, timeout=10)
+        with lock:
+            order.append(name)
+
+    threads = []
+    for name, priority in (('batch-1', 'batch'), ('batch-2', 'batch'), ('interactive', 'interactive')):
+        thread = threading.Thread(target=take, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        # Queued one after the other, all while the bucket is empty
+        time.sleep(0.03)
+    for thread in threads:
+        thread.join()
+
+    assert order == ['interactive', 'batch-1', 'batch-2']
+    assert limiter.stats()['waiting'] == {'interactive': 0, 'batch': 0}
+
+
+def test_limiters_on_the_same_path_share_one_bucket(tmp_path):
+    first = make_limiter(tmp_path, per_minute=1, burst=1)
+    second = make_limiter(tmp_path, per_minute=1, burst=1)
+    first.acquire()
+    with pytest.raises(RateLimitTimeout):
+        second.acquire(timeout=0.2)
+
+
+def test_timeout_leaves_the_queue(tmp_path):
+    limiter = make_limiter(tmp_path, per_minute=1, burst=1)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire('interactive', timeout=0.2)
+    assert limiter.stats()['waiting'] == {'interactive': 0, 'batch': 0}
+
+
+def test_unknown_priority_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        make_limiter(tmp_path, per_minute=60).acquire('urgent')
+
+
+def test_zero_rate_disables_the_limiter(tmp_path):
+    assert create_rate_limiter(per_minute=0, path=str(tmp_path / 'rate_limit.sqlite3')) is None
@@ -0,0 +1,165 @@
+import copy
+import sqlite3
+
+import pytest
+
+from report_model import msgpack
+from result_store import ResultStore
+
+VIN = '1HGCM82633A004352'
+
+REPORT = {
+    'vehicle_info': {'title': 'CARFAX Report', 'year_make_model': '2003 Honda Accord', 'vin': VIN},
+    'ownership_history': [{'text': 'Owner 1: purchased 2003'}],
+    'accident_history': [{'text': 'No accidents reported'}],
+    'service_history': [{'text': 'Oil change 2019'}, {'text': 'Tires rotated 2020'}],
+    'page_title': 'CARFAX Vehicle History Report',
+    'page_url': 'https://www.carfaxonline.com/vhr/' + VIN,
+    'page_content': 'Vehicle history for ' + VIN,
+    'links': ['https://www.carfaxonline.com/'],
+    'images': [],
+    'timings': {'navigate_to_carfax': 1.5},
+}
+
+
+@pytest.fixture(params=[False, True], ids=['json', 'packed'])
+def store(request, tmp_path):
+    if request.param and msgpack is None:
+        pytest.skip('needs msgpack')
+    store = ResultStore(str(tmp_path / 'results.sqlite3'), packed=request.param)
+    yield store
+    store.close()
+
+
+def section_rows(store):
+    conn = sqlite3.connect(store.path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM sections").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def rescrape(**changes):
+    data = copy.deepcopy(REPORT)
+    data.update(changes)
+    data['timings'] = {'navigate_to_carfax': 2.0}
+    return data
+
+
+def test_first_capture_stores_every_section(store):
+    store.add(VIN, copy.deepcopy(REPORT), scraped_at=1000.0)
+    store.flush()
+
+    latest = store.latest(VIN)
+    assert latest['changed'] == ['accident_history', 'images', 'links', 'ownership_history', 'page_content',
+                                 'service_history', 'vehicle_info']
+    assert section_rows(store) == 7
+
+
+def test_unchanged_rescrape_writes_no_sections(store):
+    store.add(VIN, copy.deepcopy(REPORT), scraped_at=1000.0)
+    store.flush()
+    before = section_rows(store)
+
+    store.add(VIN, rescrape(), scraped_at=2000.0)
+    store.flush()
+
+    assert section_rows(store) == before
+    assert store.latest(VIN)['changed'] == []
+    assert store.count() == 2
+
+
+def test_rescrape_writes_only_the_changed_section(store):
+    store.add(VIN, copy.deepcopy(REPORT), scraped_at=1000.0)
+    store.flush()
+    before = section_rows(store)
+
+    accidents = [{'text': 'No accidents reported'}, {'text': 'Minor damage reported 2021'}]
+    store.add(VIN, rescrape(accident_history=accidents), scraped_at=2000.0)
+    store.flush()
+
+    assert section_rows(store) == before + 1
+    latest = store.latest(VIN)
+    assert latest['changed'] == ['accident_history']
+    # Unchanged sections come from the first capture's rows
+    data = latest['data']
+    assert data['accident_history'] == accidents
+    for name in ('vehicle_info', 'ownership_history', 'service_history', 'page_content', 'links', 'images'):
+        assert data[name] == REPORT[name]
+    assert data['page_title'] == REPORT['page_title']
+    assert data['timings'] == {'navigate_to_carfax': 2.0}
+
+
+def test_captures_in_one_batch_are_compared_with_each_other(store):
+    store.add(VIN, copy.deepcopy(REPORT), scraped_at=1000.0)
+    store.add(VIN, rescrape(page_content='Updated history'), scraped_at=2000.0)
+    store.add(VIN, rescrape(page_content='Updated history'), scraped_at=3000.0)
+    store.flush()
+
+    newest, middle, oldest = store.history(VIN)
+    assert len(oldest['changed']) == 7
+    assert middle['changed'] == ['page_content']
+    assert newest['changed'] == []
+
+
+def test_latest_with_fields_loads_only_those(store):
+    store.add(VIN, copy.deepcopy(REPORT), scraped_at=1000.0)
+    store.flush()
+
+    assert store.latest(VIN, fields=['vehicle_info'])['data'] == {'vehicle_info': REPORT['vehicle_info']}
+
+
+def test_changes_describes_the_changed_sections(store):
+    store.add(VIN, copy.deepcopy(REPORT), scraped_at=1000.0)
+    store.flush()
+    vehicle_info = dict(REPORT['vehicle_info'], title='CARFAX Report (updated)')
+    page_content = 'Longer vehicle history for ' + VIN
+    store.add(VIN, rescrape(
+        vehicle_info=vehicle_info,
+        service_history=[{'text': 'Tires rotated 2020'}, {'text': 'Brakes replaced 2022'}],
+        page_content=page_content,
+    ), scraped_at=2000.0)
+    store.flush()
+
+    changes = store.changes(VIN.lower())
+    assert changes['vin'] == VIN
+    assert changes['from']['scraped_at'] < changes['to']['scraped_at']
+    assert changes['unchanged'] == ['accident_history', 'images', 'links', 'ownership_history']
+    assert set(changes['changed']) == {'vehicle_info', 'service_history', 'page_content'}
+
+    service = changes['changed']['service_history']
+    assert service['added'] == [{'text': 'Brakes replaced 2022'}]
+    assert service['removed'] == [{'text': 'Oil change 2019'}]
+    assert service['before_hash'] != service['after_hash']
+    assert changes['changed']['vehicle_info']['changed'] == {
+        'title': {'before': 'CARFAX Report', 'after': 'CARFAX Report (updated)'}
+    }
+    page = changes['changed']['page_content']
+    assert (page['before_length'], page['after_length']) == (len(REPORT['page_content']), len(page_content))
+
+
+def test_changes_between_chosen_captures(store):
+    store.add(VIN, copy.deepcopy(REPORT), scraped_at=1000.0)
+    store.add(VIN, rescrape(images=['https://example.com/a.jpg']), scraped_at=2000.0)
+    store.add(VIN, rescrape(), scraped_at=3000.0)
+    store.flush()
+    first, second, third = sorted(report['id'] for report in store.history(VIN))
+
+    # Back to the original images: nothing changed from the first capture
+    assert store.changes(VIN, from_id=first, to_id=third)['changed'] == {}
+    assert store.changes(VIN)['changed']['images']['removed'] == ['https://example.com/a.jpg']
+    assert store.changes(VIN, to_id=second)['changed']['images']['added'] == ['https://example.com/a.jpg']
+
+
+def test_first_capture_changes_against_nothing(store):
+    store.add(VIN, copy.deepcopy(REPORT), scraped_at=1000.0)
+    store.flush()
+
+    changes = store.changes(VIN)
+    assert changes['from'] is None
+    assert changes['unchanged'] == []
+    assert changes['changed']['links']['added'] == REPORT['links']
+
+
+def test_changes_of_an_unknown_vin(store):
+    assert store.changes(VIN) is None
@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from single_flight import HostSingleFlight, SingleFlight
+
+
+def test_do_runs_once_for_concurrent_callers():
+    flights = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(5)
+    results = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'report'
+
+    def caller():
+        barrier.wait()
+        results.append(flights.do('1HGCM82633A004352', work))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [('report', False)] + [('report', True)] * 4
+    assert flights.in_flight() == 0
+
+
+def test_do_reraises_in_every_waiter():
+    flights = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def fail():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError('navigation failed')
+
+    def leader():
+        with pytest.raises(RuntimeError):
+            flights.do('VIN', fail)
+
+    def waiter():
+        started.wait()
+        try:
+            flights.do('VIN', fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=leader), threading.Thread(target=waiter)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ['navigation failed']
+
+
+def test_work_starts_again_after_the_flight_ends():
+    flights = SingleFlight()
+    assert flights.do('VIN', lambda: 1) == (1, False)
+    assert flights.do('VIN', lambda: 2) == (2, False)
+
+
+def test_end_with_handle_leaves_a_newer_flight_alone():
+    flights = SingleFlight()
+    flights.begin('VIN', lambda: 'job-1')
+    flights.end('VIN', 'job-0')
+    assert flights.begin('VIN', lambda: 'job-2') == ('job-1', True)
+
+
+def _begin_in_process(path, queue):
+    flights = HostSingleFlight(path)
+
+    def start():
+        time.sleep(0.3)
+        return f"job-{os.getpid()}"
+
+    queue.put(flights.begin('1HGCM82633A004352', start))
+
+
+@pytest.fixture
+def fork_context():
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        pytest.skip('needs fork')
+    return multiprocessing.get_context('fork')
+
+
+def test_host_single_flight_coalesces_across_processes(tmp_path, fork_context):
+    path = str(tmp_path / 'flights.sqlite3')
+    HostSingleFlight(path)
+    queue = fork_context.Queue()
+    processes = [fork_context.Process(target=_begin_in_process, args=(path, queue)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    results = [queue.get(timeout=10) for _ in processes]
+    for process in processes:
+        process.join()
+
+    assert len({handle for handle, _ in results}) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+
+
+def test_host_single_flight_starts_new_work_after_end(tmp_path):
+    flights = HostSingleFlight(str(tmp_path / 'flights.sqlite3'))
+    assert flights.begin('VIN', lambda: 'job-1') == ('job-1', False)
+    assert flights.begin('VIN', lambda: 'job-2') == ('job-1', True)
+    flights.end('VIN', 'job-1')
+    assert flights.begin('VIN', lambda: 'job-3') == ('job-3', False)
+
+
+def test_host_single_flight_forgets_flights_of_dead_processes(tmp_path, fork_context):
+    path = str(tmp_path / 'flights.sqlite3')
+    HostSingleFlight(path)
+    # Starts a flight and exits without ending it, like a crashed worker
+    process = fork_context.Process(target=lambda: HostSingleFlight(path).begin('VIN', lambda: 'orphan'))
+    process.start()
+    process.join()
+
+    flights = HostSingleFlight(path)
+    assert flights.in_flight() == 0
+    assert flights.begin('VIN', lambda: 'job-1') == ('job-1', False)
+
+
+def test_host_single_flight_releases_the_key_when_start_fails(tmp_path):
+    flights = HostSingleFlight(str(tmp_path / 'flights.sqlite3'))
+
+    def start():
+        raise RuntimeError('queue full')
+
+    with pytest.raises(RuntimeError):
+        flights.begin('VIN', start)
+    assert flights.begin('VIN', lambda: 'job-1') == ('job-1', False)
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import vin_check
+from vin_check import check_digit, normalize, validate, validate_many
+
+VALID_CHARS = '0123456789ABCDEFGHJKLMNPRSTUVWXYZ'
+
+
+def make_vin(rng):
+    """A random VIN with a correct check digit"""
+    body = [rng.choice(VALID_CHARS) for _ in range(17)]
+    body[8] = '0'
+    vin = ''.join(body)
+    return vin[:8] + check_digit(vin) + vin[9:]
+
+
+def sample_vins(count=2000, seed=1234):
+    rng = random.Random(seed)
+    vins = ['1HGCM82633A004352', '1hgcm82633a004352 ', '', '   ', None, 'ß' * 9, 'SHORT', 'X' * 18]
+    for _ in range(count):
+        vin = make_vin(rng)
+        kind = rng.randrange(6)
+        if kind == 1:
+            # Wrong check digit
+            wrong = rng.choice([c for c in '0123456789X' if c != vin[8]])
+            vin = vin[:8] + wrong + vin[9:]
+        elif kind == 2:
+            position = rng.randrange(17)
+            vin = vin[:position] + rng.choice('IOQ') + vin[position + 1:]
+        elif kind == 3:
+            position = rng.randrange(17)
+            vin = vin[:position] + rng.choice('-*é€') + vin[position + 1:]
+        elif kind == 4:
+            vin = vin[:rng.randrange(1, 17)]
+        vins.append(vin)
+    return vins
+
+
+def test_validate_accepts_a_known_vin_and_reports_the_expected_check_digit():
+    assert validate('1HGCM82633A004352') == (True, None)
+    assert validate('1HGCM82643A004352') == (False, "Invalid check digit (expected 3)")
+    assert validate('1HGCM82643A004352', verify_check_digit=False) == (True, None)
+
+
+def test_validate_names_the_forbidden_character():
+    assert validate('1HGCM8263OA004352') == (False, "VIN cannot contain: O")
+
+
+@pytest.mark.skipif(vin_check.np is None, reason='needs numpy')
+@pytest.mark.parametrize('verify', [True, False])
+def test_numpy_and_python_paths_agree(verify):
+    vins = [normalize(vin) for vin in sample_vins()]
+    assert vin_check._validate_numpy(vins, verify) == vin_check._validate_python(vins, verify)
+
+
+@pytest.mark.skipif(vin_check.np is None, reason='needs numpy')
+def test_numpy_path_handles_a_batch_without_full_length_vins():
+    vins = ['', 'ABC']
+    assert vin_check._validate_numpy(vins, True) == vin_check._validate_python(vins, True)
+
+
+def test_validate_many_keeps_row_numbers_and_normalized_vins():
+    results = validate_many([' 1hgcm82633a004352', 'bad'], rows=[7, 9])
+    assert results == [
+        {'row': 7, 'vin': '1HGCM82633A004352', 'valid': True, 'error': None},
+        {'row': 9, 'vin': 'BAD', 'valid': False, 'error': "VIN must be exactly 17 characters"},
+    ]
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+VIN Validation and Decoding
+Check digit, model year and manufacturer lookups shared by the scraper,
+the launcher and the Flask app, plus bulk validation for large VIN lists
+"""
+
+import argparse
+import csv
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback below
+    np = None
+
+VIN_LENGTH = 17
+
+# Transliteration of VIN characters to numeric values (ISO 3779 / 49 CFR 565)
+TRANSLITERATION = {
+    **{str(digit): digit for digit in range(10)},
+    'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
+    'J': 1, 'K': 2, 'L': 3, 'M': 4, 'N': 5, 'P': 7, 'R': 9,
+    'S': 2, 'T': 3, 'U': 4, 'V': 5, 'W': 6, 'X': 7, 'Y': 8, 'Z': 9,
+}
+WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+CHECK_DIGIT_POSITION = 8
+MODEL_YEAR_POSITION = 9
+FORBIDDEN = 'IOQ'
+VALID_CHARS = ''.join(TRANSLITERATION)
+
+# str.translate tables: one deletes every valid character (what's left is
+# invalid), the other maps characters to their transliterated digit
+_DELETE_VALID = str.maketrans('', '', VALID_CHARS)
+_TO_VALUE = str.maketrans({char: str(value) for char, value in TRANSLITERATION.items()})
+
+# Position 10 model-year codes repeat every 30 years starting in 1980
+MODEL_YEAR_CODES = 'ABCDEFGHJKLMNPRSTVWXY123456789'
+MODEL_YEARS = {code: 1980 + offset for offset, code in enumerate(MODEL_YEAR_CODES)}
+
+# First character of the WMI
+REGIONS = {
+    **dict.fromkeys('ABCDEFGH', 'Africa'),
+    **dict.fromkeys('JKLMNPR', 'Asia'),
+    **dict.fromkeys('STUVWXYZ', 'Europe'),
+    **dict.fromkeys('12345', 'North America'),
+    **dict.fromkeys('67', 'Oceania'),
+    **dict.fromkeys('89', 'South America'),
+}
+
+# World manufacturer identifiers (first three characters, or two when the
+# manufacturer uses the third for vehicle type)
+WMI_MANUFACTURERS = {
+    '1C': 'Chrysler', '1F': 'Ford', '1G': 'General Motors', '1G1': 'Chevrolet', '1GC': 'Chevrolet Truck',
+    '1GM': 'Pontiac', '1GT': 'GMC Truck', '1G6': 'Cadillac', '1HG': 'Honda', '1J': 'Jeep', '1L': 'Lincoln',
+    '1M': 'Mercury', '1N': 'Nissan', '1VW': 'Volkswagen', '1YV': 'Mazda', '1ZV': 'Ford (AutoAlliance)',
+    '2C': 'Chrysler Canada', '2F': 'Ford Canada', '2G': 'General Motors Canada', '2HG': 'Honda Canada',
+    '2HK': 'Honda Canada', '2HM': 'Hyundai Canada', '2T': 'Toyota Canada', '3F': 'Ford Mexico',
+    '3G': 'General Motors Mexico', '3HG': 'Honda Mexico', '3N': 'Nissan Mexico', '3VW': 'Volkswagen Mexico',
+    '4S': 'Subaru', '4T': 'Toyota', '4US': 'BMW', '4JG': 'Mercedes-Benz', '5FN': 'Honda', '5J': 'Honda',
+    '5L': 'Lincoln', '5N1': 'Nissan', '5NP': 'Hyundai', '5T': 'Toyota', '5UX': 'BMW', '5YJ': 'Tesla',
+    'JA': 'Isuzu', 'JF': 'Subaru', 'JH': 'Honda', 'JHM': 'Honda', 'JM': 'Mazda', 'JN': 'Nissan',
+    'JS': 'Suzuki', 'JT': 'Toyota', 'JTH': 'Lexus', 'KL': 'Daewoo/GM Korea', 'KM': 'Hyundai',
+    'KMH': 'Hyundai', 'KN': 'Kia', 'KNA': 'Kia', 'SAJ': 'Jaguar', 'SAL': 'Land Rover', 'SCC': 'Lotus',
+    'SCF': 'Aston Martin', 'VF1': 'Renault', 'VF3': 'Peugeot', 'VF7': 'Citroen', 'WA1': 'Audi SUV',
+    'WAU': 'Audi', 'WBA': 'BMW', 'WBS': 'BMW M', 'WDB': 'Mercedes-Benz', 'WDD': 'Mercedes-Benz',
+    'WMW': 'MINI', 'WP0': 'Porsche', 'WP1': 'Porsche SUV', 'WVW': 'Volkswagen', 'WVG': 'Volkswagen SUV',
+    'YV1': 'Volvo', 'YV4': 'Volvo SUV', 'ZAM': 'Maserati', 'ZAR': 'Alfa Romeo', 'ZFA': 'Fiat',
+    'ZFF': 'Ferrari', 'ZHW': 'Lamborghini',
+}
+
+CHUNK_SIZE = 100_000
+
+if np is not None:
+    # Byte value -> transliterated value, -1 for characters a VIN can't contain
+    _VALUE_TABLE = np.full(256, -1, dtype=np.int16)
+    for _char, _value in TRANSLITERATION.items():
+        _VALUE_TABLE[ord(_char)] = _value
+    _WEIGHTS = np.array(WEIGHTS, dtype=np.int16)
+    # Remainder -> expected check character
+    _CHECK_CHARS = np.frombuffer(b'0123456789X', dtype=np.uint8)
+
+
+def normalize(vin):
+    return (vin or '').strip().upper()
+
+
+def check_digit(vin):
+    """Expected check digit ('0'-'9' or 'X') for a 17-character VIN"""
+    digits = vin.translate(_TO_VALUE)
+    total = sum(int(digit) * weight for digit, weight in zip(digits, WEIGHTS))
+    remainder = total % 11
+    return 'X' if remainder == 10 else str(remainder)
+
+
+def model_year(vin):
+    """Model year from position 10, or None
+
+    The code repeats every 30 years; a letter in position 7 marks the
+    2010-2039 cycle for North American passenger vehicles.
+    """
+    base = MODEL_YEARS.get(vin[MODEL_YEAR_POSITION]) if len(vin) == VIN_LENGTH else None
+    if base is None:
+        return None
+    return base + 30 if vin[6].isalpha() else base
+
+
+def manufacturer(vin):
+    """Manufacturer for the VIN's WMI, or None when it isn't in the table"""
+    return WMI_MANUFACTURERS.get(vin[:3]) or WMI_MANUFACTURERS.get(vin[:2])
+
+
+def decode(vin):
+    """Validate a VIN and decode what its structure tells us"""
+    vin = normalize(vin)
+    valid, error = validate(vin)
+    decoded = {'vin': vin, 'valid': valid, 'error': error}
+    if len(vin) == VIN_LENGTH and not vin.translate(_DELETE_VALID):
+        decoded.update({
+            'wmi': vin[:3],
+            'region': REGIONS.get(vin[0]),
+            'manufacturer': manufacturer(vin),
+            'model_year': model_year(vin),
+            'check_digit': vin[CHECK_DIGIT_POSITION],
+            'serial': vin[11:]
+        })
+    return decoded
+
+
+def _character_error(vin):
+    for char in FORBIDDEN:
+        if char in vin:
+            return f"VIN cannot contain: {char}"
+    return "VIN contains invalid characters"
+
+
+def validate(vin, verify_check_digit=True):
+    """Validate one VIN; returns (valid, error)"""
+    vin = normalize(vin)
+    if not vin:
+        return False, "VIN is required"
+    if len(vin) != VIN_LENGTH:
+        return False, "VIN must be exactly 17 characters"
+    if vin.translate(_DELETE_VALID):
+        return False, _character_error(vin)
+    if verify_check_digit:
+        expected = check_digit(vin)
+        if vin[CHECK_DIGIT_POSITION] != expected:
+            return False, f"Invalid check digit (expected {expected})"
+    return True, None
+
+
+def _validate_python(vins, verify_check_digit):
+    return [validate(vin, verify_check_digit) for vin in vins]
+
+
+def _validate_numpy(vins, verify_check_digit):
+    """Vectorized validate() over already-normalized VINs"""
+    results = [None] * len(vins)
+    full_length = []
+    for index, vin in enumerate(vins):
+        if not vin:
+            results[index] = (False, "VIN is required")
+        elif len(vin) != VIN_LENGTH:
+            results[index] = (False, "VIN must be exactly 17 characters")
+        else:
+            full_length.append(index)
+    if not full_length:
+        return results
+
+    # One byte per character; anything non-ASCII becomes '?' and fails the table lookup
+    blob = ''.join(vins[index] for index in full_length).encode('ascii', errors='replace')
+    chars = np.frombuffer(blob, dtype=np.uint8).reshape(-1, VIN_LENGTH)
+    values = _VALUE_TABLE[chars]
+    bad_chars = (values < 0).any(axis=1)
+
+    if verify_check_digit:
+        remainders = (values.astype(np.int32) * _WEIGHTS).sum(axis=1) % 11
+        expected = _CHECK_CHARS[remainders]
+        bad_check = ~bad_chars & (chars[:, CHECK_DIGIT_POSITION] != expected)
+    else:
+        expected = None
+        bad_check = np.zeros(len(full_length), dtype=bool)
+
+    for row in np.flatnonzero(bad_chars):
+        index = full_length[row]
+        results[index] = (False, _character_error(vins[index]))
+    for row in np.flatnonzero(bad_check):
+        results[full_length[row]] = (False, f"Invalid check digit (expected {chr(expected[row])})")
+    for index in full_length:
+        if results[index] is None:
+            results[index] = (True, None)
+    return results
+
+
+def validate_many(vins, verify_check_digit=True, rows=None):
+    """Validate a list of VINs; returns one {row, vin, valid, error} dict per input
+
+    row is the index in vins unless row numbers are passed in. Uses
+    NumPy when it is installed and falls back to a per-VIN loop.
+    """
+    normalized = [normalize(vin) for vin in vins]
+    if np is not None:
+        outcomes = _validate_numpy(normalized, verify_check_digit)
+    else:
+        outcomes = _validate_python(normalized, verify_check_digit)
+    return [
+        {'row': row, 'vin': vin, 'valid': valid, 'error': error}
+        for row, vin, (valid, error) in zip(rows if rows is not None else range(len(vins)), normalized, outcomes)
+    ]
+
+
+def iter_vin_column(rows, column=0):
+    """(row number, VIN) pairs from CSV rows
+
+    Row numbers are 1-based lines of the feed. Blank rows, '#' comments
+    and a leading 'vin' header are skipped.
+    """
+    for number, row in enumerate(rows, 1):
+        if not row or column >= len(row):
+            continue
+        value = row[column].strip()
+        if not value or value.startswith('#'):
+            continue
+        if number == 1 and value.lower() == 'vin':
+            continue
+        yield number, value
+
+
+def validate_stream(pairs, verify_check_digit=True, chunk_size=CHUNK_SIZE):
+    """Validate (row, VIN) pairs chunk by chunk, yielding per-row results"""
+    rows, chunk = [], []
+    for row, vin in pairs:
+        rows.append(row)
+        chunk.append(vin)
+        if len(chunk) >= chunk_size:
+            yield from validate_many(chunk, verify_check_digit, rows)
+            rows, chunk = [], []
+    if chunk:
+        yield from validate_many(chunk, verify_check_digit, rows)
+
+
+def main():
+    """Validate a VIN list and write per-row results as CSV"""
+    parser = argparse.ArgumentParser(description='Validate VINs in bulk')
+    parser.add_argument('source', help="CSV or text file with VINs ('-' for stdin)")
+    parser.add_argument('--output', '-o', default='-', help="Results CSV ('-' for stdout)")
+    parser.add_argument('--column', type=int, default=0, help='Zero-based CSV column holding the VIN')
+    parser.add_argument('--invalid-only', action='store_true', help='Only write rows that failed validation')
+    parser.add_argument('--no-check-digit', action='store_true',
+                        help='Skip the check digit (non-North-American VINs need not have one)')
+    args = parser.parse_args()
+
+    source = sys.stdin if args.source == '-' else open(args.source, 'r', encoding='utf-8', newline='')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+
+    start = time.monotonic()
+    total = invalid = 0
+    try:
+        writer = csv.writer(output)
+        writer.writerow(['row', 'vin', 'valid', 'error'])
+        pairs = iter_vin_column(csv.reader(source), args.column)
+        for result in validate_stream(pairs, not args.no_check_digit):
+            total += 1
+            if not result['valid']:
+                invalid += 1
+            elif args.invalid_only:
+                continue
+            writer.writerow([result['row'], result['vin'], int(result['valid']), result['error'] or ''])
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.monotonic() - start
+    rate = total / elapsed if elapsed else 0
+    print(f"✅ {total - invalid} valid, ❌ {invalid} invalid of {total} VINs "
+          f"in {elapsed:.2f}s ({rate:,.0f} VINs/s)", file=sys.stderr)
+    return invalid == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)